@@ -0,0 +1,212 @@
+"""Extraction benchmark over the bundled test decks and synthetic PDFs.
+
+Every (corpus, path) pair runs in a fresh subprocess so peak RSS is
+measured per extractor. Results are compared against baseline.json.
+
+    cd backend
+    python -m benchmarks.extraction_benchmark
+    python -m benchmarks.extraction_benchmark --paths pymupdf ocr_off --pages 10 100
+    python -m benchmarks.extraction_benchmark --update-baseline
+"""
+import os
+import sys
+import json
+import glob
+import time
+import shutil
+import argparse
+import resource
+import platform
+import tempfile
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.synthetic_pdf import write_synthetic_pdf
+
+TEST_DECKS = os.path.join(BACKEND_DIR, "assets", "test", "*.pdf")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+SYNTHETIC_PAGES = (10, 100, 500)
+# One sparse page with an image every N synthetic pages, for the OCR path
+SYNTHETIC_IMAGE_EVERY = 10
+
+# Raw backends are timed single-process; ocr_off/ocr_on go through the
+# extraction service (process pool, per-page fallback, OCR stage)
+EXTRACTOR_PATHS = ("pypdf2", "pdfplumber", "pymupdf", "ocr_off", "ocr_on")
+
+# Throughput may drop this much below baseline before it counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+
+def _peak_rss_mb():
+    """Peak RSS of this process and of its largest reaped child (pool workers), in MB"""
+    scale = 1 if platform.system() == "Darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return round(own / 1024 / 1024, 1), round(children / 1024 / 1024, 1)
+
+
+def run_path(path: str, file_path: str) -> dict:
+    """Extract one file with one extractor path; runs inside the worker subprocess"""
+    if path in ("pypdf2", "pdfplumber", "pymupdf"):
+        from ml_services.extraction_engine import available_pdf_backends, count_pdf_pages, extract_pdf_page_range
+
+        if path not in available_pdf_backends():
+            return {'skipped': f"{path} not installed"}
+        start = time.perf_counter()
+        page_count = count_pdf_pages(file_path, (path,))
+        records = extract_pdf_page_range(file_path, 0, page_count, (path,))
+        elapsed = time.perf_counter() - start
+        chars = sum(len(record.text) for record in records)
+        extra = {}
+    else:
+        from ml_services.document_extraction import document_extraction_service
+        from ml_services.extraction_engine import pdf_extraction_engine
+        from ml_services.ocr_stage import ocr_stage
+
+        if path == "ocr_on" and not (ocr_stage.is_available() and shutil.which("tesseract")):
+            return {'skipped': "OCR not available (PyMuPDF, pytesseract, Pillow and tesseract required)"}
+        tier = "deep" if path == "ocr_on" else "standard"
+        start = time.perf_counter()
+        try:
+            result = document_extraction_service.extract(file_path, tier=tier, use_cache=False)
+        finally:
+            # Wait for the pool workers so their peak RSS is reaped into RUSAGE_CHILDREN
+            pdf_extraction_engine.shutdown(wait=True)
+            ocr_stage.shutdown(wait=True)
+        elapsed = time.perf_counter() - start
+        page_count, chars = result.page_count, len(result.text)
+        extra = {'backends': result.backends}
+        if result.ocr_stats:
+            extra['ocr_runs'] = result.ocr_stats.get('ocr_runs', 0)
+
+    own_rss, child_rss = _peak_rss_mb()
+    return {
+        'pages': page_count,
+        'seconds': round(elapsed, 4),
+        'pages_per_sec': round(page_count / elapsed, 2) if elapsed else None,
+        'chars': chars,
+        'peak_rss_mb': own_rss,
+        'peak_child_rss_mb': child_rss,
+        **extra
+    }
+
+
+def measure(path: str, file_path: str, cache_dir: str) -> dict:
+    """Run one measurement in a fresh interpreter so RSS and pools start cold"""
+    env = dict(os.environ, TEXT_CACHE_DIR=cache_dir, PYTHONPATH=BACKEND_DIR)
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.extraction_benchmark", "--worker", path, file_path],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "worker failed"}
+    # Extractors print progress; the result is the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def build_corpora(work_dir: str, pages: list) -> dict:
+    corpora = {os.path.basename(path): path for path in sorted(glob.glob(TEST_DECKS))}
+    for page_count in pages:
+        name = f"synthetic-{page_count}p.pdf"
+        corpora[name] = write_synthetic_pdf(
+            os.path.join(work_dir, name),
+            page_count,
+            image_every=SYNTHETIC_IMAGE_EVERY
+        )
+    return corpora
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions: throughput below baseline by more than `tolerance`, or a change in extracted characters"""
+    regressions = []
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if not expected or 'pages_per_sec' not in result or 'pages_per_sec' not in expected:
+            continue
+        floor = expected['pages_per_sec'] * (1 - tolerance)
+        if result['pages_per_sec'] < floor:
+            regressions.append(
+                f"{key}: {result['pages_per_sec']} pages/sec < {floor:.2f} "
+                f"(baseline {expected['pages_per_sec']})"
+            )
+        if result['chars'] != expected['chars']:
+            regressions.append(f"{key}: extracted {result['chars']} chars, baseline {expected['chars']}")
+    return regressions
+
+
+def print_table(results: dict):
+    print(f"{'corpus / path':<50} {'pages':>6} {'pages/s':>9} {'chars':>9} {'rss MB':>8} {'child MB':>9}")
+    for key, result in results.items():
+        if 'skipped' in result or 'error' in result:
+            print(f"{key:<50} {result.get('skipped') or 'ERROR: ' + result['error']}")
+            continue
+        print(f"{key:<50} {result['pages']:>6} {result['pages_per_sec']:>9} {result['chars']:>9} "
+              f"{result['peak_rss_mb']:>8} {result['peak_child_rss_mb']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark document extraction paths")
+    parser.add_argument("--worker", nargs=2, metavar=("PATH", "FILE"), help=argparse.SUPPRESS)
+    parser.add_argument("--paths", nargs="+", choices=EXTRACTOR_PATHS, default=list(EXTRACTOR_PATHS))
+    parser.add_argument("--pages", nargs="*", type=int, default=list(SYNTHETIC_PAGES),
+                        help="Synthetic PDF sizes to generate")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Write results to the baseline file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--output", help="Also write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_path(*args.worker)))
+        return 0
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="extraction-bench-") as work_dir:
+        corpora = build_corpora(work_dir, args.pages)
+        for corpus, file_path in corpora.items():
+            for path in args.paths:
+                key = f"{corpus}/{path}"
+                # Fresh cache dir per run so the OCR cache never serves a warm result
+                results[key] = measure(path, file_path, tempfile.mkdtemp(dir=work_dir))
+                print(f"measured {key}", file=sys.stderr)
+
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.update_baseline:
+        measured = {key: result for key, result in results.items() if 'pages_per_sec' in result}
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file)
+        baseline.update(measured)
+        with open(args.baseline, "w") as file:
+            json.dump(dict(sorted(baseline.items())), file, indent=2)
+            file.write("\n")
+        print(f"Baseline updated with {len(measured)} results: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline file; run with --update-baseline to create one")
+        return 0
+
+    with open(args.baseline) as file:
+        regressions = compare(results, json.load(file), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print("No regressions against baseline" if not regressions else f"{len(regressions)} regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
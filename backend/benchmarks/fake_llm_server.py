@@ -0,0 +1,292 @@
+"""Local stand-in for the Groq / OpenAI-compatible APIs, for offline load tests.
+
+Serves chat completions (plain and streamed), the model list and
+embeddings with configurable latency, throughput and error rate. Replies
+are canned and deterministic for a given prompt: plain prompts get text
+ending in a `Score: X` line, prompts asking for a JSON object with
+"exactly these keys" get that object. Recorded replies can be supplied
+with --responses.
+
+    cd backend
+    python -m benchmarks.fake_llm_server --port 8900 --latency lognormal:0.4:0.3 --tokens-per-sec 400 --error-rate 0.02
+
+Then point the app at it:
+
+    GROQ_BASE_URL=http://127.0.0.1:8900      # ChatGroq and the Groq client
+    EMBEDDINGS_BASE_URL=http://127.0.0.1:8900/v1
+    GROQ_API_KEY=fake EMBEDDINGS_MODEL_NAME=fake-embed
+
+The --responses file is a JSON list of {"match": "<substring>", "response": "<text>"};
+the first entry whose match occurs in the prompt wins.
+"""
+import re
+import json
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import argparse
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_MODELS = ("llama-3.1-8b-instant", "llama-3.3-70b-versatile", "fake-embed")
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class FakeLLMConfig:
+    # "fixed:S", "uniform:LOW:HIGH", "normal:MEAN:STD" or "lognormal:MEDIAN:SIGMA", in seconds
+    latency: str = "fixed:0"
+    # Streaming and completion pace; 0 returns the whole reply at once
+    tokens_per_sec: float = 0.0
+    error_rate: float = 0.0
+    error_statuses: List[int] = field(default_factory=lambda: [429, 500, 503])
+    embedding_dim: int = 768
+    seed: int = 0
+    responses: List[Dict] = field(default_factory=list)
+    models: List[str] = field(default_factory=lambda: list(DEFAULT_MODELS))
+
+
+class FakeLLM:
+    """Reply, latency and error decisions for the fake server.
+
+    Latency and errors come from one seeded RNG, so a run with the same
+    seed and request order sees the same sequence. Reply text depends
+    only on the prompt.
+    """
+
+    def __init__(self, config: FakeLLMConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.latency = self._parse_latency(config.latency)
+        self.stats = {'requests': 0, 'errors': 0, 'completion_tokens': 0}
+
+    @staticmethod
+    def _parse_latency(spec: str):
+        kind, *params = spec.split(":")
+        params = [float(param) for param in params]
+        if kind == "fixed":
+            return lambda rng: params[0] if params else 0.0
+        if kind == "uniform":
+            return lambda rng: rng.uniform(params[0], params[1])
+        if kind == "normal":
+            return lambda rng: max(0.0, rng.gauss(params[0], params[1]))
+        if kind == "lognormal":
+            # Parameterised by the median, which is what people usually quote
+            median, sigma = params
+            return lambda rng: rng.lognormvariate(0, sigma) * median if median > 0 else 0.0
+        raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def next_latency(self) -> float:
+        return self.latency(self.rng)
+
+    def next_error(self) -> Optional[int]:
+        if self.config.error_rate and self.rng.random() < self.config.error_rate:
+            return self.rng.choice(self.config.error_statuses)
+        return None
+
+    def reply(self, prompt: str) -> str:
+        for recorded in self.config.responses:
+            if recorded.get('match', '') in prompt:
+                return recorded['response']
+
+        digest = hashlib.sha256(prompt.encode('utf-8')).digest()
+        keys = re.search(r'exactly these keys:\s*(.+?)\.\s*$', prompt, re.MULTILINE)
+        if keys:
+            names = re.findall(r'"([^"]+)"', keys.group(1))
+            return json.dumps({
+                name: {'text': self._paragraph(name, digest[i % len(digest)]), 'score': self._score(digest, i)}
+                for i, name in enumerate(names)
+            }, indent=2)
+        return f"{self._paragraph('analysis', digest[0])}\n\nScore: {self._score(digest, 0)}"
+
+    @staticmethod
+    def _score(digest: bytes, index: int) -> int:
+        return 40 + digest[index % len(digest)] % 51
+
+    @staticmethod
+    def _paragraph(topic: str, salt: int) -> str:
+        points = [
+            "The document presents a coherent plan with identifiable strengths.",
+            "Evidence for the main claims is partial and should be verified in diligence.",
+            "Execution risk is moderate given the team and the stated milestones.",
+            "Market figures are plausible but rely on top-down estimates.",
+            "Unit economics are not yet proven at scale.",
+        ]
+        start = salt % len(points)
+        body = " ".join(points[start:] + points[:start])
+        return f"{topic.replace('_', ' ').capitalize()}: {body}"
+
+    def embed(self, text: str) -> List[float]:
+        """Unit vector derived from the text, so identical text embeds identically"""
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'big')
+        rng = random.Random(seed)
+        vector = [rng.gauss(0, 1) for _ in range(self.config.embedding_dim)]
+        norm = sum(value * value for value in vector) ** 0.5 or 1.0
+        return [value / norm for value in vector]
+
+
+def tokenize(text: str) -> List[str]:
+    """Word-ish pieces that join back to the original text"""
+    return re.findall(r'\S+\s*|\s+', text)
+
+
+def prompt_of(messages: List[Dict]) -> str:
+    return "\n".join(
+        message['content'] if isinstance(message.get('content'), str) else json.dumps(message.get('content'))
+        for message in messages
+    )
+
+
+def usage(prompt: str, completion_tokens: int) -> Dict:
+    prompt_tokens = max(1, len(prompt) // CHARS_PER_TOKEN)
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens
+    }
+
+
+def error_response(status: int) -> JSONResponse:
+    headers = {'retry-after': '1'} if status == 429 else {}
+    return JSONResponse(
+        status_code=status,
+        content={'error': {'message': f"fake upstream error {status}", 'type': 'fake_error', 'code': str(status)}},
+        headers=headers
+    )
+
+
+def create_app(config: FakeLLMConfig) -> FastAPI:
+    fake = FakeLLM(config)
+    app = FastAPI(title="Fake LLM server")
+    app.state.fake = fake
+
+    async def list_models():
+        return {
+            'object': 'list',
+            'data': [{'id': model, 'object': 'model', 'created': 0, 'owned_by': 'fake'} for model in config.models]
+        }
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        fake.stats['requests'] += 1
+        status = fake.next_error()
+        await asyncio.sleep(fake.next_latency())
+        if status:
+            fake.stats['errors'] += 1
+            return error_response(status)
+
+        prompt = prompt_of(body.get('messages', []))
+        text = fake.reply(prompt)
+        max_tokens = body.get('max_tokens')
+        tokens = tokenize(text)
+        if max_tokens:
+            tokens = tokens[:max_tokens]
+        fake.stats['completion_tokens'] += len(tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model = body.get('model', config.models[0])
+        delay = 1 / config.tokens_per_sec if config.tokens_per_sec > 0 else 0
+
+        if not body.get('stream'):
+            await asyncio.sleep(delay * len(tokens))
+            return {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': "".join(tokens)},
+                    'finish_reason': 'stop' if not max_tokens or len(tokens) < max_tokens else 'length'
+                }],
+                'usage': usage(prompt, len(tokens))
+            }
+
+        def chunk(delta: Dict, finish_reason=None, extra=None) -> str:
+            payload = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+                **(extra or {})
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            yield chunk({'role': 'assistant', 'content': ''})
+            for token in tokens:
+                if delay:
+                    await asyncio.sleep(delay)
+                yield chunk({'content': token})
+            yield chunk({}, 'stop', {'x_groq': {'id': completion_id, 'usage': usage(prompt, len(tokens))}})
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def embeddings(request: Request):
+        body = await request.json()
+        fake.stats['requests'] += 1
+        await asyncio.sleep(fake.next_latency())
+        inputs = body.get('input', [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        return {
+            'object': 'list',
+            'data': [{'object': 'embedding', 'index': i, 'embedding': fake.embed(text)} for i, text in enumerate(inputs)],
+            'model': body.get('model', 'fake-embed'),
+            'usage': {'prompt_tokens': sum(len(text) // CHARS_PER_TOKEN for text in inputs), 'total_tokens': 0}
+        }
+
+    async def stats():
+        return fake.stats
+
+    # Groq clients use the /openai/v1 prefix, OpenAI-style clients use /v1
+    for prefix in ("/openai/v1", "/v1"):
+        app.add_api_route(f"{prefix}/models", list_models, methods=["GET"])
+        app.add_api_route(f"{prefix}/chat/completions", chat_completions, methods=["POST"])
+        app.add_api_route(f"{prefix}/embeddings", embeddings, methods=["POST"])
+    app.add_api_route("/stats", stats, methods=["GET"])
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Groq/OpenAI-compatible LLM API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", default="fixed:0",
+                        help="fixed:S | uniform:LOW:HIGH | normal:MEAN:STD | lognormal:MEDIAN:SIGMA (seconds)")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="Output pace; 0 for instant")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-statuses", type=int, nargs="+", default=[429, 500, 503])
+    parser.add_argument("--embedding-dim", type=int, default=768)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--responses", help="JSON file of recorded responses")
+    args = parser.parse_args()
+
+    responses = []
+    if args.responses:
+        with open(args.responses) as file:
+            responses = json.load(file)
+
+    config = FakeLLMConfig(
+        latency=args.latency,
+        tokens_per_sec=args.tokens_per_sec,
+        error_rate=args.error_rate,
+        error_statuses=args.error_statuses,
+        embedding_dim=args.embedding_dim,
+        seed=args.seed,
+        responses=responses
+    )
+
+    import uvicorn
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
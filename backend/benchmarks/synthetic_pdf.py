@@ -0,0 +1,101 @@
+import zlib
+import random
+from typing import List
+
+WORDS = (
+    "revenue growth market customers platform founders funding traction churn "
+    "margin runway valuation pipeline retention enterprise subscription segment "
+    "acquisition competitive advantage scalable recurring quarter forecast"
+).split()
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+LINE_HEIGHT = 14
+IMAGE_SIZE = 240
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_lines(rng: random.Random, page_no: int, lines_per_page: int) -> List[str]:
+    lines = [f"Synthetic page {page_no}"]
+    for _ in range(lines_per_page - 1):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(6, 12))]
+        words.append(f"${rng.randint(1, 999)}M")
+        lines.append(" ".join(words))
+    return lines
+
+
+def _noise_image(rng: random.Random) -> bytes:
+    """Grayscale noise; high entropy so the OCR stage does not skip it"""
+    return zlib.compress(bytes(rng.getrandbits(8) for _ in range(IMAGE_SIZE * IMAGE_SIZE)))
+
+
+def write_synthetic_pdf(
+    file_path: str,
+    pages: int,
+    lines_per_page: int = 40,
+    image_every: int = 0,
+    seed: int = 0
+) -> str:
+    """Write a deterministic text PDF of `pages` pages without any PDF library.
+
+    Every `image_every`-th page (0 disables) carries a single line of text
+    and an embedded image, so the OCR path has sparse pages to work on.
+    """
+    rng = random.Random(seed)
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>", 3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    page_ids = []
+    next_id = 4
+
+    for page_no in range(1, pages + 1):
+        has_image = bool(image_every) and page_no % image_every == 0
+        lines = _page_lines(rng, page_no, 1 if has_image else lines_per_page)
+
+        content = ["BT", "/F1 10 Tf", f"{LINE_HEIGHT} TL", f"50 {PAGE_HEIGHT - 50} Td"]
+        for line in lines:
+            content.append(f"({_escape(line)}) '")
+        content.append("ET")
+
+        resources = "/Font << /F1 3 0 R >>"
+        if has_image:
+            image_id = next_id
+            next_id += 1
+            data = _noise_image(rng)
+            objects[image_id] = (
+                f"<< /Type /XObject /Subtype /Image /Width {IMAGE_SIZE} /Height {IMAGE_SIZE} "
+                f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode /Length {len(data)} >>\n"
+                .encode() + b"stream\n" + data + b"\nendstream"
+            )
+            resources += f" /XObject << /Im1 {image_id} 0 R >>"
+            content.append(f"q {IMAGE_SIZE} 0 0 {IMAGE_SIZE} 50 300 cm /Im1 Do Q")
+
+        stream = "\n".join(content).encode("latin-1")
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        objects[content_id] = f"<< /Length {len(stream)} >>\n".encode() + b"stream\n" + stream + b"\nendstream"
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << {resources} >> /Contents {content_id} 0 R >>"
+        ).encode()
+        page_ids.append(page_id)
+
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[2] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(out)
+        out += f"{object_id} 0 obj\n".encode() + objects[object_id] + b"\nendobj\n"
+
+    xref_offset = len(out)
+    size = max(objects) + 1
+    out += f"xref\n0 {size}\n0000000000 65535 f \n".encode()
+    for object_id in range(1, size):
+        out += f"{offsets[object_id]:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+
+    with open(file_path, "wb") as file:
+        file.write(out)
+    return file_path
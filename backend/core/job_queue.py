@@ -0,0 +1,258 @@
+import json
+import uuid
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from core.database import SessionLocal
+from models.analysis import AnalysisJob
+
+try:
+    from core.websocket_manager import websocket_manager
+except ImportError:
+    websocket_manager = None
+
+
+# Kept off WebSocket pushes; the result can be large, so clients fetch it from the status endpoint
+PRIVATE_FIELDS = ('result', 'payload', 'user_id', 'username')
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def _jsonable(value: Any) -> Any:
+    """Round-trip through JSON so JSON columns never see types they can't store"""
+    return json.loads(json.dumps(value, default=str))
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def serialize_job(job: AnalysisJob, include_result: bool = True) -> Dict:
+    """Public view of a job, as returned by the status endpoint and pushed over WebSocket"""
+    data = {
+        'job_id': job.id,
+        'job_type': job.job_type,
+        'status': job.status,
+        'attempts': job.attempts,
+        'error': job.error,
+        'created_at': _isoformat(job.created_at),
+        'started_at': _isoformat(job.started_at),
+        'finished_at': _isoformat(job.finished_at),
+    }
+    if include_result:
+        data['result'] = job.result
+    return data
+
+
+class JobQueue:
+    """Durable background jobs on a bounded pool of asyncio workers.
+
+    Jobs are rows in the analysis_jobs table: `submit` stores the job and
+    its payload and returns straight away, and `workers` coroutines pick
+    jobs up and await `handler(job)`. A job is claimed with a conditional
+    update, so it runs at most once at a time. Status changes are written
+    to the row and pushed to the submitting user over WebSocket. A job
+    whose handler raises is queued again after `retry_delay` seconds,
+    doubling with each attempt, until it has run `max_attempts` times, and
+    then marked failed; a handler that returns a result with
+    status 'failed' is not retried. On `start`, jobs still queued, or left
+    running by a process that went away, are queued again, with the same
+    limit. Assumes one process serves the queue.
+    """
+
+    def __init__(self, job_type: str, handler: Callable[[Dict], Awaitable[Dict]],
+                 workers: int = 2, max_queued: int = 50, max_attempts: int = 3,
+                 retry_delay: float = 5.0):
+        self.job_type = job_type
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.max_attempts = max_attempts
+        self.retry_delay = max(0.0, retry_delay)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retries: Set[asyncio.TimerHandle] = set()
+
+    async def start(self):
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        recovered = await asyncio.to_thread(self._recover)
+        for job_id in recovered:
+            self._queue.put_nowait(job_id)
+        if recovered:
+            print(f"Re-queued {len(recovered)} {self.job_type} jobs from before restart")
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"{self.job_type}-worker-{index}")
+            for index in range(self.workers)
+        ]
+
+    async def stop(self):
+        """Stop the workers; jobs they were running stay 'running' and are recovered on the next start"""
+        # Jobs waiting out a retry delay stay 'queued' in the table, so start picks them up again
+        for handle in self._retries:
+            handle.cancel()
+        self._retries.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    async def submit(self, user_id: int, username: str, payload: Dict, job_id: Optional[str] = None) -> Dict:
+        await self.start()
+        if self._queue.qsize() >= self.max_queued:
+            raise JobQueueFull(f"{self._queue.qsize()} {self.job_type} jobs already queued")
+        job = await asyncio.to_thread(self._create, job_id or str(uuid.uuid4()), user_id, username, payload)
+        self._queue.put_nowait(job['job_id'])
+        await self._notify(username, job)
+        return job
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"{self.job_type} worker error on job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await asyncio.to_thread(self._claim, job_id)
+        if job is None:
+            # Already taken, or no longer queued
+            return
+        await self._notify(job['username'], job)
+
+        try:
+            result = await self.handler(job)
+            error = result.get('error') if result.get('status') == 'failed' else None
+        except Exception as e:
+            result, error = None, str(e)
+            if (job['attempts'] or 0) < self.max_attempts:
+                delay = self.retry_delay * 2 ** ((job['attempts'] or 1) - 1)
+                print(f"{self.job_type} job {job_id} failed on attempt {job['attempts']}, "
+                      f"retrying in {delay:g}s: {e}")
+                requeued = await asyncio.to_thread(self._requeue, job_id, error)
+                self._retry_later(job_id, delay)
+                await self._notify(job['username'], requeued)
+                return
+            print(f"{self.job_type} job {job_id} failed: {e}")
+
+        finished = await asyncio.to_thread(
+            self._finish, job_id, 'failed' if error else 'completed', result, error
+        )
+        await self._notify(job['username'], finished)
+
+    def _retry_later(self, job_id: str, delay: float):
+        def enqueue():
+            self._retries.discard(handle)
+            if self._queue is not None:
+                self._queue.put_nowait(job_id)
+
+        handle = asyncio.get_running_loop().call_later(delay, enqueue)
+        self._retries.add(handle)
+
+    async def _notify(self, username: str, job: Dict):
+        if not websocket_manager or not username:
+            return
+        await websocket_manager.send_user_message(username, {
+            'type': 'job_status',
+            **{key: value for key, value in job.items() if key not in PRIVATE_FIELDS},
+            'timestamp': datetime.now().isoformat()
+        })
+
+    # Database access; these run in worker threads
+
+    def _create(self, job_id: str, user_id: int, username: str, payload: Dict) -> Dict:
+        db = SessionLocal()
+        try:
+            job = AnalysisJob(
+                id=job_id,
+                job_type=self.job_type,
+                user_id=user_id,
+                username=username,
+                status='queued',
+                payload=_jsonable(payload),
+                attempts=0,
+                created_at=datetime.now()
+            )
+            db.add(job)
+            db.commit()
+            return serialize_job(job, include_result=False)
+        finally:
+            db.close()
+
+    def _claim(self, job_id: str) -> Optional[Dict]:
+        db = SessionLocal()
+        try:
+            claimed = db.query(AnalysisJob).filter(
+                AnalysisJob.id == job_id, AnalysisJob.status == 'queued'
+            ).update({
+                AnalysisJob.status: 'running',
+                AnalysisJob.started_at: datetime.now(),
+                AnalysisJob.attempts: AnalysisJob.attempts + 1
+            }, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                return None
+            job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+            return {
+                **serialize_job(job, include_result=False),
+                'user_id': job.user_id,
+                'username': job.username,
+                'payload': job.payload or {}
+            }
+        finally:
+            db.close()
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict], error: Optional[str]) -> Dict:
+        db = SessionLocal()
+        try:
+            job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+            job.status = status
+            job.result = _jsonable(result) if result is not None else None
+            job.error = error
+            job.finished_at = datetime.now()
+            db.commit()
+            return serialize_job(job, include_result=False)
+        finally:
+            db.close()
+
+    def _requeue(self, job_id: str, error: str) -> Dict:
+        db = SessionLocal()
+        try:
+            job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+            job.status = 'queued'
+            job.error = error
+            db.commit()
+            return serialize_job(job, include_result=False)
+        finally:
+            db.close()
+
+    def _recover(self) -> List[str]:
+        db = SessionLocal()
+        try:
+            jobs = db.query(AnalysisJob).filter(
+                AnalysisJob.job_type == self.job_type,
+                AnalysisJob.status.in_(('queued', 'running'))
+            ).order_by(AnalysisJob.created_at).all()
+            for job in jobs:
+                if job.status == 'running':
+                    if (job.attempts or 0) >= self.max_attempts:
+                        job.status = 'failed'
+                        job.error = f"Interrupted {job.attempts} times; giving up"
+                        job.finished_at = datetime.now()
+                    else:
+                        job.status = 'queued'
+            db.commit()
+            return [job.id for job in jobs if job.status == 'queued']
+        finally:
+            db.close()
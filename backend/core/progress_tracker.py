@@ -1,4 +1,3 @@
-import asyncio
 import time
 from datetime import datetime
 
@@ -26,9 +25,6 @@ class SimpleProgressTracker:
             message = custom_message or step["message"]
             
             print(f"Progress Update: Step {step_index + 1}/{self.total_steps} - {step['name']}: {message}")
-            
-            # Simulate some processing time
-            await asyncio.sleep(0.5)
     
     async def next_step(self, custom_message=None):
         """Move to next step"""
@@ -0,0 +1,195 @@
+import time
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass
+class TaskTiming:
+    name: str
+    status: str = "pending"  # pending, ok, failed, skipped
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    # Seconds since the graph started, so overlapping tasks are easy to see
+    start_offset: Optional[float] = None
+    duration: Optional[float] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class GraphResult:
+    results: Dict[str, Any]
+    errors: Dict[str, Exception]
+    timings: Dict[str, TaskTiming]
+    duration: float
+
+    def timings_dict(self) -> Dict[str, Dict]:
+        return {name: timing.to_dict() for name, timing in self.timings.items()}
+
+    def raise_first_error(self):
+        """Re-raise the first failure, for callers that treat any failed task as fatal"""
+        for error in self.errors.values():
+            raise error
+
+
+class TaskGraph:
+    """Runs named tasks as a dependency graph.
+
+    Each task is called with a dict of its dependencies' results and
+    starts as soon as all of them have finished. Tasks whose dependency
+    failed are skipped. `run` executes tasks on a thread pool; each task
+    runs in a copy of the caller's context so context variables (LLM
+    metrics captures, deadlines) follow it. `arun` runs the graph on the
+    event loop: coroutine functions are awaited and plain functions are
+    sent to worker threads.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers
+        self._tasks: Dict[str, Tuple[Callable, Tuple[str, ...]]] = {}
+
+    def add(self, name: str, fn: Callable[[Dict[str, Any]], Any], depends_on: Iterable[str] = ()) -> "TaskGraph":
+        if name in self._tasks:
+            raise ValueError(f"Duplicate task: {name}")
+        self._tasks[name] = (fn, tuple(depends_on))
+        return self
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def _validate(self):
+        for name, (_, depends_on) in self._tasks.items():
+            missing = [dep for dep in depends_on if dep not in self._tasks]
+            if missing:
+                raise ValueError(f"Task {name} depends on unknown tasks: {missing}")
+        # Kahn's algorithm; anything left over is on a cycle
+        remaining = {name: set(depends_on) for name, (_, depends_on) in self._tasks.items()}
+        while True:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                break
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        if remaining:
+            raise ValueError(f"Task graph has a cycle through: {sorted(remaining)}")
+
+    def _ready(self, timings: Dict[str, TaskTiming], started: set) -> Tuple[List[str], List[str]]:
+        """(tasks that can start now, tasks to skip because a dependency did not succeed)"""
+        ready, skipped = [], []
+        for name, (_, depends_on) in self._tasks.items():
+            if name in started:
+                continue
+            statuses = [timings[dep].status for dep in depends_on]
+            if any(status in ("failed", "skipped") for status in statuses):
+                skipped.append(name)
+            elif all(status == "ok" for status in statuses):
+                ready.append(name)
+        return ready, skipped
+
+    @staticmethod
+    @contextmanager
+    def _timed(timing: TaskTiming, graph_start: float):
+        timing.started_at = datetime.now().isoformat()
+        timing.start_offset = round(time.perf_counter() - graph_start, 4)
+        task_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing.duration = round(time.perf_counter() - task_start, 4)
+            timing.finished_at = datetime.now().isoformat()
+
+    @staticmethod
+    def _finish(name: str, error: Optional[BaseException], result: Any,
+                results: Dict[str, Any], errors: Dict[str, Exception], timings: Dict[str, TaskTiming]):
+        if error is None:
+            results[name] = result
+            timings[name].status = "ok"
+        else:
+            errors[name] = error
+            timings[name].status = "failed"
+            timings[name].error = f"{type(error).__name__}: {error}"
+
+    def _schedule(self, timings: Dict[str, TaskTiming], started: set, results: Dict[str, Any]):
+        """Mark newly skipped tasks and return (name, inputs) for tasks that can start"""
+        while True:
+            ready, skipped = self._ready(timings, started)
+            for name in skipped:
+                started.add(name)
+                timings[name].status = "skipped"
+            if ready or not skipped:
+                break
+            # A skip can cascade to its own dependents; look again
+        started.update(ready)
+        return [(name, {dep: results[dep] for dep in self._tasks[name][1]}) for name in ready]
+
+    def run(self) -> GraphResult:
+        self._validate()
+        graph_start = time.perf_counter()
+        results: Dict[str, Any] = {}
+        errors: Dict[str, Exception] = {}
+        timings = {name: TaskTiming(name) for name in self._tasks}
+        started: set = set()
+
+        def call(name: str, inputs: Dict[str, Any]):
+            with self._timed(timings[name], graph_start):
+                return self._tasks[name][0](inputs)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers or max(1, len(self._tasks)),
+                                thread_name_prefix="task-graph") as executor:
+            running = {}
+            while True:
+                for name, inputs in self._schedule(timings, started, results):
+                    future = executor.submit(contextvars.copy_context().run, call, name, inputs)
+                    running[future] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    error = future.exception()
+                    self._finish(name, error, None if error else future.result(), results, errors, timings)
+
+        return GraphResult(results, errors, timings, round(time.perf_counter() - graph_start, 4))
+
+    async def arun(self) -> GraphResult:
+        self._validate()
+        graph_start = time.perf_counter()
+        results: Dict[str, Any] = {}
+        errors: Dict[str, Exception] = {}
+        timings = {name: TaskTiming(name) for name in self._tasks}
+        started: set = set()
+
+        async def call(name: str, inputs: Dict[str, Any]):
+            fn = self._tasks[name][0]
+            with self._timed(timings[name], graph_start):
+                if asyncio.iscoroutinefunction(fn):
+                    return await fn(inputs)
+                return await asyncio.to_thread(fn, inputs)
+
+        running = {}
+        try:
+            while True:
+                for name, inputs in self._schedule(timings, started, results):
+                    running[asyncio.create_task(call(name, inputs))] = name
+                if not running:
+                    break
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    error = task.exception()
+                    self._finish(name, error, None if error else task.result(), results, errors, timings)
+        finally:
+            # Cancelled from outside (e.g. the client went away); stop whatever is still running
+            for task in running:
+                task.cancel()
+
+        return GraphResult(results, errors, timings, round(time.perf_counter() - graph_start, 4))
@@ -0,0 +1,101 @@
+import os
+import uuid
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from fastapi import UploadFile
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+
+@dataclass
+class StoredUpload:
+    filename: str
+    file_path: str
+    content_hash: str
+    size: int
+    deduplicated: bool
+
+
+class UploadStore:
+    """Content-addressed blob store for uploaded documents.
+
+    Uploads are streamed to disk in chunks and hashed while writing, so memory
+    stays flat regardless of file size. Identical content is stored once
+    across users and re-uploads. All disk I/O runs in worker threads.
+    """
+
+    def __init__(self, root: str = None, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        self.root = root or os.path.join(UPLOAD_DIR, "blobs")
+        self.chunk_size = chunk_size
+        self.tmp_dir = os.path.join(self.root, "tmp")
+
+    async def save(self, upload: UploadFile) -> StoredUpload:
+        """Stream an UploadFile into the store and return where it landed"""
+        await asyncio.to_thread(os.makedirs, self.tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(self.tmp_dir, f"{uuid.uuid4().hex}.part")
+
+        digest = hashlib.sha256()
+        size = 0
+        out = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            while True:
+                chunk = await upload.read(self.chunk_size)
+                if not chunk:
+                    break
+                await asyncio.to_thread(self._write_chunk, out, digest, chunk)
+                size += len(chunk)
+        except BaseException:
+            await asyncio.to_thread(out.close)
+            await asyncio.to_thread(self._discard, tmp_path)
+            raise
+        await asyncio.to_thread(out.close)
+
+        content_hash = digest.hexdigest()
+        ext = os.path.splitext(upload.filename or "")[1].lower()
+        blob_path = self.blob_path(content_hash, ext)
+        deduplicated = await asyncio.to_thread(self._commit, tmp_path, blob_path)
+
+        print(f"Stored upload {upload.filename} as {content_hash[:12]} ({size} bytes, deduplicated={deduplicated})")
+        return StoredUpload(
+            filename=upload.filename,
+            file_path=blob_path,
+            content_hash=content_hash,
+            size=size,
+            deduplicated=deduplicated
+        )
+
+    def blob_path(self, content_hash: str, ext: str = "") -> str:
+        """Location of a blob; the extension is kept so extractors can dispatch on it"""
+        return os.path.join(self.root, content_hash[:2], f"{content_hash}{ext}")
+
+    @staticmethod
+    def _write_chunk(out, digest, chunk: bytes):
+        digest.update(chunk)
+        out.write(chunk)
+
+    @staticmethod
+    def _commit(tmp_path: str, blob_path: str) -> bool:
+        """Move a finished upload into place; returns True when the blob already existed"""
+        if os.path.exists(blob_path):
+            os.remove(tmp_path)
+            return True
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        os.replace(tmp_path, blob_path)
+        return False
+
+    @staticmethod
+    def _discard(tmp_path: str):
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+# Shared store used by all upload endpoints
+upload_store = UploadStore()
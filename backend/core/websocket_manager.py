@@ -189,6 +189,30 @@ class WebSocketManager:
             "timestamp": datetime.now().isoformat()
         })
     
+    async def send_analysis_token(self, user_id: str, session_id: str, section: str, token: str, done: bool = False):
+        """Stream a chunk of an analysis section's LLM output to the user"""
+        await self.send_user_message(user_id, {
+            "type": "analysis_token",
+            "session_id": session_id,
+            "section": section,
+            "token": token,
+            "done": done,
+            "timestamp": datetime.now().isoformat()
+        })
+
+    async def send_chat_token(self, user_id: str, session_id: str, token: str, done: bool = False):
+        """Stream a chunk of a chat reply to the user"""
+        await self.send_user_message(user_id, {
+            "type": "chat_token",
+            "session_id": session_id,
+            "token": token,
+            "done": done,
+            "timestamp": datetime.now().isoformat()
+        })
+
+    def is_user_connected(self, user_id: str) -> bool:
+        return bool(self.user_connections.get(user_id))
+
     async def cleanup_session(self, session_id: str, delay: int = 0):
         """Clean up analysis session after delay"""
         if delay > 0:
@@ -3,8 +3,11 @@ import uvicorn
 import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import auth_routes, input_routes, chat_routes, comprehensive_analysis
+from routers import auth_routes, input_routes, chat_routes, comprehensive_analysis, metrics_routes
 from core.database import Base, engine
+from ml_services.extraction_engine import pdf_extraction_engine
+from ml_services.ocr_stage import ocr_stage
+from ml_services.llm_client import llm_client
 try:
     from core.websocket_manager import metrics_updater
 except ImportError:
@@ -27,6 +30,7 @@ app.include_router(auth_routes.router)
 app.include_router(input_routes.router)
 app.include_router(chat_routes.router)
 app.include_router(comprehensive_analysis.router, prefix="/api/v2", tags=["Comprehensive Analysis"])
+app.include_router(metrics_routes.router, tags=["Metrics"])
 
 # Start background tasks
 @app.on_event("startup")
@@ -34,6 +38,17 @@ async def startup_event():
     # Start metrics updater if available
     if metrics_updater:
         asyncio.create_task(metrics_updater.start_periodic_updates())
+    # Open LLM connections in the background so the first analysis skips the handshake
+    asyncio.create_task(llm_client.warm_up())
+    # Start analysis workers; picks up jobs left queued by a previous run
+    await comprehensive_analysis.analysis_job_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await comprehensive_analysis.analysis_job_queue.stop()
+    pdf_extraction_engine.shutdown()
+    ocr_stage.shutdown()
+    await llm_client.aclose()
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
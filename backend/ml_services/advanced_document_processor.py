@@ -1,8 +1,7 @@
 import os
 import json
 import re
-import PyPDF2
-import io
+from ml_services.document_extraction import document_extraction_service
 
 # Lazy import pandas to avoid startup delays
 pd = None
@@ -27,18 +26,6 @@ try:
 except ImportError:
     Presentation = None
 
-try:
-    import pytesseract
-    from PIL import Image
-except ImportError:
-    pytesseract = None
-    Image = None
-
-try:
-    import fitz  # PyMuPDF
-except ImportError:
-    fitz = None
-
 class AdvancedDocumentProcessor:
     def __init__(self):
         self.supported_formats = {
@@ -63,47 +50,15 @@ class AdvancedDocumentProcessor:
     
     def process_pdf(self, file_path):
         """Enhanced PDF processing with OCR"""
-        text_content = []
-        images = []
-        
-        if fitz:  # Use PyMuPDF if available
-            doc = fitz.open(file_path)
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text = page.get_text()
-                text_content.append(text)
-                
-                # OCR if available
-                if pytesseract and Image:
-                    image_list = page.get_images()
-                    for img_index, img in enumerate(image_list):
-                        try:
-                            xref = img[0]
-                            pix = fitz.Pixmap(doc, xref)
-                            if pix.n < 5:
-                                img_data = pix.tobytes("png")
-                                img_pil = Image.open(io.BytesIO(img_data))
-                                ocr_text = pytesseract.image_to_string(img_pil)
-                                if ocr_text.strip():
-                                    images.append({
-                                        'page': page_num + 1,
-                                        'text': ocr_text,
-                                        'type': 'chart_or_image'
-                                    })
-                            pix = None
-                        except:
-                            continue
-            doc.close()
-        else:  # Fallback to PyPDF2
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text_content.append(page.extract_text())
+        # Deep tier: per-page backend fallback plus selective OCR of sparse pages
+        extraction = document_extraction_service.extract(file_path, tier="deep", use_cache=False)
         
         return {
-            'text': '\n'.join(text_content),
-            'images': images,
-            'page_count': len(text_content)
+            'text': extraction.text,
+            'images': extraction.images,
+            'ocr_stats': extraction.ocr_stats,
+            'page_count': extraction.page_count,
+            'extraction': extraction.summary()
         }
     
     def process_docx(self, file_path):
@@ -162,37 +117,26 @@ class AdvancedDocumentProcessor:
             return {'error': str(e)}
     
     def process_excel(self, file_path):
-        """Process Excel files"""
+        """Process Excel files into per-sheet column summaries"""
         pd = get_pandas()
         if not pd:
             return {'error': 'pandas not installed'}
             
         try:
-            excel_data = pd.read_excel(file_path, sheet_name=None)
-            processed_sheets = {}
-            for sheet_name, df in excel_data.items():
-                processed_sheets[sheet_name] = {
-                    'data': df.to_dict('records'),
-                    'columns': df.columns.tolist(),
-                    'shape': df.shape
-                }
-            return processed_sheets
+            from ml_services.tabular_summary import tabular_summarizer
+            return tabular_summarizer.summarize_excel(file_path)
         except Exception as e:
             return {'error': str(e)}
     
     def process_csv(self, file_path):
-        """Process CSV files"""
+        """Process CSV files into a column summary"""
         pd = get_pandas()
         if not pd:
             return {'error': 'pandas not installed'}
             
         try:
-            df = pd.read_csv(file_path)
-            return {
-                'data': df.to_dict('records'),
-                'columns': df.columns.tolist(),
-                'shape': df.shape
-            }
+            from ml_services.tabular_summary import tabular_summarizer
+            return tabular_summarizer.summarize_csv(file_path)
         except Exception as e:
             return {'error': str(e)}
     
@@ -0,0 +1,205 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
+
+# Extracted text lives next to the uploads folder, e.g. ./uploads -> ./text_cache
+TEXT_CACHE_DIR = os.getenv(
+    "TEXT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(UPLOAD_DIR)), "text_cache")
+)
+TEXT_CACHE_MAX_ENTRIES = int(os.getenv("TEXT_CACHE_MAX_ENTRIES", "32"))
+# (path, size, mtime) -> content hash entries remembered, most recently used first
+FILE_HASH_MEMO_ENTRIES = int(os.getenv("FILE_HASH_MEMO_ENTRIES", "4096"))
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Compute the SHA-256 of a file without loading it into memory"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DocumentTextCache:
+    """Content-hash keyed cache of extracted document text, with metadata about its extraction.
+
+    Lookups go to an in-memory LRU first and then to an on-disk tier, so a
+    document is parsed once per upload and identical re-uploads skip
+    extraction entirely.
+    """
+
+    def __init__(self, cache_dir: str = TEXT_CACHE_DIR, max_entries: int = TEXT_CACHE_MAX_ENTRIES,
+                 max_file_hashes: int = FILE_HASH_MEMO_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_file_hashes = max(1, max_file_hashes)
+        self._memory: "OrderedDict[str, Tuple[str, Dict]]" = OrderedDict()
+        self._file_hashes: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Per-key extraction locks with the number of callers holding or waiting on each;
+        # a lock is dropped when its last caller is done
+        self._key_locks: Dict[str, List] = {}
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+
+    def file_hash(self, file_path: str) -> str:
+        """Content hash of a file, memoized by path, size and mtime"""
+        stat = os.stat(file_path)
+        file_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            content_hash = self._file_hashes.get(file_key)
+            if content_hash is not None:
+                self._file_hashes.move_to_end(file_key)
+        if content_hash is None:
+            content_hash = hash_file(file_path)
+            self._remember_hash(file_key, content_hash)
+        return content_hash
+
+    def remember_file_hash(self, file_path: str, content_hash: str):
+        """Seed the hash memo for a file whose hash is already known (e.g. from the upload store)"""
+        stat = os.stat(file_path)
+        file_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        self._remember_hash(file_key, content_hash)
+
+    def _remember_hash(self, file_key: Tuple[str, int, int], content_hash: str):
+        with self._lock:
+            self._file_hashes[file_key] = content_hash
+            self._file_hashes.move_to_end(file_key)
+            while len(self._file_hashes) > self.max_file_hashes:
+                self._file_hashes.popitem(last=False)
+
+    def cache_key(self, file_path: str, variant: str = "") -> str:
+        """Key of a file's text; `variant` separates results of different extraction settings"""
+        content_hash = self.file_hash(file_path)
+        return f"{content_hash}.{variant}" if variant else content_hash
+
+    def get(self, content_hash: str) -> Optional[str]:
+        """Return cached text for a content hash, or None"""
+        entry = self.get_entry(content_hash)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, content_hash: str) -> Optional[Tuple[str, Dict]]:
+        """Return cached (text, metadata) for a content hash, or None"""
+        with self._lock:
+            if content_hash in self._memory:
+                self._memory.move_to_end(content_hash)
+                self.stats['memory_hits'] += 1
+                return self._memory[content_hash]
+
+        disk_path = self._disk_path(content_hash)
+        if os.path.exists(disk_path):
+            try:
+                with open(disk_path, 'r', encoding='utf-8') as file:
+                    text = file.read()
+                metadata = self._read_metadata(content_hash)
+            except OSError as e:
+                print(f"Text cache read error for {content_hash[:12]}: {e}")
+                return None
+            self._remember(content_hash, text, metadata)
+            with self._lock:
+                self.stats['disk_hits'] += 1
+            return text, metadata
+
+        return None
+
+    def put(self, content_hash: str, text: str, metadata: Optional[Dict] = None):
+        """Store extracted text, and optionally metadata about its extraction, in both tiers"""
+        metadata = metadata or {}
+        self._remember(content_hash, text, metadata)
+
+        disk_path = self._disk_path(content_hash)
+        try:
+            os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            # Metadata first, so a reader that finds the text also finds its metadata
+            self._write_atomic(self._metadata_path(content_hash), json.dumps(metadata, default=str))
+            self._write_atomic(disk_path, text)
+        except OSError as e:
+            print(f"Text cache write error for {content_hash[:12]}: {e}")
+
+    def get_or_extract(self, file_path: str, extractor: Callable[[str], str], variant: str = "") -> str:
+        """Return the cached text for a file, running the extractor at most once per content hash.
+
+        `variant` separates results of different extraction settings for the same content.
+        """
+        return self.get_or_extract_entry(file_path, lambda path: (extractor(path), {}), variant)[0]
+
+    def get_or_extract_entry(self, file_path: str, extractor: Callable[[str], Tuple[str, Dict]],
+                             variant: str = "") -> Tuple[str, Dict]:
+        """Like get_or_extract, for an extractor that returns (text, metadata)"""
+        content_hash = self.cache_key(file_path, variant)
+
+        entry = self.get_entry(content_hash)
+        if entry is not None:
+            print(f"Text cache hit for {os.path.basename(file_path)} ({content_hash[:12]})")
+            return entry
+
+        # Serialize extraction per document so concurrent callers wait for one parse
+        with self._lock_for(content_hash):
+            entry = self.get_entry(content_hash)
+            if entry is None:
+                with self._lock:
+                    self.stats['misses'] += 1
+                print(f"Text cache miss for {os.path.basename(file_path)} ({content_hash[:12]}), extracting")
+                entry = extractor(file_path)
+                self.put(content_hash, *entry)
+        return entry
+
+    def _remember(self, content_hash: str, text: str, metadata: Dict):
+        with self._lock:
+            self._memory[content_hash] = (text, metadata)
+            self._memory.move_to_end(content_hash)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _read_metadata(self, content_hash: str) -> Dict:
+        # Entries written before metadata was stored have none
+        metadata_path = self._metadata_path(content_hash)
+        if not os.path.exists(metadata_path):
+            return {}
+        with open(metadata_path, 'r', encoding='utf-8') as file:
+            try:
+                return json.load(file)
+            except ValueError:
+                return {}
+
+    @staticmethod
+    def _write_atomic(path: str, content: str):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _lock_for(self, content_hash: str):
+        with self._lock:
+            entry = self._key_locks.setdefault(content_hash, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[content_hash]
+
+    def _disk_path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, content_hash[:2], f"{content_hash}.txt")
+
+    def _metadata_path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, content_hash[:2], f"{content_hash}.json")
+
+
+# Process-wide cache shared by every GenerateReports section
+document_text_cache = DocumentTextCache()
@@ -0,0 +1,249 @@
+import os
+import time
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from ml_services.document_cache import document_text_cache
+from ml_services.extraction_engine import pdf_extraction_engine, EXTRACTION_TIERS
+from ml_services.ocr_stage import ocr_stage
+
+load_dotenv()
+
+EXTRACTION_TIER = os.getenv("EXTRACTION_TIER", "standard")
+
+SUPPORTED_EXTENSIONS = {'.pdf', '.doc', '.docx', '.txt'}
+
+
+@dataclass
+class ExtractionResult:
+    text: str
+    tier: str
+    file_type: str
+    backend: Optional[str] = None
+    backends: Dict[str, int] = field(default_factory=dict)
+    page_count: int = 0
+    page_timings: List[Dict] = field(default_factory=list)
+    elapsed: float = 0.0
+    cached: bool = False
+    images: List[Dict] = field(default_factory=list)
+    ocr_stats: Dict = field(default_factory=dict)
+
+    def summary(self) -> Dict:
+        """Everything except the text itself, for analysis metadata"""
+        return {
+            'tier': self.tier,
+            'file_type': self.file_type,
+            'backend': self.backend,
+            'backends': self.backends,
+            'page_count': self.page_count,
+            'page_timings': self.page_timings,
+            'elapsed': round(self.elapsed, 4),
+            'cached': self.cached,
+            'text_length': len(self.text),
+            'ocr_stats': self.ocr_stats
+        }
+
+    def cache_metadata(self) -> Dict:
+        """What a cache hit needs to describe the original extraction"""
+        return {
+            'backend': self.backend,
+            'backends': self.backends,
+            'page_count': self.page_count,
+            'page_timings': self.page_timings,
+            'images': self.images,
+            'ocr_stats': self.ocr_stats
+        }
+
+    @classmethod
+    def from_cache(cls, text: str, metadata: Dict, tier: str, file_type: str, elapsed: float) -> "ExtractionResult":
+        # Entries cached before metadata was stored only say they came from the cache
+        return cls(
+            text=text,
+            tier=tier,
+            file_type=file_type,
+            backend=metadata.get('backend', 'cache'),
+            backends=metadata.get('backends', {}),
+            page_count=metadata.get('page_count', 0),
+            page_timings=metadata.get('page_timings', []),
+            elapsed=elapsed,
+            cached=True,
+            images=metadata.get('images', []),
+            ocr_stats=metadata.get('ocr_stats', {})
+        )
+
+
+class DocumentExtractionService:
+    """Single entry point for turning an uploaded document into text.
+
+    Tiers:
+    - fast: the preferred PDF backend only (PyMuPDF when installed)
+    - standard: preferred backend, falling back per page to PyPDF2 and then
+      pdfplumber when a page fails or yields no text
+    - deep: standard plus selective OCR of sparse-text pages
+
+    Results are cached by content hash and tier, so repeated calls for the
+    same document do not re-parse it.
+    """
+
+    def __init__(self, default_tier: str = EXTRACTION_TIER):
+        if default_tier not in EXTRACTION_TIERS:
+            raise ValueError(f"Unknown extraction tier: {default_tier}")
+        self.default_tier = default_tier
+
+    def extract(self, file_path: str, tier: str = None, use_cache: bool = True) -> ExtractionResult:
+        """Extract a document, reusing cached text when available"""
+        tier = self._tier(tier)
+
+        if not use_cache:
+            return self._extract(file_path, tier)
+
+        start = time.perf_counter()
+        fresh = {}
+
+        def run(path):
+            fresh['result'] = self._extract(path, tier)
+            return fresh['result'].text, fresh['result'].cache_metadata()
+
+        text, metadata = document_text_cache.get_or_extract_entry(file_path, run, variant=tier)
+        if 'result' in fresh:
+            return fresh['result']
+
+        return ExtractionResult.from_cache(
+            text, metadata, tier, os.path.splitext(file_path)[1].lower(), time.perf_counter() - start
+        )
+
+    async def aextract(self, file_path: str, tier: str = None, use_cache: bool = True) -> ExtractionResult:
+        """Async wrapper that keeps the event loop free during extraction"""
+        return await asyncio.to_thread(self.extract, file_path, tier, use_cache)
+
+    def iter_pages(self, file_path: str, tier: str = None, use_cache: bool = True) -> Iterator[Tuple[Optional[int], str]]:
+        """Yield (page_no, text) for a PDF as each page is extracted.
+
+        Deep-tier OCR text follows the pages, tagged with the page it came
+        from. Cached documents, and formats without pages, come back whole
+        with page_no None. A streamed PDF is cached once fully read, so
+        later `extract` calls don't parse it again.
+        """
+        tier = self._tier(tier)
+        if os.path.splitext(file_path)[1].lower() != '.pdf':
+            yield None, self.extract(file_path, tier, use_cache).text
+            return
+
+        cache_key = document_text_cache.cache_key(file_path, tier) if use_cache else None
+        if cache_key:
+            text = document_text_cache.get(cache_key)
+            if text is not None:
+                print(f"Text cache hit for {os.path.basename(file_path)} ({cache_key[:12]})")
+                yield None, text
+                return
+
+        result = ExtractionResult(text="", tier=tier, file_type='.pdf')
+        yield from self._iter_pdf(file_path, tier, result)
+        if cache_key:
+            document_text_cache.put(cache_key, result.text, result.cache_metadata())
+
+    def _tier(self, tier: Optional[str]) -> str:
+        tier = tier or self.default_tier
+        if tier not in EXTRACTION_TIERS:
+            raise ValueError(f"Unknown extraction tier: {tier}")
+        return tier
+
+    def _extract(self, file_path: str, tier: str) -> ExtractionResult:
+        file_ext = os.path.splitext(file_path)[1].lower()
+
+        if file_ext == '.pdf':
+            return self._extract_pdf(file_path, tier)
+        elif file_ext in ['.doc', '.docx']:
+            return self._extract_single_part(file_path, tier, self._read_word)
+        elif file_ext == '.txt':
+            return self._extract_single_part(file_path, tier, self._read_txt)
+        else:
+            raise ValueError(f"Unsupported file type: {file_ext}")
+
+    def _extract_pdf(self, file_path: str, tier: str) -> ExtractionResult:
+        result = ExtractionResult(text="", tier=tier, file_type='.pdf')
+        for _ in self._iter_pdf(file_path, tier, result):
+            pass
+        print(f"Extracted {len(result.text)} characters from PDF ({tier} tier, backends {result.backends})")
+        return result
+
+    def _iter_pdf(self, file_path: str, tier: str, result: ExtractionResult) -> Iterator[Tuple[int, str]]:
+        """Yield (page_no, text) page by page, filling in `result` once the document is done.
+
+        Per-page stats are recorded as each page arrives. Page text is kept
+        until the end because deep-tier OCR and the cached result need the
+        whole document, so streaming lets consumers start early rather than
+        lowering peak memory.
+        """
+        start = time.perf_counter()
+        page_texts = []
+        backends = Counter()
+        for record in pdf_extraction_engine.iter_page_records(file_path, tier):
+            page_texts.append(record.text)
+            backends[record.backend or 'none'] += 1
+            result.page_timings.append({
+                'page': record.page_no,
+                'backend': record.backend,
+                'seconds': round(record.seconds, 4),
+                'chars': len(record.text)
+            })
+            yield record.page_no, record.text
+
+        if tier == "deep":
+            if ocr_stage.is_available():
+                ocr_result = ocr_stage.process_pdf(file_path, page_texts)
+                result.images, result.ocr_stats = ocr_result['images'], ocr_result['stats']
+                for image in result.images:
+                    page_texts[image['page'] - 1] += "\n" + image['text']
+                    yield image['page'], image['text']
+            else:
+                print("OCR not available (PyMuPDF, pytesseract and Pillow required); deep tier runs without OCR")
+
+        result.text = "\n".join(text for text in page_texts if text.strip())
+        result.backend = backends.most_common(1)[0][0] if backends else None
+        result.backends = dict(backends)
+        result.page_count = len(page_texts)
+        result.elapsed = time.perf_counter() - start
+
+    def _extract_single_part(self, file_path: str, tier: str, reader) -> ExtractionResult:
+        start = time.perf_counter()
+        text, backend = reader(file_path)
+        elapsed = time.perf_counter() - start
+        print(f"Extracted {len(text)} characters from {os.path.basename(file_path)} using {backend}")
+        return ExtractionResult(
+            text=text,
+            tier=tier,
+            file_type=os.path.splitext(file_path)[1].lower(),
+            backend=backend,
+            backends={backend: 1},
+            page_count=1,
+            page_timings=[{'page': 1, 'backend': backend, 'seconds': round(elapsed, 4), 'chars': len(text)}],
+            elapsed=elapsed
+        )
+
+    @staticmethod
+    def _read_word(file_path: str):
+        try:
+            import docx2txt
+            return docx2txt.process(file_path), 'docx2txt'
+        except ImportError:
+            from docx import Document
+            doc = Document(file_path)
+            return "\n".join([paragraph.text for paragraph in doc.paragraphs]), 'python-docx'
+
+    @staticmethod
+    def _read_txt(file_path: str):
+        for encoding in ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']:
+            try:
+                with open(file_path, 'r', encoding=encoding) as file:
+                    return file.read(), f'text/{encoding}'
+            except UnicodeDecodeError:
+                continue
+        raise ValueError(f"Could not decode text file: {file_path}")
+
+
+# Shared service; every extractor in the app goes through it
+document_extraction_service = DocumentExtractionService()
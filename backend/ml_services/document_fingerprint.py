@@ -0,0 +1,131 @@
+import os
+import re
+import hashlib
+from typing import Dict, Iterable, List
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FINGERPRINT_CHUNK_SIZE = int(os.getenv("FINGERPRINT_CHUNK_SIZE", "2000"))
+# A chunk also ends after any paragraph whose hash is divisible by this, so
+# boundaries depend on content rather than position (about 4 paragraphs a chunk)
+FINGERPRINT_BOUNDARY_DIVISOR = 4
+# Bump when chunking or the terms below change, so stored fingerprints stop matching
+FINGERPRINT_VERSION = "3"
+
+# A chunk is an input to every agent whose terms it mentions. Terms are whole
+# words (with the listed suffixes), and words common to every section of a
+# pitch deck (team, cost, user, active, opportunity...) are left out so that
+# a chunk only feeds the agents it is actually about.
+AGENT_INPUT_TERMS = {
+    'founder': r"(?:co-?)?founders?|founding team|ceo|cto|coo|exits?|acquired|mba|phd|stanford|harvard|mit|berkeley|leadership",
+    'market': r"markets?|tam|sam|som|industry|industries|segments?|competitors?|competition|cagr|demand|trends?",
+    'traction': r"customers?|clients?|(?:paying|active) users|revenue|arr|mrr|growth|retention|churn|pipeline|pilots?|partnerships?|mau|dau|gmv",
+    'finance': r"revenue|burn(?: rate)?|runway|margins?|cac|ltv|ebitda|cash flow|profit(?:s|ability)?|loss(?:es)?|p&l|expenses?|forecasts?|projections?|funding|raise|raising|valuation|budgets?",
+    'risk': r"risks?|regulat(?:ion|ions|ory)|compliance|legal|competitors?|competition|dependen(?:cy|cies|ce|t)|challenges?|uncertain(?:ty|ties)?|threats?|churn|runway|burn",
+}
+# Whole words only, so "market" doesn't match "marketing" nor "exit" "existing"
+_AGENT_INPUT_PATTERNS = {
+    agent: re.compile(rf"(?<![\w&])(?:{terms})(?![\w&])", re.IGNORECASE) for agent, terms in AGENT_INPUT_TERMS.items()
+}
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _is_boundary(paragraph: str) -> bool:
+    return int(hash_text(paragraph)[:8], 16) % FINGERPRINT_BOUNDARY_DIVISOR == 0
+
+
+def split_chunks(text: str, size: int = FINGERPRINT_CHUNK_SIZE) -> List[str]:
+    """Paragraph-aligned chunks of at most about `size` characters.
+
+    Chunks end at content-defined paragraphs as well as at the size
+    limit, so an edit only moves the boundaries up to the next such
+    paragraph and the chunks after it keep their hashes.
+    """
+    chunks, current = [], ""
+    for paragraph in re.split(r'\n\s*\n', text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        # Hard-split paragraphs that are longer than a chunk on their own
+        for start in range(0, len(paragraph), size):
+            piece = paragraph[start:start + size]
+            if current and len(current) + len(piece) + 2 > size:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n\n{piece}" if current else piece
+        if _is_boundary(paragraph):
+            chunks.append(current)
+            current = ""
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def relevant_agents(chunk: str) -> List[str]:
+    return [agent for agent, pattern in _AGENT_INPUT_PATTERNS.items() if pattern.search(chunk)]
+
+
+def fingerprint_file(text: str) -> Dict:
+    """Text and per-chunk hashes of one extracted document, stored in UploadedFile.file_metadata"""
+    return {
+        'fingerprint_version': FINGERPRINT_VERSION,
+        'text_hash': hash_text(text),
+        'chunks': [
+            {'hash': hash_text(chunk), 'length': len(chunk), 'agents': relevant_agents(chunk)}
+            for chunk in split_chunks(text)
+        ]
+    }
+
+
+def select_agent_inputs(texts: Iterable[str], selective: bool = True) -> Dict[str, Dict]:
+    """Each agent's input text and fingerprints over a project's documents, in document order.
+
+    An agent's selection is the chunks that mention its terms. One that
+    matches nothing falls back to the primary (first non-empty)
+    document's chunks, so its input doesn't change when other documents
+    are added or edited. `selected_fingerprint` is the hash of the
+    selection's chunk hashes; it changes only when a chunk the agent
+    selects is added, removed or edited, and is what incremental runs
+    compare.
+
+    With selective=True the agent reads its selection and `fingerprint`
+    equals `selected_fingerprint`. With selective=False it reads the whole
+    text and `fingerprint` covers every chunk; `selected_fingerprint` is
+    still computed so a later incremental run can match it. An agent
+    re-run incrementally therefore reads less than a fresh analysis does,
+    and can score the same documents differently; a fresh analysis is the
+    full-text baseline.
+    """
+    texts = list(texts)
+    all_chunks: List[str] = []
+    primary_chunks: List[str] = []
+    selected: Dict[str, List[str]] = {agent: [] for agent in AGENT_INPUT_TERMS}
+    for text in texts:
+        chunks = split_chunks(text)
+        if not primary_chunks:
+            primary_chunks = chunks
+        for chunk in chunks:
+            all_chunks.append(chunk)
+            for agent in relevant_agents(chunk):
+                selected[agent].append(chunk)
+
+    full_fingerprint = _chunks_fingerprint('full', all_chunks)
+    inputs = {}
+    for agent, chunks in selected.items():
+        chunks = chunks or primary_chunks
+        selected_fingerprint = _chunks_fingerprint('selected', chunks)
+        inputs[agent] = {
+            'text': "\n\n".join(chunks) if selective else "\n\n".join(texts),
+            'fingerprint': selected_fingerprint if selective else full_fingerprint,
+            'selected_fingerprint': selected_fingerprint,
+            'chunks': len(chunks) if selective else len(all_chunks)
+        }
+    return inputs
+
+
+def _chunks_fingerprint(mode: str, chunks: List[str]) -> str:
+    return hash_text("\n".join([FINGERPRINT_VERSION, mode] + [hash_text(chunk) for chunk in chunks]))
@@ -2,23 +2,41 @@ import os
 import json
 import re
 from typing import Dict, List, Tuple
-from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
 import statistics
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from ml_services.llm_client import llm_client
 
 load_dotenv()
 
+# Primary and secondary scores within this many points skip the validator
+ENSEMBLE_AGREEMENT_TOLERANCE = int(os.getenv("ENSEMBLE_AGREEMENT_TOLERANCE", "10"))
+
+_ensemble_executor = None
+_ensemble_executor_lock = threading.Lock()
+
+
+def get_ensemble_executor() -> ThreadPoolExecutor:
+    """Threads shared by every analyzer; llm_client caps the requests actually in flight"""
+    global _ensemble_executor
+    with _ensemble_executor_lock:
+        if _ensemble_executor is None:
+            _ensemble_executor = ThreadPoolExecutor(max_workers=llm_client.max_concurrency, thread_name_prefix="ensemble")
+        return _ensemble_executor
+
 class EnhancedAIAnalyzer:
     def __init__(self):
         self.groq_api_key = os.getenv("GROQ_API_KEY")
         self.model_name = os.getenv("LLM_MODEL_NAME", "llama-3.1-8b-instant")
         
-        # Initialize multiple models for ensemble
+        # Ensemble members come from the process-wide model registry
         self.models = {
-            'primary': ChatGroq(groq_api_key=self.groq_api_key, model_name=self.model_name, temperature=0.1),
-            'secondary': ChatGroq(groq_api_key=self.groq_api_key, model_name=self.model_name, temperature=0.3),
-            'validator': ChatGroq(groq_api_key=self.groq_api_key, model_name=self.model_name, temperature=0.0)
+            'primary': llm_client.get(self.model_name, temperature=0.1),
+            'secondary': llm_client.get(self.model_name, temperature=0.3),
+            'validator': llm_client.get(self.model_name, temperature=0.0)
         }
         
         self.confidence_thresholds = {
@@ -27,24 +45,33 @@ class EnhancedAIAnalyzer:
             'low': 0.4
         }
     
-    def analyze_with_confidence(self, prompt: str, data: str, analysis_type: str) -> Dict:
-        """Analyze with confidence scoring using ensemble approach"""
-        
-        # Get multiple predictions
-        predictions = []
-        for model_name, model in self.models.items():
-            try:
-                response = model.invoke(f"{prompt}\n\nData: {data}")
-                score, text = self.extract_score_and_text(response.content)
-                predictions.append({
-                    'model': model_name,
-                    'score': score,
-                    'text': text,
-                    'raw_response': response.content
-                })
-            except Exception as e:
-                print(f"Error with {model_name}: {e}")
-                continue
+    def analyze_with_confidence(self, prompt: str, data: str, analysis_type: str, use_cache: bool = True) -> Dict:
+        """Analyze with confidence scoring using ensemble approach.
+
+        Primary and secondary run concurrently. The validator is only
+        started once they have finished and disagree by more than
+        ENSEMBLE_AGREEMENT_TOLERANCE; when they agree it never runs and
+        `early_stop` is set.
+        """
+        full_prompt = f"{prompt}\n\nData: {data}"
+        executor = get_ensemble_executor()
+        futures = {
+            model_name: self.submit(executor, model_name, full_prompt, analysis_type, use_cache)
+            for model_name in ('primary', 'secondary')
+        }
+        
+        # exception() waits for the member to finish; failed members are dropped
+        predictions = [
+            futures[model_name].result()
+            for model_name in ('primary', 'secondary')
+            if futures[model_name].exception() is None
+        ]
+        
+        early_stop = self.members_agree(predictions)
+        if not early_stop:
+            validator = self.submit(executor, 'validator', full_prompt, analysis_type, use_cache)
+            if validator.exception() is None:
+                predictions.append(validator.result())
         
         if not predictions:
             return self.get_fallback_response(analysis_type)
@@ -59,10 +86,37 @@ class EnhancedAIAnalyzer:
             'confidence': confidence_score,
             'confidence_level': self.get_confidence_level(confidence_score),
             'model_agreement': len(predictions),
+            'early_stop': early_stop,
             'individual_predictions': predictions,
             'analysis_type': analysis_type
         }
     
+    def submit(self, executor: ThreadPoolExecutor, model_name: str, prompt: str, analysis_type: str, use_cache: bool):
+        # Each member runs in a copy of the caller's context so LLM metrics captures follow it
+        return executor.submit(contextvars.copy_context().run, self.predict, model_name, prompt, analysis_type, use_cache)
+    
+    def predict(self, model_name: str, prompt: str, analysis_type: str = None, use_cache: bool = True) -> Dict:
+        """One ensemble member's prediction; runs in the ensemble executor"""
+        try:
+            response = llm_client.invoke(
+                prompt, self.models[model_name], use_cache=use_cache, name=f"{analysis_type}/{model_name}"
+            )
+        except Exception as e:
+            print(f"Error with {model_name}: {e}")
+            raise
+        score, text = self.extract_score_and_text(response.content)
+        return {
+            'model': model_name,
+            'score': score,
+            'text': text,
+            'raw_response': response.content
+        }
+    
+    def members_agree(self, predictions: List[Dict]) -> bool:
+        """True when two valid scores are within the agreement tolerance"""
+        scores = [p['score'] for p in predictions if p['score'] > 0]
+        return len(scores) == 2 and abs(scores[0] - scores[1]) <= ENSEMBLE_AGREEMENT_TOLERANCE
+    
     def calculate_consensus(self, predictions: List[Dict]) -> Dict:
         """Calculate consensus from multiple model predictions"""
         scores = [p['score'] for p in predictions if p['score'] > 0]
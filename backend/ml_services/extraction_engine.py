@@ -0,0 +1,238 @@
+import os
+import time
+import asyncio
+import importlib.util
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Size of the process pool shared by every upload
+EXTRACTION_POOL_WORKERS = int(os.getenv("EXTRACTION_POOL_WORKERS", str(os.cpu_count() or 2)))
+# Maximum number of page ranges a single document may have in flight at once
+EXTRACTION_MAX_WORKERS_PER_DOC = int(os.getenv("EXTRACTION_MAX_WORKERS_PER_DOC", "4"))
+EXTRACTION_PAGES_PER_RANGE = int(os.getenv("EXTRACTION_PAGES_PER_RANGE", "8"))
+
+# PDF backends in order of preference; PyMuPDF is by far the fastest
+PDF_BACKENDS = ("pymupdf", "pypdf2", "pdfplumber")
+_BACKEND_MODULES = {"pymupdf": "fitz", "pypdf2": "PyPDF2", "pdfplumber": "pdfplumber"}
+
+EXTRACTION_TIERS = ("fast", "standard", "deep")
+
+
+class PageRecord(NamedTuple):
+    page_no: int
+    text: str
+    backend: Optional[str]
+    seconds: float
+
+
+def available_pdf_backends() -> List[str]:
+    """PDF backends importable in this environment, in preference order"""
+    return [
+        backend for backend in PDF_BACKENDS
+        if importlib.util.find_spec(_BACKEND_MODULES[backend]) is not None
+    ]
+
+
+def backends_for_tier(tier: str) -> Tuple[str, ...]:
+    """Fast uses only the preferred backend; standard and deep fall back page by page"""
+    if tier not in EXTRACTION_TIERS:
+        raise ValueError(f"Unknown extraction tier: {tier}")
+    backends = available_pdf_backends()
+    if not backends:
+        raise RuntimeError("No PDF extraction backend installed (PyMuPDF, PyPDF2 or pdfplumber)")
+    return tuple(backends[:1]) if tier == "fast" else tuple(backends)
+
+
+class _PageReaders:
+    """Opens each backend lazily, only when a page actually needs it"""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._readers = {}
+
+    def page_count(self, backend: str) -> int:
+        reader = self._open(backend)
+        return len(reader) if backend == "pymupdf" else len(reader.pages)
+
+    def extract(self, backend: str, page_index: int) -> str:
+        reader = self._open(backend)
+        if backend == "pymupdf":
+            return reader.load_page(page_index).get_text()
+        page = reader.pages[page_index]
+        text = page.extract_text() or ""
+        if backend == "pdfplumber":
+            # pdfplumber keeps every parsed layout object alive until the page is closed
+            page.close()
+        return text
+
+    def _open(self, backend: str):
+        if backend not in self._readers:
+            if backend == "pymupdf":
+                import fitz
+                self._readers[backend] = fitz.open(self.file_path)
+            elif backend == "pypdf2":
+                import PyPDF2
+                self._readers[backend] = PyPDF2.PdfReader(self.file_path)
+            elif backend == "pdfplumber":
+                import pdfplumber
+                self._readers[backend] = pdfplumber.open(self.file_path)
+            else:
+                raise ValueError(f"Unknown PDF backend: {backend}")
+        return self._readers[backend]
+
+    def close(self):
+        for backend, reader in self._readers.items():
+            if backend in ("pymupdf", "pdfplumber"):
+                reader.close()
+        self._readers = {}
+
+
+def extract_pdf_page_range(file_path: str, start: int, end: int, backends: Sequence[str]) -> List[PageRecord]:
+    """Extract pages [start, end) of a PDF; runs inside a pool worker process.
+
+    Each page is tried with the backends in order, moving to the next one
+    only when a backend raises or returns no text.
+    """
+    records = []
+    readers = _PageReaders(file_path)
+    try:
+        for page_index in range(start, end):
+            page_start = time.perf_counter()
+            text, used_backend = "", None
+            for backend in backends:
+                try:
+                    text = readers.extract(backend, page_index)
+                except Exception as page_error:
+                    print(f"{backend} failed on page {page_index + 1}: {page_error}")
+                    continue
+                used_backend = backend
+                if text.strip():
+                    break
+            records.append(PageRecord(page_index + 1, text, used_backend, time.perf_counter() - page_start))
+    finally:
+        readers.close()
+    return records
+
+
+def count_pdf_pages(file_path: str, backends: Sequence[str]) -> int:
+    """Return the number of pages in a PDF using the first backend that can open it"""
+    last_error = None
+    for backend in backends:
+        readers = _PageReaders(file_path)
+        try:
+            return readers.page_count(backend)
+        except Exception as e:
+            last_error = e
+        finally:
+            readers.close()
+    raise RuntimeError(f"Could not open PDF {file_path}: {last_error}")
+
+
+def split_page_ranges(page_count: int, pages_per_range: int) -> List[Tuple[int, int]]:
+    """Split [0, page_count) into consecutive (start, end) ranges"""
+    pages_per_range = max(1, pages_per_range)
+    return [
+        (start, min(start + pages_per_range, page_count))
+        for start in range(0, page_count, pages_per_range)
+    ]
+
+
+class PDFExtractionEngine:
+    """Extracts PDF pages in parallel on a bounded process pool.
+
+    A document is split into page ranges that are extracted in worker
+    processes and merged back in page order. Each document keeps at most
+    `max_workers_per_document` ranges in flight so one huge upload cannot
+    starve the others; the same limit bounds how many extracted ranges
+    wait in the engine while a consumer iterates over `iter_pages`.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = EXTRACTION_POOL_WORKERS,
+        max_workers_per_document: int = EXTRACTION_MAX_WORKERS_PER_DOC,
+        pages_per_range: int = EXTRACTION_PAGES_PER_RANGE
+    ):
+        self.max_workers = max(1, max_workers)
+        self.max_workers_per_document = max(1, max_workers_per_document)
+        self.pages_per_range = max(1, pages_per_range)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn avoids forking a process that already runs threads
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def iter_page_records(self, file_path: str, tier: str = "standard") -> Iterator[PageRecord]:
+        """Yield a PageRecord per page, in page order, as soon as each page range is ready.
+
+        Later ranges keep extracting in the pool while the caller consumes
+        the first pages. Abandoning the generator cancels ranges that have
+        not started yet.
+        """
+        start_time = time.perf_counter()
+        backends = backends_for_tier(tier)
+        page_count = count_pdf_pages(file_path, backends)
+        ranges = split_page_ranges(page_count, self.pages_per_range)
+
+        if len(ranges) <= 1 or self.max_workers_per_document == 1:
+            # Not worth a round trip through the pool; stream range by range
+            for start, end in ranges:
+                yield from extract_pdf_page_range(file_path, start, end, backends)
+        else:
+            pending = deque()
+            remaining = deque(ranges)
+            try:
+                while remaining or pending:
+                    while remaining and len(pending) < self.max_workers_per_document:
+                        start, end = remaining.popleft()
+                        pending.append(self.executor.submit(extract_pdf_page_range, file_path, start, end, backends))
+                    yield from pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+        elapsed = time.perf_counter() - start_time
+        print(f"Extracted {page_count} pages from {os.path.basename(file_path)} "
+              f"in {len(ranges)} ranges with {'/'.join(backends)} ({elapsed:.2f}s)")
+
+    def iter_pages(self, file_path: str, tier: str = "standard") -> Iterator[Tuple[int, str]]:
+        """Yield (page_no, text) in page order as soon as each page range is ready"""
+        for record in self.iter_page_records(file_path, tier):
+            yield record.page_no, record.text
+
+    def extract_pages(self, file_path: str, tier: str = "standard") -> List[Tuple[int, str]]:
+        """Extract every page as (page_no, text), in page order"""
+        return list(self.iter_pages(file_path, tier))
+
+    def extract_text(self, file_path: str, tier: str = "standard") -> str:
+        """Extract the whole document as newline-joined page text"""
+        return "\n".join(text for _, text in self.iter_pages(file_path, tier) if text.strip())
+
+    async def aextract_text(self, file_path: str, tier: str = "standard") -> str:
+        """Async wrapper that keeps the event loop free while pages are extracted"""
+        return await asyncio.to_thread(self.extract_text, file_path, tier)
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+# Process-wide engine shared by all extractors
+pdf_extraction_engine = PDFExtractionEngine()
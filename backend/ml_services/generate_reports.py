@@ -1,20 +1,36 @@
 import os
+import re
+import json
 import sqlite3
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
+from ml_services.document_extraction import document_extraction_service
+from ml_services.llm_client import llm_client
+from ml_services.section_retriever import section_retriever
 
 load_dotenv()
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME")
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Send the document once for all sections instead of once per section
+COMBINED_ANALYSIS = os.getenv("COMBINED_ANALYSIS", "false").lower() == "true"
+
+REPORT_SECTIONS = (
+    "founders_profile",
+    "market_problem",
+    "unique_differentiator",
+    "business_metrics",
+    "risk_factor",
+    "recommended_next_steps"
+)
+
 class GenerateReports:
 
-    def __init__(self, username, file_path, query):
+    def __init__(self, username, file_path, query, use_cache=True):
         print(username, file_path, query)
         self.query = query
+        # False forces a fresh LLM answer instead of a cached one
+        self.use_cache = use_cache
         
         # Load prompts from PostgreSQL database
         import psycopg2
@@ -41,17 +57,9 @@ class GenerateReports:
         self.file_path = file_path
         self.username = username
         
-        # Initialize LLM
+        # Shared process-wide LLM client
         try:
-            print(f"Initializing GROQ with model: {LLM_MODEL_NAME}")
-            self.llm = ChatGroq(
-                groq_api_key=GROQ_API_KEY,
-                model_name=LLM_MODEL_NAME,
-                temperature=0.1,  # Low temperature for consistent results
-                max_tokens=2048,
-                top_p=0.9
-            )
-            print("GROQ LLM initialized successfully")
+            self.llm = llm_client.llm
         except Exception as e:
             print(f"GROQ initialization error: {str(e)}")
             self.llm = None
@@ -63,83 +71,10 @@ class GenerateReports:
             if not os.path.exists(self.file_path):
                 raise Exception(f"File not found: {self.file_path}")
             
-            text = ""
-            file_ext = os.path.splitext(self.file_path)[1].lower()
-            
-            if file_ext == '.pdf':
-                # PDF extraction methods
-                try:
-                    # Method 1: PyPDF2
-                    import PyPDF2
-                    with open(self.file_path, 'rb') as file:
-                        pdf_reader = PyPDF2.PdfReader(file)
-                        print(f"PDF has {len(pdf_reader.pages)} pages")
-                        
-                        for page_num, page in enumerate(pdf_reader.pages):
-                            try:
-                                page_text = page.extract_text()
-                                if page_text and page_text.strip():
-                                    text += page_text + "\n"
-                                    print(f"Page {page_num + 1}: {len(page_text)} chars")
-                            except Exception as page_error:
-                                print(f"Error on page {page_num + 1}: {page_error}")
-                                continue
-                                
-                except Exception as pypdf_error:
-                    print(f"PyPDF2 failed: {pypdf_error}")
-                    
-                    # Method 2: Try pdfplumber as fallback
-                    try:
-                        import pdfplumber
-                        with pdfplumber.open(self.file_path) as pdf:
-                            for page_num, page in enumerate(pdf.pages):
-                                page_text = page.extract_text()
-                                if page_text:
-                                    text += page_text + "\n"
-                                    print(f"pdfplumber page {page_num + 1}: {len(page_text)} chars")
-                    except ImportError:
-                        print("pdfplumber not available")
-                    except Exception as plumber_error:
-                        print(f"pdfplumber failed: {plumber_error}")
-                        
-            elif file_ext in ['.doc', '.docx']:
-                # DOC/DOCX extraction
-                try:
-                    import docx2txt
-                    text = docx2txt.process(self.file_path)
-                    print(f"Extracted {len(text)} characters from DOC/DOCX")
-                except ImportError:
-                    try:
-                        from docx import Document
-                        doc = Document(self.file_path)
-                        text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-                        print(f"Extracted {len(text)} characters from DOCX using python-docx")
-                    except Exception as docx_error:
-                        print(f"DOCX extraction failed: {docx_error}")
-                except Exception as doc_error:
-                    print(f"DOC extraction failed: {doc_error}")
-                    
-            elif file_ext == '.txt':
-                # TXT extraction
-                try:
-                    with open(self.file_path, 'r', encoding='utf-8') as file:
-                        text = file.read()
-                    print(f"Extracted {len(text)} characters from TXT")
-                except UnicodeDecodeError:
-                    # Try different encodings
-                    for encoding in ['latin-1', 'cp1252', 'iso-8859-1']:
-                        try:
-                            with open(self.file_path, 'r', encoding=encoding) as file:
-                                text = file.read()
-                            print(f"Extracted {len(text)} characters from TXT using {encoding}")
-                            break
-                        except UnicodeDecodeError:
-                            continue
-                except Exception as txt_error:
-                    print(f"TXT extraction failed: {txt_error}")
-                    
-            else:
-                raise Exception(f"Unsupported file type: {file_ext}")
+            # Shared extraction service; cached by content hash across sections
+            extraction = document_extraction_service.extract(self.file_path)
+            self.extraction_summary = extraction.summary()
+            text = extraction.text
             
             # Clean and validate extracted text
             text = text.strip()
@@ -183,8 +118,8 @@ Funding: Seeking $50M Series C to expand internationally and develop new product
             print("Using minimal fallback content for testing")
         
     def get_context(self):
-        # Use the extracted document text as context
-        self.context = self.document_text
+        # Section-scoped chunks when retrieval is enabled, otherwise the whole document
+        self.context, self.retrieval = section_retriever.context_for(self.file_path, self.query, self.document_text)
 
     def create_prompt_template(self):
         if self.query == "founders_profile":
@@ -217,29 +152,110 @@ Funding: Seeking $50M Series C to expand internationally and develop new product
 
     def generate_response(self):
         try:
-            if self.llm is None:
-                raise Exception("LLM not initialized - check GROQ API key")
-            
-            print(f"Sending {len(self.prompt)} character prompt to LLM for {self.query}")
-            print(f"Document context length: {len(self.context)} characters")
-            
-            # Ensure prompt is properly formatted
-            if not self.prompt or len(self.prompt.strip()) < 50:
-                raise Exception("Prompt is too short or empty")
-            
-            response = self.llm.invoke(self.prompt)
-            
-            if not response or not response.content:
-                raise Exception("Empty response from LLM")
-            
-            self.response = response.content.strip()
-            print(f"LLM Response received: {len(self.response)} characters")
-            print(f"Response preview: {self.response[:300]}...")
-            
+            self.check_prompt()
+            response = llm_client.invoke(self.prompt, self.llm, use_cache=self.use_cache, name=self.query)
+            self.store_response(response)
         except Exception as e:
             print(f"LLM Error for {self.query}: {str(e)}")
             raise Exception(f"LLM analysis failed for {self.query}: {str(e)}")
 
+    async def agenerate_response(self, on_token=None):
+        """Async variant of generate_response; the event loop stays free while the LLM works.
+
+        `on_token` is an async callback that receives the response text as it streams in.
+        """
+        try:
+            self.check_prompt()
+            response = await llm_client.ainvoke(
+                self.prompt, self.llm, use_cache=self.use_cache, on_token=on_token, name=self.query
+            )
+            self.store_response(response)
+        except Exception as e:
+            print(f"LLM Error for {self.query}: {str(e)}")
+            raise Exception(f"LLM analysis failed for {self.query}: {str(e)}")
+
+    def create_combined_prompt(self):
+        """Build one prompt carrying the document once plus every section instruction"""
+        if not hasattr(self, 'context') or not self.context:
+            raise Exception("No document context available for analysis")
+        
+        instructions = "\n\n".join(
+            f"### {section}\n{getattr(self, section).replace('{pitch}', 'the pitch document above')}"
+            for section in REPORT_SECTIONS
+        )
+        keys = ", ".join(f'"{section}"' for section in REPORT_SECTIONS)
+        
+        self.prompt = f"""PITCH DOCUMENT:
+{self.context}
+
+Complete each of the following analysis tasks about the pitch document above.
+
+{instructions}
+
+Respond with a single JSON object and nothing else. It must have exactly these keys: {keys}.
+Each value must be an object {{"text": "<the full analysis for that task>", "score": <integer from 0 to 100>}}."""
+        print(f"Formatted combined prompt for {len(REPORT_SECTIONS)} sections ({len(self.prompt)} chars)")
+
+    async def agenerate_combined_response(self, on_token=None):
+        """Run the combined prompt in a single LLM call"""
+        try:
+            self.check_prompt()
+            response = await llm_client.ainvoke(
+                self.prompt, llm_client.profile('report_combined'), use_cache=self.use_cache, on_token=on_token,
+                name='combined'
+            )
+            self.store_response(response)
+        except Exception as e:
+            print(f"LLM Error for combined analysis: {str(e)}")
+            raise Exception(f"LLM combined analysis failed: {str(e)}")
+
+    def parse_combined_response(self):
+        """Return {section: {'text', 'score'}} for every section that parsed cleanly"""
+        match = re.search(r'\{.*\}', self.response, re.DOTALL)
+        if not match:
+            print("Combined response contained no JSON object")
+            return {}
+        try:
+            payload = json.loads(match.group(0))
+        except json.JSONDecodeError as e:
+            print(f"Combined response is not valid JSON: {e}")
+            return {}
+        
+        sections = {}
+        for section in REPORT_SECTIONS:
+            entry = payload.get(section)
+            if not isinstance(entry, dict):
+                continue
+            text = entry.get('text')
+            try:
+                score = int(float(entry.get('score')))
+            except (TypeError, ValueError):
+                continue
+            if isinstance(text, str) and text.strip() and 0 <= score <= 100:
+                sections[section] = {'text': text.strip(), 'score': score}
+        
+        print(f"Combined response parsed {len(sections)}/{len(REPORT_SECTIONS)} sections")
+        return sections
+
+    def check_prompt(self):
+        if self.llm is None:
+            raise Exception("LLM not initialized - check GROQ API key")
+        
+        print(f"Sending {len(self.prompt)} character prompt to LLM for {self.query}")
+        print(f"Document context length: {len(self.context)} characters")
+        
+        # Ensure prompt is properly formatted
+        if not self.prompt or len(self.prompt.strip()) < 50:
+            raise Exception("Prompt is too short or empty")
+
+    def store_response(self, response):
+        if not response or not response.content:
+            raise Exception("Empty response from LLM")
+        
+        self.response = response.content.strip()
+        print(f"LLM Response received: {len(self.response)} characters")
+        print(f"Response preview: {self.response[:300]}...")
+
 
     def get_suggestion_and_score(self):
         import re
@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+from ml_services.document_cache import TEXT_CACHE_DIR
+
+load_dotenv()
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(TEXT_CACHE_DIR, "llm_cache.sqlite3"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+# Expired rows are purged, and the row count re-read, once every this many writes
+LLM_CACHE_PURGE_EVERY = int(os.getenv("LLM_CACHE_PURGE_EVERY", "100"))
+# Memory hits refresh the row's last_access in batches of this many keys
+LLM_CACHE_TOUCH_BATCH = int(os.getenv("LLM_CACHE_TOUCH_BATCH", "64"))
+
+
+def prompt_text(prompt) -> str:
+    """Stable text form of a prompt: a plain string or a list of messages"""
+    if isinstance(prompt, str):
+        return prompt
+    return json.dumps(
+        [list(message[:2]) if isinstance(message, (tuple, list)) else [message.type, message.content]
+         for message in prompt],
+        ensure_ascii=False
+    )
+
+
+def llm_settings(llm) -> Tuple:
+    """(model, temperature, max_tokens, top_p) of a ChatGroq instance"""
+    return (
+        llm.model_name,
+        llm.temperature,
+        llm.max_tokens,
+        (llm.model_kwargs or {}).get('top_p')
+    )
+
+
+class LLMResponseCache:
+    """Cache of LLM responses keyed by model settings and prompt hash.
+
+    An in-memory LRU sits in front of a SQLite table. Entries expire after
+    `ttl_seconds`, and the table is trimmed to `max_entries` by least
+    recent use. Writes keep a running row count instead of counting the
+    table; expired rows are purged, and the count re-read, every
+    `purge_every` writes. Memory hits are written back to the rows'
+    last_access in batches of `touch_batch`.
+    """
+
+    def __init__(
+        self,
+        db_path: str = LLM_CACHE_PATH,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        enabled: bool = LLM_CACHE_ENABLED,
+        purge_every: int = LLM_CACHE_PURGE_EVERY,
+        touch_batch: int = LLM_CACHE_TOUCH_BATCH
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.purge_every = max(1, purge_every)
+        self.touch_batch = max(1, touch_batch)
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._row_count: Optional[int] = None
+        # key -> time of memory hits not yet written to last_access
+        self._touched: Dict[str, float] = {}
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'writes': 0}
+
+    @staticmethod
+    def make_key(llm, prompt) -> str:
+        settings = llm_settings(llm)
+        prompt_hash = hashlib.sha256(prompt_text(prompt).encode('utf-8')).hexdigest()
+        return hashlib.sha256(json.dumps([*settings, prompt_hash]).encode('utf-8')).hexdigest()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Callers hold self._lock; one connection is shared across threads
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_last_access ON llm_responses(last_access)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response text for a key, or None when missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    self._touched[key] = now
+                    if len(self._touched) >= self.touch_batch:
+                        try:
+                            self._flush_touched()
+                            self.conn.commit()
+                        except sqlite3.Error as e:
+                            print(f"LLM cache write error: {e}")
+                    return response
+                del self._memory[key]
+
+            try:
+                row = self.conn.execute(
+                    "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] > self.ttl_seconds:
+                    self.conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    self.conn.commit()
+                    if self._row_count is not None:
+                        self._row_count -= 1
+                    self.stats['expired'] += 1
+                    row = None
+                if row is not None:
+                    self.conn.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key))
+                    self.conn.commit()
+            except sqlite3.Error as e:
+                print(f"LLM cache read error: {e}")
+                row = None
+
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            self.stats['disk_hits'] += 1
+            self._remember(key, row[0], row[1])
+            return row[0]
+
+    def put(self, key: str, response: str, model: str = None):
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            try:
+                if self._row_count is None:
+                    self._row_count = self._count_rows()
+                exists = self.conn.execute("SELECT 1 FROM llm_responses WHERE key = ?", (key,)).fetchone()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, model, response, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, model, response, now, now)
+                )
+                self.stats['writes'] += 1
+                if exists is None:
+                    self._row_count += 1
+                self._flush_touched()
+                self._evict(now)
+                self.conn.commit()
+            except sqlite3.Error as e:
+                print(f"LLM cache write error: {e}")
+
+    def _remember(self, key: str, response: str, created_at: float):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _count_rows(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+    def _flush_touched(self):
+        if not self._touched:
+            return
+        touched, self._touched = self._touched, {}
+        self.conn.executemany(
+            "UPDATE llm_responses SET last_access = ? WHERE key = ? AND last_access < ?",
+            [(accessed, key, accessed) for key, accessed in touched.items()]
+        )
+
+    def _evict(self, now: float):
+        expired = 0
+        if self.stats['writes'] % self.purge_every == 0:
+            expired = self.conn.execute(
+                "DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+            # Re-read now and then, in case another process shares the file
+            self._row_count = self._count_rows()
+        overflow = self._row_count - self.max_entries
+        evicted = 0
+        if overflow > 0:
+            evicted = self.conn.execute(
+                "DELETE FROM llm_responses WHERE key IN "
+                "(SELECT key FROM llm_responses ORDER BY last_access LIMIT ?)",
+                (overflow,)
+            ).rowcount
+            self._row_count -= evicted
+        self.stats['evictions'] += expired + evicted
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 3) if lookups else 0.0
+        stats['memory_entries'] = len(self._memory)
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._flush_touched()
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"LLM cache write error: {e}")
+                self._conn.close()
+                self._conn = None
+
+
+# Process-wide response cache used by llm_client
+llm_response_cache = LLMResponseCache()
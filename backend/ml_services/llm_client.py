@@ -0,0 +1,575 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+import groq
+import httpx
+from langchain_core.messages import AIMessage
+
+from ml_services.llm_cache import llm_response_cache, prompt_text, llm_settings
+from ml_services.llm_scheduler import llm_scheduler
+from ml_services.llm_metrics import llm_metrics, LLMCallRecord
+
+load_dotenv()
+
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "llama-3.1-8b-instant")
+# GROQ_BASE_URL is what the Groq SDK itself reads, so one setting moves every
+# client (e.g. to benchmarks/fake_llm_server.py for offline load tests)
+GROQ_API_BASE = os.getenv("GROQ_API_BASE") or os.getenv("GROQ_BASE_URL", "https://api.groq.com")
+# Maximum LLM requests in flight per process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "6"))
+# Output budget for the single-call six-section report (combined mode)
+LLM_COMBINED_MAX_TOKENS = int(os.getenv("LLM_COMBINED_MAX_TOKENS", "8192"))
+# Connection pool shared by every registered model
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+LLM_HTTP_KEEPALIVE_SECONDS = float(os.getenv("LLM_HTTP_KEEPALIVE_SECONDS", "300"))
+LLM_HTTP_TIMEOUT_SECONDS = float(os.getenv("LLM_HTTP_TIMEOUT_SECONDS", "60"))
+# Retries of transient failures (429, 5xx, timeouts, dropped connections) with jittered backoff
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "8"))
+# Overall budget for one call, retries and hedges included
+LLM_REQUEST_DEADLINE_SECONDS = float(os.getenv("LLM_REQUEST_DEADLINE_SECONDS", "120"))
+# Send a duplicate request when the first is slower than the model's observed p95
+LLM_HEDGING = os.getenv("LLM_HEDGING", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+LATENCY_SAMPLES = 200
+
+# Named model settings used across the app; each resolves to one registry entry
+LLM_PROFILES = {
+    'report': {'temperature': 0.1, 'max_tokens': 2048, 'top_p': 0.9},
+    'report_combined': {'temperature': 0.1, 'max_tokens': LLM_COMBINED_MAX_TOKENS, 'top_p': 0.9},
+    'assistant': {'temperature': 0.3},
+    'chat': {'model': 'llama-3.1-8b-instant', 'temperature': 0.7, 'max_tokens': 500},
+    'ensemble_primary': {'temperature': 0.1},
+    'ensemble_secondary': {'temperature': 0.3},
+    'ensemble_validator': {'temperature': 0.0},
+    'agent': {'temperature': 0.1},
+}
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """The call ran out of its deadline before any attempt succeeded"""
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, groq.APIStatusError):
+        return error.status_code in RETRY_STATUSES
+    # APIConnectionError covers timeouts and dropped connections
+    return isinstance(error, (groq.APIConnectionError, httpx.TransportError))
+
+
+def retry_after_seconds(error: Exception) -> float:
+    response = getattr(error, 'response', None)
+    try:
+        return float(response.headers.get('retry-after', 0)) if response is not None else 0.0
+    except ValueError:
+        return 0.0
+
+
+class ConcurrencyLimiter:
+    """One cap on requests in flight, shared by coroutines and worker threads.
+
+    A thread lock guards the count. Callers that find it full queue in
+    arrival order, and `release` hands the slot straight to the next
+    waiter: a coroutine is woken on its own event loop, a thread through
+    an Event. Use `async with` on the event loop and `with` in threads.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def _enter(self, wake) -> bool:
+        """Take a free slot, or queue `wake` and return False"""
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return True
+            self._waiters.append(wake)
+            return False
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                if self._waiters.popleft()():
+                    # Handed over; the count stays the same
+                    return
+            self.active -= 1
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake() -> bool:
+            try:
+                loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+                return True
+            except RuntimeError:
+                # The waiter's loop is closed
+                return False
+
+        if self._enter(wake):
+            return self
+        try:
+            await granted
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove(wake)
+                    handed = False
+                except ValueError:
+                    handed = True
+            if handed:
+                # The slot arrived as the caller went away; pass it on
+                self.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+    def __enter__(self):
+        granted = threading.Event()
+
+        def wake() -> bool:
+            granted.set()
+            return True
+
+        if not self._enter(wake):
+            granted.wait()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class LLMClient:
+    """Process-wide registry of Groq chat models.
+
+    Models are keyed by (model, temperature, max_tokens, top_p) and live
+    for the whole process. They share one keep-alive HTTP connection pool
+    (sync and async), so requests reuse warm TLS connections instead of
+    paying a handshake per call. Async callers go through `ainvoke`, which uses
+    the native async client; synchronous callers running in worker threads
+    use `invoke`. `max_concurrency` caps the requests in flight across
+    both together. Every API call is first admitted by
+    llm_scheduler, which keeps the process inside the provider's rate
+    limits and lets interactive calls jump queued batch work.
+
+    Transient failures are retried with full-jitter backoff inside a
+    per-call deadline. With LLM_HEDGING, a call still running at its
+    model's observed p95 latency gets a duplicate request and the first
+    to finish wins; streamed calls are never hedged.
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.max_concurrency = max(1, max_concurrency)
+        self._models: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+        self._http_client = None
+        self._http_async_client = None
+        self.limiter = ConcurrencyLimiter(self.max_concurrency)
+        self._hedge_executor = None
+        self._latencies: Dict[Tuple, deque] = {}
+        self.stats = {'calls': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0, 'deadline_exceeded': 0, 'failures': 0}
+
+    @property
+    def http_client(self) -> httpx.Client:
+        if self._http_client is None:
+            with self._lock:
+                if self._http_client is None:
+                    self._http_client = httpx.Client(limits=self._limits(), timeout=LLM_HTTP_TIMEOUT_SECONDS)
+        return self._http_client
+
+    @property
+    def http_async_client(self) -> httpx.AsyncClient:
+        if self._http_async_client is None:
+            with self._lock:
+                if self._http_async_client is None:
+                    self._http_async_client = httpx.AsyncClient(limits=self._limits(), timeout=LLM_HTTP_TIMEOUT_SECONDS)
+        return self._http_async_client
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS,
+            keepalive_expiry=LLM_HTTP_KEEPALIVE_SECONDS
+        )
+
+    def get(
+        self,
+        model: Optional[str] = None,
+        temperature: float = 0.1,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None
+    ):
+        """Return the long-lived ChatGroq for these settings, creating it on first use"""
+        model = model or LLM_MODEL_NAME
+        key = (model, temperature, max_tokens, top_p)
+        llm = self._models.get(key)
+        if llm is None:
+            # Build the HTTP clients before taking the registry lock; they lock too
+            http_client, http_async_client = self.http_client, self.http_async_client
+            with self._lock:
+                llm = self._models.get(key)
+                if llm is None:
+                    from langchain_groq import ChatGroq
+
+                    print(f"Initializing GROQ model {model} (temperature={temperature}, max_tokens={max_tokens})")
+                    options = {'max_tokens': max_tokens} if max_tokens else {}
+                    if top_p is not None:
+                        options['model_kwargs'] = {'top_p': top_p}
+                    llm = ChatGroq(
+                        groq_api_key=GROQ_API_KEY,
+                        model_name=model,
+                        temperature=temperature,
+                        groq_api_base=GROQ_API_BASE,
+                        http_client=http_client,
+                        http_async_client=http_async_client,
+                        # Retries are handled by _acall/_call so they respect the deadline and the scheduler
+                        max_retries=0,
+                        **options
+                    )
+                    self._models[key] = llm
+        return llm
+
+    def profile(self, name: str):
+        """Registry entry for one of LLM_PROFILES"""
+        return self.get(**LLM_PROFILES[name])
+
+    @property
+    def llm(self):
+        """The shared report model"""
+        return self.profile('report')
+
+    async def warm_up(self):
+        """Create every profile's model and open pooled connections before the first request"""
+        for name in LLM_PROFILES:
+            self.profile(name)
+        try:
+            response = await self.http_async_client.get(
+                f"{GROQ_API_BASE}/openai/v1/models",
+                headers={'Authorization': f"Bearer {GROQ_API_KEY}"}
+            )
+            print(f"LLM client warmed up: {len(self._models)} models, API status {response.status_code}")
+        except httpx.HTTPError as e:
+            print(f"LLM warm-up request failed: {e}")
+
+    async def ainvoke(
+        self,
+        prompt,
+        llm=None,
+        use_cache: bool = False,
+        on_token=None,
+        priority: str = 'batch',
+        deadline_seconds: float = LLM_REQUEST_DEADLINE_SECONDS,
+        name: Optional[str] = None
+    ):
+        """Call the model without blocking the event loop.
+
+        With `use_cache`, identical (settings, prompt) pairs are answered
+        from the response cache instead of the API. With `on_token`, the
+        response is streamed and each chunk of text is awaited through
+        `on_token(text)` as it arrives; a cache hit arrives as one chunk.
+        The full message is returned either way. `priority` is a
+        llm_scheduler priority name: 'interactive' or 'batch'. Raises
+        LLMDeadlineExceeded when `deadline_seconds` runs out. `name`
+        labels the call (section, agent) in llm_metrics.
+        """
+        llm = llm or self.llm
+        record = LLMCallRecord(model=llm.model_name, name=name or 'unnamed')
+        try:
+            key = None
+            if use_cache and llm_response_cache.enabled:
+                key = llm_response_cache.make_key(llm, prompt)
+                cached = await asyncio.to_thread(llm_response_cache.get, key)
+                if cached is not None:
+                    record.cache_hit = True
+                    if on_token is not None:
+                        await on_token(cached)
+                    return self._cached_message(cached)
+
+            response = await self._acall(prompt, llm, on_token, priority, time.monotonic() + deadline_seconds, record)
+            record.set_usage(response)
+
+            if key and response.content:
+                await asyncio.to_thread(llm_response_cache.put, key, response.content, llm.model_name)
+            return response
+        except Exception as e:
+            record.error = type(e).__name__
+            raise
+        finally:
+            llm_metrics.record(record)
+
+    async def _acall(self, prompt, llm, on_token, priority, deadline, record):
+        """Retry loop around one (possibly hedged) request"""
+        self.stats['calls'] += 1
+        emitted = []
+
+        async def tracked_on_token(text):
+            emitted.append(len(text))
+            await on_token(text)
+
+        attempt = 0
+        while True:
+            try:
+                return await self._ahedged(prompt, llm, on_token and tracked_on_token, priority, deadline, record)
+            except Exception as e:
+                # A stream that already reached the caller cannot be replayed
+                delay = None if emitted else self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    self._count_failure(e)
+                    raise
+                print(f"LLM call failed ({type(e).__name__}: {e}); retry {attempt + 1}/{LLM_MAX_RETRIES} in {delay:.2f}s")
+                self.stats['retries'] += 1
+                record.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _ahedged(self, prompt, llm, on_token, priority, deadline, record):
+        hedge_after = None if on_token is not None else self._hedge_delay(llm)
+        primary = asyncio.ensure_future(self._aattempt(prompt, llm, on_token, priority, record))
+        pending, hedge, error = {primary}, None, None
+        try:
+            if hedge_after is not None and time.monotonic() + hedge_after < deadline:
+                done, _ = await asyncio.wait(pending, timeout=hedge_after)
+                if not done:
+                    hedge = asyncio.ensure_future(self._aattempt(prompt, llm, None, priority, record, hedge=True))
+                    pending.add(hedge)
+                    self.stats['hedges'] += 1
+                    record.hedged = True
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise LLMDeadlineExceeded(f"LLM call exceeded its deadline ({llm.model_name})")
+                for task in done:
+                    if task.cancelled():
+                        continue
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.stats['hedge_wins'] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error or asyncio.CancelledError()
+        finally:
+            for task in pending:
+                task.cancel()
+                # Retrieve the loser's outcome so a failure is not logged as never retrieved
+                task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def _aattempt(self, prompt, llm, on_token, priority, record, hedge=False):
+        """One admitted API request; queue time counts the scheduler and the concurrency cap"""
+        queued = time.monotonic()
+        ticket = await llm_scheduler.acquire(priority, llm_scheduler.estimate_tokens(prompt_text(prompt), llm.max_tokens))
+        response = None
+        try:
+            async with self.limiter:
+                start = time.monotonic()
+                if not hedge:
+                    record.queue_wait += start - queued
+                if on_token is None:
+                    response = await llm.ainvoke(prompt)
+                else:
+                    response = await self._astream(prompt, llm, on_token, record)
+                record.first_token()
+                self._record_latency(llm, time.monotonic() - start)
+        finally:
+            llm_scheduler.settle(ticket, self._used_tokens(response))
+        return response
+
+    @staticmethod
+    async def _astream(prompt, llm, on_token, record) -> AIMessage:
+        chunks, usage = [], None
+        async for chunk in llm.astream(prompt):
+            # Groq reports usage on the final chunk
+            usage = getattr(chunk, 'usage_metadata', None) or usage
+            if chunk.content:
+                record.first_token()
+                chunks.append(chunk.content)
+                await on_token(chunk.content)
+        return AIMessage(content="".join(chunks), response_metadata={'streamed': True}, usage_metadata=usage)
+
+    def invoke(
+        self,
+        prompt,
+        llm=None,
+        use_cache: bool = False,
+        priority: str = 'batch',
+        deadline_seconds: float = LLM_REQUEST_DEADLINE_SECONDS,
+        name: Optional[str] = None
+    ):
+        """Blocking call for code that already runs off the event loop.
+
+        Same retry, deadline and hedging policy as `ainvoke`. A blocking
+        request cannot be interrupted, so without hedging the deadline is
+        checked between attempts and the HTTP timeout bounds each one.
+        """
+        llm = llm or self.llm
+        record = LLMCallRecord(model=llm.model_name, name=name or 'unnamed')
+        try:
+            key = None
+            if use_cache and llm_response_cache.enabled:
+                key = llm_response_cache.make_key(llm, prompt)
+                cached = llm_response_cache.get(key)
+                if cached is not None:
+                    record.cache_hit = True
+                    return self._cached_message(cached)
+
+            response = self._call(prompt, llm, priority, time.monotonic() + deadline_seconds, record)
+            record.set_usage(response)
+
+            if key and response.content:
+                llm_response_cache.put(key, response.content, llm.model_name)
+            return response
+        except Exception as e:
+            record.error = type(e).__name__
+            raise
+        finally:
+            llm_metrics.record(record)
+
+    def _call(self, prompt, llm, priority, deadline, record):
+        self.stats['calls'] += 1
+        attempt = 0
+        while True:
+            try:
+                return self._hedged(prompt, llm, priority, deadline, record)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    self._count_failure(e)
+                    raise
+                print(f"LLM call failed ({type(e).__name__}: {e}); retry {attempt + 1}/{LLM_MAX_RETRIES} in {delay:.2f}s")
+                self.stats['retries'] += 1
+                record.retries += 1
+                attempt += 1
+                time.sleep(delay)
+
+    def _hedged(self, prompt, llm, priority, deadline, record):
+        hedge_after = self._hedge_delay(llm)
+        if hedge_after is None or time.monotonic() + hedge_after >= deadline:
+            return self._attempt(prompt, llm, priority, record)
+
+        # The losing request cannot be cancelled; it finishes in the background and is discarded
+        primary = self.hedge_executor.submit(self._attempt, prompt, llm, priority, record)
+        pending, hedge, error = {primary}, None, None
+        done, _ = wait(pending, timeout=hedge_after)
+        if not done:
+            hedge = self.hedge_executor.submit(self._attempt, prompt, llm, priority, record, True)
+            pending.add(hedge)
+            self.stats['hedges'] += 1
+            record.hedged = True
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                raise LLMDeadlineExceeded(f"LLM call exceeded its deadline ({llm.model_name})")
+            for future in done:
+                if future.cancelled():
+                    continue
+                if future.exception() is None:
+                    if future is hedge:
+                        self.stats['hedge_wins'] += 1
+                    return future.result()
+                error = future.exception()
+        raise error or CancelledError()
+
+    def _attempt(self, prompt, llm, priority, record, hedge=False):
+        queued = time.monotonic()
+        ticket = llm_scheduler.acquire_sync(priority, llm_scheduler.estimate_tokens(prompt_text(prompt), llm.max_tokens))
+        response = None
+        try:
+            with self.limiter:
+                start = time.monotonic()
+                if not hedge:
+                    record.queue_wait += start - queued
+                response = llm.invoke(prompt)
+                record.first_token()
+                self._record_latency(llm, time.monotonic() - start)
+        finally:
+            llm_scheduler.settle(ticket, self._used_tokens(response))
+        return response
+
+    @property
+    def hedge_executor(self) -> ThreadPoolExecutor:
+        if self._hedge_executor is None:
+            with self._lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(
+                        max_workers=self.max_concurrency * 2, thread_name_prefix="llm-hedge"
+                    )
+        return self._hedge_executor
+
+    def _retry_delay(self, error: Exception, attempt: int, deadline: float) -> Optional[float]:
+        """Seconds to wait before retrying, or None when the error is final or the deadline is too close"""
+        if attempt >= LLM_MAX_RETRIES or not is_retryable(error):
+            return None
+        backoff = random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+        delay = max(backoff, retry_after_seconds(error))
+        if time.monotonic() + delay >= deadline:
+            return None
+        return delay
+
+    def _count_failure(self, error: Exception):
+        self.stats['deadline_exceeded' if isinstance(error, LLMDeadlineExceeded) else 'failures'] += 1
+
+    def _record_latency(self, llm, seconds: float):
+        key = llm_settings(llm)
+        samples = self._latencies.get(key)
+        if samples is None:
+            samples = self._latencies.setdefault(key, deque(maxlen=LATENCY_SAMPLES))
+        samples.append(seconds)
+
+    def _hedge_delay(self, llm) -> Optional[float]:
+        """Observed latency percentile for these model settings, once enough calls were seen"""
+        if not LLM_HEDGING:
+            return None
+        samples = sorted(self._latencies.get(llm_settings(llm), ()))
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * LLM_HEDGE_PERCENTILE))]
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
+
+    @staticmethod
+    def _used_tokens(response) -> Optional[int]:
+        """Total tokens the API reported, when it did"""
+        usage = getattr(response, 'usage_metadata', None)
+        return usage.get('total_tokens') if usage else None
+
+    @staticmethod
+    def _cached_message(content: str) -> AIMessage:
+        return AIMessage(content=content, response_metadata={'cache_hit': True})
+
+    async def aclose(self):
+        with self._lock:
+            http_client, http_async_client = self._http_client, self._http_async_client
+            self._http_client = self._http_async_client = None
+            self._models = {}
+        if http_async_client is not None:
+            await http_async_client.aclose()
+        if http_client is not None:
+            http_client.close()
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+            self._hedge_executor = None
+        llm_response_cache.close()
+
+
+# Shared client used by every LLM caller in the process
+llm_client = LLMClient()
@@ -0,0 +1,225 @@
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+RETRY_BUCKETS = (0, 1, 2, 3, 5)
+
+HISTOGRAM_BUCKETS = {
+    'latency_seconds': LATENCY_BUCKETS,
+    'time_to_first_token_seconds': LATENCY_BUCKETS,
+    'queue_wait_seconds': LATENCY_BUCKETS,
+    'prompt_tokens': TOKEN_BUCKETS,
+    'completion_tokens': TOKEN_BUCKETS,
+    'retries': RETRY_BUCKETS,
+}
+
+
+class Histogram:
+    """Fixed-bucket histogram; quantiles are interpolated within a bucket"""
+
+    def __init__(self, buckets: Tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "Histogram"):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else min(self.min, self.buckets[0])
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                value = lower + (upper - lower) * (rank - seen) / count
+                return min(max(value, self.min), self.max)
+            seen += count
+        return self.max
+
+    def to_dict(self, buckets: bool = True) -> Dict:
+        summary = {
+            'count': self.count,
+            'sum': round(self.sum, 4),
+            'mean': round(self.sum / self.count, 4) if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self._rounded(self.quantile(0.5)),
+            'p95': self._rounded(self.quantile(0.95)),
+            'p99': self._rounded(self.quantile(0.99)),
+        }
+        if buckets:
+            cumulative, running = {}, 0
+            for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+                running += count
+                cumulative[f"le_{bound}"] = running
+            summary['buckets'] = cumulative
+        return summary
+
+    @staticmethod
+    def _rounded(value: Optional[float]) -> Optional[float]:
+        return round(value, 4) if value is not None else None
+
+
+@dataclass
+class LLMCallRecord:
+    """Measurements of one llm_client call, filled in as it runs"""
+    model: str
+    name: str
+    started: float = field(default_factory=time.monotonic)
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    queue_wait: float = 0.0
+    first_token_at: Optional[float] = None
+    finished: Optional[float] = None
+    cache_hit: bool = False
+    retries: int = 0
+    hedged: bool = False
+    error: Optional[str] = None
+
+    def first_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+
+    def set_usage(self, response):
+        usage = getattr(response, 'usage_metadata', None)
+        if usage:
+            self.prompt_tokens = usage.get('input_tokens')
+            self.completion_tokens = usage.get('output_tokens')
+
+    @property
+    def latency(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        return self.first_token_at - self.started if self.first_token_at is not None else None
+
+
+class MetricSeries:
+    def __init__(self):
+        self.calls = 0
+        self.cache_hits = 0
+        self.errors = 0
+        self.hedged = 0
+        self.histograms = {metric: Histogram(buckets) for metric, buckets in HISTOGRAM_BUCKETS.items()}
+
+    def add(self, record: LLMCallRecord):
+        self.calls += 1
+        if record.error:
+            self.errors += 1
+        if record.hedged:
+            self.hedged += 1
+        if record.cache_hit:
+            # No API call was made; only the hit is counted so timings stay about real calls
+            self.cache_hits += 1
+            return
+        values = {
+            'latency_seconds': record.latency,
+            'time_to_first_token_seconds': record.time_to_first_token,
+            'queue_wait_seconds': record.queue_wait,
+            'prompt_tokens': record.prompt_tokens,
+            'completion_tokens': record.completion_tokens,
+            'retries': record.retries,
+        }
+        for metric, value in values.items():
+            if value is not None:
+                self.histograms[metric].observe(value)
+
+    def merge(self, other: "MetricSeries"):
+        self.calls += other.calls
+        self.cache_hits += other.cache_hits
+        self.errors += other.errors
+        self.hedged += other.hedged
+        for metric, histogram in other.histograms.items():
+            self.histograms[metric].merge(histogram)
+
+    def to_dict(self, buckets: bool = True) -> Dict:
+        return {
+            'calls': self.calls,
+            'cache_hits': self.cache_hits,
+            'errors': self.errors,
+            'hedged': self.hedged,
+            'histograms': {metric: histogram.to_dict(buckets) for metric, histogram in self.histograms.items()},
+        }
+
+
+# Captures opened by the current request; records are added to each of them too
+_active_captures: contextvars.ContextVar = contextvars.ContextVar('llm_metrics_captures', default=())
+
+
+class LLMMetrics:
+    """In-process histograms of LLM calls, labelled by model and caller name.
+
+    llm_client records every call here. `capture()` collects the calls
+    made inside a block (following the context into asyncio tasks and
+    to_thread workers) so one analysis can report its own numbers.
+    """
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, str], MetricSeries] = {}
+        self._lock = threading.Lock()
+
+    def record(self, record: LLMCallRecord):
+        if record.finished is None:
+            record.finished = time.monotonic()
+        for metrics in (self, *_active_captures.get()):
+            metrics._add(record)
+
+    def _add(self, record: LLMCallRecord):
+        with self._lock:
+            key = (record.model, record.name)
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = MetricSeries()
+            series.add(record)
+
+    @contextmanager
+    def capture(self):
+        captured = LLMMetrics()
+        token = _active_captures.set(_active_captures.get() + (captured,))
+        try:
+            yield captured
+        finally:
+            _active_captures.reset(token)
+
+    def snapshot(self, buckets: bool = True) -> Dict:
+        with self._lock:
+            series: List[Tuple[Tuple[str, str], MetricSeries]] = sorted(self._series.items())
+            totals = MetricSeries()
+            for _, entry in series:
+                totals.merge(entry)
+            return {
+                'totals': totals.to_dict(buckets),
+                'series': [
+                    {'model': model, 'name': name, **entry.to_dict(buckets)}
+                    for (model, name), entry in series
+                ],
+            }
+
+
+# Process-wide LLM call metrics, exposed at /metrics/llm
+llm_metrics = LLMMetrics()
@@ -0,0 +1,262 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from collections import deque
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Provider budgets; 0 (the default) disables a limit. Opt in with the limits of
+# your key and model, e.g. 30 / 6000 for Groq's free tier on llama-3.1-8b-instant.
+# A single request larger than LLM_TPM_LIMIT is rejected, so leave room for the
+# largest call (report sections reserve 2048 output tokens, combined calls 8192)
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "0"))
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "0"))
+# Output tokens reserved for a call that sets no max_tokens
+LLM_DEFAULT_OUTPUT_TOKENS = int(os.getenv("LLM_DEFAULT_OUTPUT_TOKENS", "512"))
+
+# Lower runs first; interactive chat overtakes queued batch analysis
+LLM_PRIORITIES = {
+    'interactive': 0,
+    'batch': 10,
+}
+
+CHARS_PER_TOKEN = 4
+WAIT_SAMPLES = 1000
+
+
+class TokenBucket:
+    """Per-minute budget refilled continuously; a limit of 0 never runs dry.
+
+    The level may go negative when a call used more than it reserved;
+    later calls then wait until the debt is refilled.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def refill(self, now: float):
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until `amount` is available"""
+        if self.unlimited:
+            return 0.0
+        deficit = amount - self.level
+        return max(0.0, deficit / self.rate)
+
+    def take(self, amount: float):
+        if not self.unlimited:
+            self.level -= amount
+
+    def give(self, amount: float):
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class LLMBudgetExceeded(ValueError):
+    """A single request needs more tokens than the per-minute budget holds"""
+
+
+class Ticket:
+    __slots__ = ('priority', 'tokens', 'enqueued_at', 'granted_at', 'cancelled', 'wake')
+
+    def __init__(self, priority: int, tokens: int, wake=None):
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+        self.granted_at = None
+        self.cancelled = False
+        self.wake = wake
+
+    @property
+    def wait_seconds(self) -> float:
+        return (self.granted_at or time.monotonic()) - self.enqueued_at
+
+
+class LLMScheduler:
+    """Admits LLM requests within requests- and tokens-per-minute budgets.
+
+    Calls that fit the budget go straight through. The rest queue by
+    priority, then arrival, and a dispatcher thread admits them as the
+    buckets refill, so over-budget traffic waits instead of hitting the
+    provider's rate limit. Each call reserves its prompt estimate plus its
+    output budget, and `settle` corrects the reservation with the usage
+    the API reports. Async callers await `acquire`; worker threads call
+    `acquire_sync`.
+    """
+
+    def __init__(self, rpm: int = LLM_RPM_LIMIT, tpm: int = LLM_TPM_LIMIT):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self.stats = {'admitted': 0, 'queued': 0, 'cancelled': 0, 'rejected': 0, 'max_queue_depth': 0}
+
+    @staticmethod
+    def estimate_tokens(prompt_text: str, max_tokens: Optional[int] = None) -> int:
+        return len(prompt_text) // CHARS_PER_TOKEN + (max_tokens or LLM_DEFAULT_OUTPUT_TOKENS)
+
+    @staticmethod
+    def priority_of(priority) -> int:
+        return LLM_PRIORITIES[priority] if isinstance(priority, str) else int(priority)
+
+    async def acquire(self, priority='batch', tokens: int = 0) -> Ticket:
+        """Wait until the request fits the budgets; returns the ticket to settle afterwards"""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        ticket = Ticket(self.priority_of(priority), tokens, wake)
+        self._check_capacity(ticket)
+        if self._submit(ticket):
+            return ticket
+        try:
+            await granted
+        except asyncio.CancelledError:
+            self._cancel(ticket)
+            raise
+        return ticket
+
+    def acquire_sync(self, priority='batch', tokens: int = 0) -> Ticket:
+        """Blocking acquire for worker threads"""
+        granted = threading.Event()
+        ticket = Ticket(self.priority_of(priority), tokens, granted.set)
+        self._check_capacity(ticket)
+        if not self._submit(ticket):
+            granted.wait()
+        return ticket
+
+    def settle(self, ticket: Ticket, used_tokens: Optional[int] = None):
+        """Refund or charge the difference between reserved and reported tokens"""
+        if used_tokens is None:
+            return
+        with self._cond:
+            if used_tokens < ticket.tokens:
+                self.tokens.give(ticket.tokens - used_tokens)
+                self._cond.notify()
+            else:
+                self.tokens.take(used_tokens - ticket.tokens)
+
+    def _check_capacity(self, ticket: Ticket):
+        """Reject a request the token budget can never hold rather than let it wait forever"""
+        if not self.tokens.unlimited and ticket.tokens > self.tokens.capacity:
+            with self._cond:
+                self.stats['rejected'] += 1
+            message = (f"LLM request needs ~{ticket.tokens} tokens but LLM_TPM_LIMIT is "
+                       f"{int(self.tokens.capacity)}; raise the limit or lower max_tokens")
+            print(message)
+            raise LLMBudgetExceeded(message)
+
+    def _submit(self, ticket: Ticket) -> bool:
+        """Admit immediately when nothing is queued and the budgets allow; otherwise queue"""
+        with self._cond:
+            now = time.monotonic()
+            if not self._queue and self._fits(ticket, now) == 0:
+                self._admit(ticket, now)
+                return True
+            heapq.heappush(self._queue, (ticket.priority, next(self._seq), ticket))
+            self.stats['queued'] += 1
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], len(self._queue))
+            self._ensure_dispatcher()
+            self._cond.notify()
+            return False
+
+    def _cancel(self, ticket: Ticket):
+        with self._cond:
+            if ticket.granted_at is not None:
+                # Admitted as the caller went away; hand the reservation back
+                self.requests.give(1)
+                self.tokens.give(ticket.tokens)
+            else:
+                ticket.cancelled = True
+            self.stats['cancelled'] += 1
+            self._cond.notify()
+
+    def _fits(self, ticket: Ticket, now: float) -> float:
+        """Seconds until the ticket fits both buckets; 0 when it fits now"""
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        return max(self.requests.wait_for(1), self.tokens.wait_for(ticket.tokens))
+
+    def _admit(self, ticket: Ticket, now: float):
+        self.requests.take(1)
+        self.tokens.take(ticket.tokens)
+        ticket.granted_at = now
+        self._waits.append(ticket.wait_seconds)
+        self.stats['admitted'] += 1
+
+    def _ensure_dispatcher(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._dispatch, name="llm-scheduler", daemon=True)
+            self._thread.start()
+
+    def _dispatch(self):
+        with self._cond:
+            while True:
+                delay = None
+                while self._queue:
+                    _, _, ticket = self._queue[0]
+                    if ticket.cancelled:
+                        heapq.heappop(self._queue)
+                        continue
+                    now = time.monotonic()
+                    delay = self._fits(ticket, now)
+                    if delay > 0:
+                        break
+                    heapq.heappop(self._queue)
+                    self._admit(ticket, now)
+                    ticket.wake()
+                    delay = None
+                self._cond.wait(timeout=delay)
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            waiting = [ticket for _, _, ticket in self._queue if not ticket.cancelled]
+            waits = sorted(self._waits)
+            by_priority = {}
+            for ticket in waiting:
+                name = next((name for name, value in LLM_PRIORITIES.items() if value == ticket.priority), str(ticket.priority))
+                by_priority[name] = by_priority.get(name, 0) + 1
+            return {
+                **self.stats,
+                'queue_depth': len(waiting),
+                'queue_depth_by_priority': by_priority,
+                'oldest_wait_seconds': round(max((now - t.enqueued_at for t in waiting), default=0.0), 3),
+                'wait_seconds': {
+                    'samples': len(waits),
+                    'mean': round(sum(waits) / len(waits), 4) if waits else 0.0,
+                    'p50': round(waits[len(waits) // 2], 4) if waits else 0.0,
+                    'p95': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 4) if waits else 0.0,
+                    'max': round(waits[-1], 4) if waits else 0.0,
+                },
+                'rpm_limit': int(self.requests.capacity),
+                'tpm_limit': int(self.tokens.capacity),
+                'requests_available': None if self.requests.unlimited else round(self.requests.level, 2),
+                'tokens_available': None if self.tokens.unlimited else round(self.tokens.level),
+            }
+
+
+# Process-wide scheduler; every llm_client call is admitted through it
+llm_scheduler = LLMScheduler()
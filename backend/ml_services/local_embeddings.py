@@ -1,17 +1,32 @@
-
 from typing import List
+import threading
 import requests
 from langchain.embeddings.base import Embeddings
 class NomicEmbeddings(Embeddings):
-    def __init__(self, model_name:str, base_url:str="http://localhost:1234/v1", api_key:str="lm-studio"):
+    def __init__(self, model_name:str, base_url:str="http://localhost:1234/v1", api_key:str="lm-studio", batch_size:int=64):
         self.model_name = model_name
         self.base_url = base_url
         self.api_key = api_key
-    
+        self.batch_size = batch_size
+        # Keep-alive sessions, one per thread since requests.Session is not thread-safe
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        return [self.embed_query(text) for text in texts]
-    
+        embeddings = []
+        for start in range(0, len(texts), self.batch_size):
+            embeddings.extend(self._embed(texts[start:start + self.batch_size]))
+        return embeddings
+
     def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)[0]
+
+    def _embed(self, texts) -> List[List[float]]:
         url = f"{self.base_url}/embeddings"
         headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -19,10 +34,11 @@ class NomicEmbeddings(Embeddings):
         }
         payload = {
             "model": self.model_name,
-            "input": text
+            "input": texts
         }
 
-        response = requests.post(url, headers=headers, json=payload)
+        response = self.session.post(url, headers=headers, json=payload)
         response.raise_for_status()
-        return response.json()['data'][0]['embedding']
-    
+        data = sorted(response.json()['data'], key=lambda item: item.get('index', 0))
+        return [item['embedding'] for item in data]
+
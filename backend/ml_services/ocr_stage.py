@@ -0,0 +1,203 @@
+import os
+import io
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+from dotenv import load_dotenv
+
+from ml_services.document_cache import DocumentTextCache, TEXT_CACHE_DIR
+
+load_dotenv()
+
+try:
+    import pytesseract
+    from PIL import Image
+except ImportError:
+    pytesseract = None
+    Image = None
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+# Pages with at least this much native text are not OCR'd
+OCR_MAX_PAGE_TEXT_CHARS = int(os.getenv("OCR_MAX_PAGE_TEXT_CHARS", "200"))
+# Images smaller than this (width * height) are icons, bullets or logos
+OCR_MIN_IMAGE_AREA = int(os.getenv("OCR_MIN_IMAGE_AREA", str(150 * 150)))
+# Grayscale entropy in bits. Dark text on a plain slide can score as low as
+# ~0.3 bits, so only near-solid fills should fall below this.
+OCR_MIN_IMAGE_ENTROPY = float(os.getenv("OCR_MIN_IMAGE_ENTROPY", "0.1"))
+OCR_POOL_WORKERS = int(os.getenv("OCR_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "512"))
+
+
+def ocr_png_bytes(png_bytes: bytes) -> str:
+    """Run tesseract on a PNG image; runs inside a pool worker process"""
+    import pytesseract
+    from PIL import Image
+    return pytesseract.image_to_string(Image.open(io.BytesIO(png_bytes)))
+
+
+class OCRStage:
+    """Selective OCR for embedded PDF images.
+
+    Only pages whose native text is sparse are considered. Images are
+    deduplicated by xref and by pixel hash, tiny or low-entropy images are
+    skipped, OCR output is cached by image hash, and the remaining images
+    are OCR'd in parallel on a process pool.
+    """
+
+    def __init__(
+        self,
+        max_page_text_chars: int = OCR_MAX_PAGE_TEXT_CHARS,
+        min_image_area: int = OCR_MIN_IMAGE_AREA,
+        min_image_entropy: float = OCR_MIN_IMAGE_ENTROPY,
+        max_workers: int = OCR_POOL_WORKERS
+    ):
+        self.max_page_text_chars = max_page_text_chars
+        self.min_image_area = min_image_area
+        self.min_image_entropy = min_image_entropy
+        self.max_workers = max(1, max_workers)
+        self.cache = DocumentTextCache(
+            cache_dir=os.path.join(TEXT_CACHE_DIR, "ocr"),
+            max_entries=OCR_CACHE_MAX_ENTRIES
+        )
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        return bool(fitz and pytesseract and Image)
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def process_pdf(self, file_path: str, page_texts: List[str]) -> Dict:
+        """OCR the embedded images of sparse-text pages.
+
+        `page_texts` holds the native text of each page, in page order.
+        Returns the OCR'd images and counters for every skip reason.
+        """
+        stats = {
+            'pages_considered': 0,
+            'pages_skipped_dense_text': 0,
+            'images_seen': 0,
+            'skipped_duplicate_xref': 0,
+            'skipped_duplicate_pixels': 0,
+            'skipped_small': 0,
+            'skipped_low_entropy': 0,
+            'cache_hits': 0,
+            'ocr_runs': 0
+        }
+        images = []
+        jobs = []
+        seen_xrefs = set()
+        seen_pixels = set()
+
+        doc = fitz.open(file_path)
+        try:
+            for page_index in range(len(doc)):
+                native_text = page_texts[page_index] if page_index < len(page_texts) else ""
+                if len((native_text or "").strip()) >= self.max_page_text_chars:
+                    stats['pages_skipped_dense_text'] += 1
+                    continue
+                stats['pages_considered'] += 1
+
+                for img in doc.load_page(page_index).get_images(full=True):
+                    stats['images_seen'] += 1
+                    xref, width, height = img[0], img[2], img[3]
+
+                    if xref in seen_xrefs:
+                        stats['skipped_duplicate_xref'] += 1
+                        continue
+                    seen_xrefs.add(xref)
+
+                    if width * height < self.min_image_area:
+                        stats['skipped_small'] += 1
+                        continue
+
+                    try:
+                        pix = fitz.Pixmap(doc, xref)
+                        if pix.colorspace is None:
+                            # Stencil masks carry no readable content
+                            continue
+                        image_hash = hashlib.sha256(pix.samples).hexdigest()
+                        if image_hash in seen_pixels:
+                            stats['skipped_duplicate_pixels'] += 1
+                            continue
+                        seen_pixels.add(image_hash)
+
+                        cached_text = self.cache.get(image_hash)
+                        if cached_text is not None:
+                            stats['cache_hits'] += 1
+                            if cached_text.strip():
+                                images.append(self._image_record(page_index, image_hash, cached_text))
+                            continue
+
+                        if self._entropy(pix) < self.min_image_entropy:
+                            stats['skipped_low_entropy'] += 1
+                            continue
+
+                        if pix.colorspace.n > 3:
+                            pix = fitz.Pixmap(fitz.csRGB, pix)
+                        jobs.append((page_index, image_hash, pix.tobytes("png")))
+                    except Exception as e:
+                        print(f"OCR image preparation failed on page {page_index + 1}: {e}")
+                        continue
+        finally:
+            doc.close()
+
+        if jobs:
+            futures = [(page_index, image_hash, self.executor.submit(ocr_png_bytes, png))
+                       for page_index, image_hash, png in jobs]
+            for page_index, image_hash, future in futures:
+                try:
+                    ocr_text = future.result()
+                except Exception as e:
+                    print(f"OCR failed on page {page_index + 1}: {e}")
+                    continue
+                stats['ocr_runs'] += 1
+                self.cache.put(image_hash, ocr_text)
+                if ocr_text.strip():
+                    images.append(self._image_record(page_index, image_hash, ocr_text))
+
+        images.sort(key=lambda image: image['page'])
+        print(f"OCR stage for {os.path.basename(file_path)}: {stats}")
+        return {'images': images, 'stats': stats}
+
+    @staticmethod
+    def _entropy(pix) -> float:
+        """Shannon entropy of the grayscale histogram, in bits"""
+        gray = pix if pix.colorspace.n == 1 else fitz.Pixmap(fitz.csGRAY, pix)
+        if gray.alpha:
+            gray = fitz.Pixmap(gray, 0)
+        return Image.frombytes("L", (gray.width, gray.height), gray.samples).entropy()
+
+    @staticmethod
+    def _image_record(page_index: int, image_hash: str, text: str) -> Dict:
+        return {
+            'page': page_index + 1,
+            'text': text,
+            'type': 'chart_or_image',
+            'image_hash': image_hash
+        }
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+# Process-wide OCR stage
+ocr_stage = OCRStage()
@@ -1,45 +1,48 @@
 import os
 
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, TextLoader
+from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+from ml_services.document_extraction import document_extraction_service
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
-
+# Chunks embedded per call while the rest of the document is still being extracted
+VECTOR_DB_EMBED_BATCH = int(os.getenv("VECTOR_DB_EMBED_BATCH", "64"))
 
 file_path = r"C:\sharath\Github\SaaS\AI Startup Analyst\backend\assets\Seth123\AI_Wealth_Concierge_Pitch.pdf"
 
 class DocumentParserAndLoader:
 
-    def __init__(self, username, file_path, embeddings, VECTOR_DB_PATH, chunk_size=1024, chunk_overlap=100):
+    def __init__(self, username, file_path, embeddings, VECTOR_DB_PATH, chunk_size=1024, chunk_overlap=100, index_key=None):
         self.username = username
         self.file_path = file_path
         self.embeddings = embeddings
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.vector_db_path = VECTOR_DB_PATH + self.username
+        # A content-hash key lets every user and re-upload share one index
+        if index_key:
+            self.vector_db_path = os.path.join(VECTOR_DB_PATH, index_key)
+        else:
+            self.vector_db_path = VECTOR_DB_PATH + self.username
+
+    def iter_documents(self):
+        """Yield one Document per page as soon as it has been extracted"""
+        for page_no, text in document_extraction_service.iter_pages(self.file_path):
+            metadata = {'source': self.file_path}
+            if page_no is not None:
+                metadata['page'] = page_no - 1
+            yield Document(page_content=text, metadata=metadata)
 
     def read_document(self):
         """Read document based on file extension"""
-        file_ext = os.path.splitext(self.file_path)[1].lower()
-        
-        if file_ext == '.pdf':
-            loader = PyPDFLoader(self.file_path)
-        elif file_ext in ['.doc', '.docx']:
-            loader = Docx2txtLoader(self.file_path)
-        elif file_ext == '.txt':
-            loader = TextLoader(self.file_path, encoding='utf-8')
-        else:
-            raise ValueError(f"Unsupported file type: {file_ext}")
-            
-        self.docs = loader.load()
+        self.docs = list(self.iter_documents())
 
-    def split_data(self):
-
-        text_splitter = RecursiveCharacterTextSplitter(
+    def get_text_splitter(self):
+        return RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
             length_function=len,
@@ -58,12 +61,44 @@ class DocumentParserAndLoader:
             ],
         )
 
-        self.split_docs = text_splitter.split_documents(self.docs)
+    def split_data(self):
+        self.split_docs = self.get_text_splitter().split_documents(self.docs)
+
+    def iter_split_docs(self):
+        """Yield chunks page by page, so chunking starts before the whole document is parsed"""
+        text_splitter = self.get_text_splitter()
+        for doc in self.iter_documents():
+            yield from text_splitter.split_documents([doc])
         
 
     def store_docs_in_vector_db(self):
         vector_store = FAISS.from_documents(self.split_docs, self.embeddings)
         vector_store.save_local(self.vector_db_path)
+
+    def build_vector_db(self):
+        """Chunk, embed and persist the document, keeping the index loaded.
+
+        Chunks are embedded in batches as pages arrive, so embedding
+        overlaps with extraction of the later pages and only one batch of
+        chunks is held at a time.
+        """
+        self.vector_db = None
+        batch = []
+        for chunk_no, doc in enumerate(self.iter_split_docs()):
+            doc.metadata['chunk'] = chunk_no
+            batch.append(doc)
+            if len(batch) >= VECTOR_DB_EMBED_BATCH:
+                self._embed_batch(batch)
+                batch = []
+        if batch or self.vector_db is None:
+            self._embed_batch(batch)
+        self.vector_db.save_local(self.vector_db_path)
+
+    def _embed_batch(self, docs):
+        if self.vector_db is None:
+            self.vector_db = FAISS.from_documents(docs, self.embeddings)
+        else:
+            self.vector_db.add_documents(docs)
         
 
     def load_vector_db(self):
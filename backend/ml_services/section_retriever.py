@@ -0,0 +1,188 @@
+import os
+import re
+import math
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+from dotenv import load_dotenv
+
+from ml_services.document_cache import document_text_cache, TEXT_CACHE_DIR
+
+load_dotenv()
+
+EMBEDDINGS_MODEL_NAME = os.getenv("EMBEDDINGS_MODEL_NAME")
+EMBEDDINGS_BASE_URL = os.getenv("EMBEDDINGS_BASE_URL", "http://localhost:1234/v1")
+EMBEDDINGS_API_KEY = os.getenv("EMBEDDINGS_API_KEY", "lm-studio")
+
+# Retrieval needs an embedding model, so it is on by default only when one is configured
+SECTION_RETRIEVAL = os.getenv("SECTION_RETRIEVAL", "true" if EMBEDDINGS_MODEL_NAME else "false").lower() == "true"
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))
+# Prompt tokens of document context per section
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", "1500"))
+RETRIEVAL_CHUNK_SIZE = int(os.getenv("RETRIEVAL_CHUNK_SIZE", "1024"))
+RETRIEVAL_CHUNK_OVERLAP = int(os.getenv("RETRIEVAL_CHUNK_OVERLAP", "100"))
+VECTOR_DB_PATH = os.getenv("VECTOR_DB_PATH", os.path.join(TEXT_CACHE_DIR, "vector_db"))
+VECTOR_STORE_MEMORY_ENTRIES = int(os.getenv("VECTOR_STORE_MEMORY_ENTRIES", "16"))
+
+# Rough English average; good enough to keep prompts inside a budget
+CHARS_PER_TOKEN = 4
+
+SECTION_QUERIES = {
+    'founders_profile': "founders team CEO CTO background experience education previous companies exits leadership",
+    'market_problem': "problem customers pain point market size TAM SAM SOM industry opportunity demand",
+    'unique_differentiator': "product solution technology competitive advantage differentiation moat competitors patents",
+    'business_metrics': "revenue growth customers users traction unit economics margins burn runway funding valuation",
+    'risk_factor': "risks challenges competition regulation dependencies assumptions churn execution",
+    'recommended_next_steps': "roadmap funding ask use of funds milestones plans go-to-market expansion",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+class SectionRetriever:
+    """Scopes each report section's prompt to the document chunks it needs.
+
+    The document is chunked and embedded into a FAISS index once per
+    content hash (through DocumentParserAndLoader) and the index is kept
+    on disk and in a small LRU. Each section retrieves its top-k chunks
+    and keeps as many as fit into the token budget, in document order.
+    Documents that already fit the budget, and any retrieval failure, use
+    the whole document.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = SECTION_RETRIEVAL,
+        top_k: int = RETRIEVAL_TOP_K,
+        token_budget: int = RETRIEVAL_TOKEN_BUDGET,
+        memory_entries: int = VECTOR_STORE_MEMORY_ENTRIES
+    ):
+        self.enabled = enabled
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self.memory_entries = memory_entries
+        self._embeddings = None
+        self._stores: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, List] = {}
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            from ml_services.local_embeddings import NomicEmbeddings
+            self._embeddings = NomicEmbeddings(
+                model_name=EMBEDDINGS_MODEL_NAME,
+                base_url=EMBEDDINGS_BASE_URL,
+                api_key=EMBEDDINGS_API_KEY
+            )
+        return self._embeddings
+
+    def context_for(self, file_path: str, section: str, full_text: str) -> Tuple[str, Dict]:
+        """Return (context, info) for one section; info records how the context was chosen"""
+        full_tokens = estimate_tokens(full_text)
+        info = {'mode': 'full', 'document_tokens': full_tokens, 'context_tokens': full_tokens}
+
+        if not self.enabled:
+            return full_text, info
+        if section not in SECTION_QUERIES:
+            info['reason'] = 'no retrieval query for section'
+            return full_text, info
+        if full_tokens <= self.token_budget:
+            info['reason'] = 'document fits the token budget'
+            return full_text, info
+
+        try:
+            store = self.get_store(file_path)
+            chunks = store.similarity_search(SECTION_QUERIES[section], k=self.top_k)
+        except Exception as e:
+            print(f"Retrieval failed for {section}, using the full document: {e}")
+            info['reason'] = f"retrieval failed: {e}"
+            return full_text, info
+
+        selected, used_tokens = self._within_budget(chunks)
+        if not selected:
+            info['reason'] = 'no chunks retrieved'
+            return full_text, info
+
+        context = "\n\n".join(chunk.page_content for chunk in selected)
+        print(f"Retrieved {len(selected)}/{len(chunks)} chunks for {section} "
+              f"({used_tokens} of {full_tokens} document tokens)")
+        return context, {
+            'mode': 'retrieval',
+            'document_tokens': full_tokens,
+            'context_tokens': estimate_tokens(context),
+            'chunks': len(selected),
+            'pages': sorted({chunk.metadata.get('page') for chunk in selected if chunk.metadata.get('page') is not None})
+        }
+
+    def _within_budget(self, chunks: List) -> Tuple[List, int]:
+        """Keep chunks in relevance order until the budget is spent, then restore document order"""
+        selected, used_tokens = [], 0
+        for rank, chunk in enumerate(chunks):
+            tokens = estimate_tokens(chunk.page_content)
+            if used_tokens + tokens > self.token_budget:
+                continue
+            selected.append((rank, chunk))
+            used_tokens += tokens
+        selected.sort(key=lambda item: (item[1].metadata.get('page', 0), item[1].metadata.get('chunk', item[0])))
+        return [chunk for _, chunk in selected], used_tokens
+
+    def get_store(self, file_path: str):
+        """FAISS index for a document's content, built at most once per content hash"""
+        model_tag = re.sub(r'[^A-Za-z0-9._-]', '_', EMBEDDINGS_MODEL_NAME or 'default')
+        key = f"{document_text_cache.file_hash(file_path)}.{model_tag}"
+        with self._lock:
+            if key in self._stores:
+                self._stores.move_to_end(key)
+                return self._stores[key]
+
+        # Sections run concurrently; the first one builds, the rest wait for it
+        with self._lock_for(key):
+            with self._lock:
+                if key in self._stores:
+                    return self._stores[key]
+
+            from ml_services.parse_documents import DocumentParserAndLoader
+
+            loader = DocumentParserAndLoader(
+                username=None,
+                file_path=file_path,
+                embeddings=self.embeddings,
+                VECTOR_DB_PATH=VECTOR_DB_PATH,
+                chunk_size=RETRIEVAL_CHUNK_SIZE,
+                chunk_overlap=RETRIEVAL_CHUNK_OVERLAP,
+                index_key=key
+            )
+            if os.path.exists(loader.vector_db_path):
+                loader.load_vector_db()
+            else:
+                print(f"Building vector index for {os.path.basename(file_path)} ({key[:12]})")
+                loader.build_vector_db()
+
+            with self._lock:
+                self._stores[key] = loader.vector_db
+                while len(self._stores) > self.memory_entries:
+                    self._stores.popitem(last=False)
+            return loader.vector_db
+
+    @contextmanager
+    def _lock_for(self, key: str):
+        # Ref-counted so a key's lock is dropped once nobody holds or waits for it
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+
+
+# Shared retriever; indexes are reused across sections, users and re-uploads
+section_retriever = SectionRetriever()
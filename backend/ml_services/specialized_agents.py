@@ -17,11 +17,30 @@ def get_numpy():
             np = False
     return np if np is not False else None
 from dataclasses import dataclass
-from langchain_groq import ChatGroq
+from ml_services.llm_client import llm_client
+from core.task_graph import TaskGraph
+from ml_services.document_fingerprint import select_agent_inputs, hash_text
+from ml_services.llm_cache import LLMResponseCache, LLM_CACHE_TTL_SECONDS
+from ml_services.document_cache import TEXT_CACHE_DIR
 from dotenv import load_dotenv
 
 load_dotenv()
 
+AGENT_MEMO_ENABLED = os.getenv("AGENT_MEMO_ENABLED", "true").lower() == "true"
+AGENT_MEMO_PATH = os.getenv("AGENT_MEMO_PATH", os.path.join(TEXT_CACHE_DIR, "agent_results.sqlite3"))
+AGENT_MEMO_TTL_SECONDS = int(os.getenv("AGENT_MEMO_TTL_SECONDS", str(LLM_CACHE_TTL_SECONDS)))
+AGENT_MEMO_MAX_ENTRIES = int(os.getenv("AGENT_MEMO_MAX_ENTRIES", "5000"))
+
+# Finished agent results keyed by agent, agent version, model and input
+# fingerprint. Investor preferences only weight the results, so they are
+# not part of the key.
+agent_result_memo = LLMResponseCache(
+    db_path=AGENT_MEMO_PATH,
+    ttl_seconds=AGENT_MEMO_TTL_SECONDS,
+    max_entries=AGENT_MEMO_MAX_ENTRIES,
+    enabled=AGENT_MEMO_ENABLED
+)
+
 @dataclass
 class AgentResult:
     score: float
@@ -35,6 +54,9 @@ class AgentResult:
     processing_time: float
 
 class BaseAgent:
+    # Bump in an agent when its prompt or scoring changes, so memoized results are not reused
+    version = "1"
+    
     def __init__(self, model_name: str = None):
         self.groq_api_key = os.getenv("GROQ_API_KEY")
         self.model_name = model_name or os.getenv("LLM_MODEL_NAME", "llama-3.1-8b-instant")
@@ -43,8 +65,17 @@ class BaseAgent:
     @property
     def llm(self):
         if self._llm is None:
-            self._llm = ChatGroq(groq_api_key=self.groq_api_key, model_name=self.model_name, temperature=0.1)
+            self._llm = llm_client.get(self.model_name, temperature=0.1)
         return self._llm
+    
+    def invoke_llm(self, prompt: str, use_cache: bool = True):
+        """Call the agent's model; use_cache=False bypasses the response cache"""
+        return llm_client.invoke(prompt, self.llm, use_cache=use_cache, name=self.agent_name)
+    
+    @property
+    def agent_name(self) -> str:
+        """'founder' for FounderAgent, matching the orchestrator's keys"""
+        return type(self).__name__.replace('Agent', '').lower()
         
     def extract_metrics(self, text: str, patterns: Dict[str, str]) -> Dict:
         """Extract numerical metrics from text using regex patterns"""
@@ -93,7 +124,7 @@ class FounderAgent(BaseAgent):
             'team_complementarity': 0.2
         }
     
-    def analyze(self, document_text: str, market_data: Dict = None) -> AgentResult:
+    def analyze(self, document_text: str, market_data: Dict = None, use_cache: bool = True) -> AgentResult:
         start_time = datetime.now()
         
         # Extract founder information
@@ -120,7 +151,7 @@ class FounderAgent(BaseAgent):
         Provide detailed analysis and end with "Score: X" (0-100).
         """
         
-        response = self.llm.invoke(prompt)
+        response = self.invoke_llm(prompt, use_cache)
         analysis_text = response.content
         
         # Extract score and evidence
@@ -285,7 +316,7 @@ class MarketAgent(BaseAgent):
             'market_timing': 0.25
         }
     
-    def analyze(self, document_text: str, market_intelligence: Dict = None) -> AgentResult:
+    def analyze(self, document_text: str, market_intelligence: Dict = None, use_cache: bool = True) -> AgentResult:
         start_time = datetime.now()
         
         # Extract market metrics
@@ -313,7 +344,7 @@ class MarketAgent(BaseAgent):
         Provide detailed market analysis and end with "Score: X" (0-100).
         """
         
-        response = self.llm.invoke(prompt)
+        response = self.invoke_llm(prompt, use_cache)
         analysis_text = response.content
         
         # Extract LLM score
@@ -494,7 +525,7 @@ class TractionAgent(BaseAgent):
             'retention_metrics': 0.15
         }
     
-    def analyze(self, document_text: str, financial_data: Dict = None) -> AgentResult:
+    def analyze(self, document_text: str, financial_data: Dict = None, use_cache: bool = True) -> AgentResult:
         start_time = datetime.now()
         
         # Extract traction metrics
@@ -524,7 +555,7 @@ class TractionAgent(BaseAgent):
         Provide detailed traction analysis and end with "Score: X" (0-100).
         """
         
-        response = self.llm.invoke(prompt)
+        response = self.invoke_llm(prompt, use_cache)
         analysis_text = response.content
         
         score_match = re.search(r'Score:\s*(\d+)', analysis_text, re.IGNORECASE)
@@ -710,7 +741,7 @@ class FinanceAgent(BaseAgent):
             'financial_projections': 0.2
         }
     
-    def analyze(self, document_text: str, financial_data: Dict = None) -> AgentResult:
+    def analyze(self, document_text: str, financial_data: Dict = None, use_cache: bool = True) -> AgentResult:
         start_time = datetime.now()
         
         # Extract financial metrics
@@ -739,7 +770,7 @@ class FinanceAgent(BaseAgent):
         Provide detailed financial analysis and end with "Score: X" (0-100).
         """
         
-        response = self.llm.invoke(prompt)
+        response = self.invoke_llm(prompt, use_cache)
         analysis_text = response.content
         
         score_match = re.search(r'Score:\s*(\d+)', analysis_text, re.IGNORECASE)
@@ -927,7 +958,7 @@ class RiskAgent(BaseAgent):
             'regulatory_risk': 0.15
         }
     
-    def analyze(self, document_text: str, analysis_results: Dict = None) -> AgentResult:
+    def analyze(self, document_text: str, analysis_results: Dict = None, use_cache: bool = True) -> AgentResult:
         start_time = datetime.now()
         
         try:
@@ -945,7 +976,7 @@ class RiskAgent(BaseAgent):
             Identify specific risks and provide risk mitigation assessment. End with "Score: X" (0-100, where higher score = lower risk).
             """
             
-            response = self.llm.invoke(prompt)
+            response = self.invoke_llm(prompt, use_cache)
             analysis_text = response.content
         except Exception as e:
             print(f"Risk agent LLM error: {e}")
@@ -1149,31 +1180,129 @@ class AgentOrchestrator:
             'risk': 0.15
         }
     
-    def run_comprehensive_analysis(self, document_text: str, investor_preferences: Dict = None) -> Dict:
-        """Run all agents and compile comprehensive analysis"""
+    def agent_inputs(self, texts: List[str], selective: bool = True) -> Dict[str, Dict]:
+        """Per-agent input text and fingerprint for a project's documents.
+
+        With selective=False every agent reads the full text. The risk
+        agent reads the other agents' results, so their fingerprints are
+        folded into its own.
+        """
+        inputs = select_agent_inputs(texts, selective)
+        for key in ('fingerprint', 'selected_fingerprint'):
+            upstream = [inputs[agent_name][key] for agent_name in self.agents if agent_name != 'risk']
+            inputs['risk'][key] = hash_text("\n".join([inputs['risk'][key]] + upstream))
+        return inputs
+    
+    def resolve_weights(self, investor_preferences: Dict = None) -> Dict[str, float]:
+        """Agent weights from preferences, normalized to sum to 1.
+        
+        Only an explicit {'weights': {'founder': 0.3, ...}} changes them;
+        agents it leaves out get 0. The analysis form sends it once the
+        user edits a weight, so its 'founder_weight'-style fields are not
+        read here. Raises ValueError for weights of anything that is not
+        an agent (there is no product agent) or negative weights.
+        """
+        weights = (investor_preferences or {}).get('weights')
+        if not weights:
+            return dict(self.default_weights)
+        unknown = sorted(set(weights) - set(self.default_weights))
+        if unknown:
+            raise ValueError(f"No agent to weight for: {', '.join(unknown)}")
+        weights = {agent_name: float(weights.get(agent_name) or 0) for agent_name in self.default_weights}
+        if any(weight < 0 for weight in weights.values()):
+            raise ValueError("Agent weights must not be negative")
+        total = sum(weights.values())
+        if total <= 0:
+            return dict(self.default_weights)
+        return {agent_name: weight / total for agent_name, weight in weights.items()}
+    
+    def memo_key(self, agent_name: str, fingerprint: str) -> str:
+        agent = self.agents[agent_name]
+        return hash_text(json.dumps([agent_name, agent.version, agent.model_name, fingerprint]))
+    
+    def run_comprehensive_analysis(self, document_text: str, investor_preferences: Dict = None, use_cache: bool = True,
+                                   agent_inputs: Dict[str, Dict] = None, reuse: Dict[str, AgentResult] = None) -> Dict:
+        """Run all agents and compile comprehensive analysis.
+        
+        agent_inputs (from `agent_inputs`) gives each agent its own text and
+        fingerprint; by default every agent reads all of document_text. Agents
+        in reuse are not run and their stored result is used instead, and
+        an agent whose fingerprint is in the memo uses the memoized result
+        unless use_cache is False.
+        """
         start_time = datetime.now()
+        agent_inputs = agent_inputs or self.agent_inputs([document_text], selective=False)
+        reuse = reuse or {}
+        memo_hits = []
+        
+        def run(agent_name: str, context: Dict = None) -> AgentResult:
+            if agent_name in reuse:
+                print(f"Reusing {agent_name} agent result; its inputs are unchanged")
+                return reuse[agent_name]
+            
+            # Risk's result depends on its upstream results, which its key only
+            # covers through their inputs; one built on a fallback is never memoized
+            upstream_fallback = any(
+                upstream.calculation_details.get('fallback') for upstream in (context or {}).values()
+            )
+            memoizable = agent_result_memo.enabled and not upstream_fallback
+            key = self.memo_key(agent_name, agent_inputs[agent_name]['fingerprint'])
+            if use_cache and memoizable:
+                memoized = agent_result_memo.get(key)
+                if memoized is not None:
+                    print(f"Memoized {agent_name} agent result for these inputs")
+                    memo_hits.append(agent_name)
+                    return self.deserialize_agent_result(json.loads(memoized))
+            
+            result = self._run_agent(agent_name, agent_inputs[agent_name]['text'], context, use_cache)
+            if upstream_fallback:
+                # Stored with the result so a later incremental run doesn't reuse it either
+                result.calculation_details['upstream_fallback'] = True
+            if memoizable and not result.calculation_details.get('fallback'):
+                agent_result_memo.put(key, json.dumps(self._serialize_agent_result(result), default=str), model=agent_name)
+            return result
+        
+        # Run agents as a dependency graph: the independent agents run
+        # concurrently and the risk agent starts once their results are in
+        independent = [agent_name for agent_name in self.agents if agent_name != 'risk']
+        graph = TaskGraph()
+        for agent_name in independent:
+            graph.add(agent_name, lambda inputs, agent_name=agent_name: run(agent_name))
+        # Risk agent needs other results for context
+        graph.add('risk', lambda inputs: run('risk', inputs), depends_on=independent)
+        graph_run = graph.run()
+        agent_results = {agent_name: graph_run.results[agent_name] for agent_name in self.agents}
+        scores = self.score_results(agent_results, investor_preferences)
+        
+        # Compile comprehensive results
+        total_time = (datetime.now() - start_time).total_seconds()
+        
+        return {
+            'overall_score': scores['overall_score'],
+            'overall_confidence': scores['overall_confidence'],
+            'investment_recommendation': scores['investment_recommendation'],
+            'agent_results': {name: self._serialize_agent_result(result) 
+                            for name, result in agent_results.items()},
+            'analysis_metadata': {
+                'total_processing_time': total_time,
+                'agents_run': list(agent_results.keys()),
+                'agents_reused': [agent_name for agent_name in agent_results if agent_name in reuse],
+                'agents_memoized': memo_hits,
+                'agent_versions': {agent_name: agent.version for agent_name, agent in self.agents.items()},
+                'agent_timings': graph_run.timings_dict(),
+                'weights_used': scores['weights_used'],
+                'timestamp': datetime.now().isoformat()
+            },
+            'key_insights': scores['key_insights'],
+            'next_steps': scores['next_steps']
+        }
+    
+    def score_results(self, agent_results: Dict[str, AgentResult], investor_preferences: Dict = None) -> Dict:
+        """Everything that depends on investor preferences, computed from finished agent results.
         
-        # Use custom weights if provided
-        weights = investor_preferences.get('weights', self.default_weights) if investor_preferences else self.default_weights
-        
-        # Run all agents
-        agent_results = {}
-        for agent_name, agent in self.agents.items():
-            try:
-                print(f"Running {agent_name} agent...")
-                if agent_name == 'risk':
-                    # Risk agent needs other results for context
-                    result = agent.analyze(document_text, agent_results)
-                else:
-                    result = agent.analyze(document_text)
-                
-                agent_results[agent_name] = result
-                print(f"{agent_name} agent completed: Score {result.score:.1f}, Confidence {result.confidence}")
-                
-            except Exception as e:
-                print(f"Error in {agent_name} agent: {e}")
-                # Provide fallback result
-                agent_results[agent_name] = self._get_fallback_result(agent_name)
+        Cheap enough to call on every preference change without re-running agents.
+        """
+        weights = self.resolve_weights(investor_preferences)
         
         # Calculate overall score
         overall_score = sum(
@@ -1187,30 +1316,33 @@ class AgentOrchestrator:
             result.confidence for result in agent_results.values()
         ])
         
-        # Generate investment recommendation
-        investment_recommendation = self._generate_investment_recommendation(
-            overall_score, agent_results, investor_preferences
-        )
-        
-        # Compile comprehensive results
-        total_time = (datetime.now() - start_time).total_seconds()
-        
         return {
             'overall_score': round(overall_score, 1),
             'overall_confidence': round(overall_confidence, 2),
-            'investment_recommendation': investment_recommendation,
-            'agent_results': {name: self._serialize_agent_result(result) 
-                            for name, result in agent_results.items()},
-            'analysis_metadata': {
-                'total_processing_time': total_time,
-                'agents_run': list(agent_results.keys()),
-                'weights_used': weights,
-                'timestamp': datetime.now().isoformat()
-            },
+            'investment_recommendation': self._generate_investment_recommendation(
+                overall_score, agent_results, investor_preferences
+            ),
             'key_insights': self._extract_key_insights(agent_results),
-            'next_steps': self._generate_next_steps(overall_score, agent_results)
+            'next_steps': self._generate_next_steps(overall_score, agent_results),
+            'weights_used': weights
         }
     
+    def _run_agent(self, agent_name: str, document_text: str, context: Dict = None, use_cache: bool = True) -> AgentResult:
+        """Run one agent, falling back to a canned result if it fails"""
+        agent = self.agents[agent_name]
+        try:
+            print(f"Running {agent_name} agent...")
+            if context is not None:
+                result = agent.analyze(document_text, context, use_cache=use_cache)
+            else:
+                result = agent.analyze(document_text, use_cache=use_cache)
+            print(f"{agent_name} agent completed: Score {result.score:.1f}, Confidence {result.confidence}")
+            return result
+        except Exception as e:
+            print(f"Error in {agent_name} agent: {e}")
+            # Provide fallback result
+            return self._get_fallback_result(agent_name)
+    
     def _get_fallback_result(self, agent_name: str) -> AgentResult:
         """Provide fallback result when agent fails"""
         fallback_content = {
@@ -1247,6 +1379,21 @@ class AgentOrchestrator:
             'processing_time': result.processing_time
         }
     
+    @staticmethod
+    def deserialize_agent_result(data: Dict) -> AgentResult:
+        """Inverse of _serialize_agent_result, for results loaded back from storage"""
+        return AgentResult(
+            score=data['score'],
+            summary=data.get('summary') or '',
+            detailed_analysis=data.get('detailed_analysis') or '',
+            evidence=data.get('evidence') or [],
+            confidence=data.get('confidence') or 0.0,
+            raw_metrics=data.get('raw_metrics') or {},
+            normalized_metrics=data.get('normalized_metrics') or {},
+            calculation_details=data.get('calculation_details') or {},
+            processing_time=data.get('processing_time') or 0.0
+        )
+    
     def _generate_investment_recommendation(self, overall_score: float, agent_results: Dict, preferences: Dict) -> Dict:
         """Generate investment recommendation based on analysis"""
         if overall_score >= 80:
@@ -0,0 +1,363 @@
+import os
+import re
+import json
+import warnings
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Rows materialised at once; memory stays proportional to this, not to the sheet
+TABULAR_CHUNK_ROWS = int(os.getenv("TABULAR_CHUNK_ROWS", "50000"))
+TABULAR_SAMPLE_ROWS = int(os.getenv("TABULAR_SAMPLE_ROWS", "5"))
+# Upper bound on row-wise series kept from wide (metrics x months) sheets
+TABULAR_MAX_SERIES = int(os.getenv("TABULAR_MAX_SERIES", "50"))
+
+# Share of non-null values that must parse for a column to be typed numeric/datetime
+TYPE_INFERENCE_THRESHOLD = 0.9
+TYPE_INFERENCE_SAMPLE = 500
+DISTINCT_SAMPLE_VALUES = 5
+
+FINANCIAL_COLUMN_PATTERN = re.compile(
+    r'revenue|sales|amount|cost|expense|price|profit|income|margin|burn|cash|'
+    r'mrr|arr|gmv|balance|spend|payment|total|ebitda|cogs|opex',
+    re.IGNORECASE
+)
+_NUMERIC_NOISE = re.compile(r'[\s$€£₹,%]')
+
+
+def _to_numeric(values: pd.Series) -> pd.Series:
+    """Coerce a column to numbers, tolerating currency symbols and thousands separators"""
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype('float64')
+    cleaned = values.astype(str).str.replace(_NUMERIC_NOISE, '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def _to_datetime(values: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return pd.to_datetime(values, errors='coerce', format='mixed')
+
+
+def _infer_kind(values: pd.Series) -> str:
+    """Classify a column as numeric, datetime or text from a sample of its first chunk"""
+    sample = values.dropna().head(TYPE_INFERENCE_SAMPLE)
+    if sample.empty:
+        return 'text'
+    if pd.api.types.is_bool_dtype(sample):
+        return 'text'
+    if pd.api.types.is_numeric_dtype(sample):
+        return 'numeric'
+    if pd.api.types.is_datetime64_any_dtype(sample):
+        return 'datetime'
+    if _to_numeric(sample).notna().mean() >= TYPE_INFERENCE_THRESHOLD:
+        return 'numeric'
+    if _to_datetime(sample).notna().mean() >= TYPE_INFERENCE_THRESHOLD:
+        return 'datetime'
+    return 'text'
+
+
+def _header_period(value) -> Optional[pd.Period]:
+    """Month of a column header such as 'Jan 2024', '2024-01' or an Excel date cell"""
+    if value is None or isinstance(value, (int, float)):
+        return None
+    if isinstance(value, str):
+        if not re.search(r'[a-zA-Z]{3}|\d{4}[-/]\d{1,2}|\d{1,2}[-/]\d{4}', value):
+            return None
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        parsed = pd.to_datetime(value, errors='coerce')
+    if pd.isna(parsed):
+        return None
+    return parsed.to_period('M')
+
+
+class ColumnStats:
+    """Running statistics for one column, updated chunk by chunk"""
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.count = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.sum = 0.0
+        self.distinct_sample: List[str] = []
+
+    def update(self, values: pd.Series):
+        non_null = values.dropna()
+        self.nulls += len(values) - len(non_null)
+        self.count += len(non_null)
+        if non_null.empty:
+            return
+
+        if self.kind in ('numeric', 'datetime'):
+            chunk_min, chunk_max = non_null.min(), non_null.max()
+            self.min = chunk_min if self.min is None else min(self.min, chunk_min)
+            self.max = chunk_max if self.max is None else max(self.max, chunk_max)
+            if self.kind == 'numeric':
+                self.sum += float(non_null.sum())
+        elif len(self.distinct_sample) < DISTINCT_SAMPLE_VALUES:
+            for value in non_null.astype(str).unique()[:DISTINCT_SAMPLE_VALUES]:
+                if value not in self.distinct_sample and len(self.distinct_sample) < DISTINCT_SAMPLE_VALUES:
+                    self.distinct_sample.append(value)
+
+    def summary(self) -> Dict:
+        stats = {'dtype': self.kind, 'count': self.count, 'nulls': self.nulls}
+        if self.kind == 'numeric' and self.count:
+            stats.update({
+                'min': float(self.min),
+                'max': float(self.max),
+                'sum': self.sum,
+                'mean': self.sum / self.count
+            })
+        elif self.kind == 'datetime' and self.count:
+            stats.update({'min': self.min.isoformat(), 'max': self.max.isoformat()})
+        elif self.kind == 'text':
+            stats['sample_values'] = self.distinct_sample
+        return stats
+
+
+class SheetAccumulator:
+    """Folds a stream of DataFrame chunks into a bounded-size sheet summary.
+
+    Column types are inferred from the first chunk. Numeric columns are
+    aggregated per month of the first date column, and sheets that look
+    like financial time series are available as NumPy arrays through
+    `time_series`; `summary` carries them as plain lists so it stays
+    JSON-serializable.
+    """
+
+    def __init__(self, sample_rows: int = TABULAR_SAMPLE_ROWS, max_series: int = TABULAR_MAX_SERIES):
+        self.sample_rows = sample_rows
+        self.max_series = max_series
+        self.rows = 0
+        self.columns: List[str] = []
+        self.kinds: Dict[str, str] = {}
+        self.stats: Dict[str, ColumnStats] = {}
+        self.sample: List[Dict] = []
+        self.date_column: Optional[str] = None
+        self.monthly_sums: Dict[pd.Period, np.ndarray] = {}
+        self.monthly_rows: Dict[pd.Period, int] = {}
+        # Wide layout: one row per metric, one column per month
+        self.period_columns: Dict[str, pd.Period] = {}
+        self.wide_series: Dict[str, np.ndarray] = {}
+
+    def add(self, chunk: pd.DataFrame):
+        chunk = chunk.set_axis([str(column) for column in chunk.columns], axis=1)
+        if not self.columns:
+            # A header-only sheet still reports its columns
+            self._start(chunk)
+        if chunk.empty:
+            return
+
+        typed = pd.DataFrame(index=chunk.index)
+        for column in self.columns:
+            kind = self.kinds[column]
+            if kind == 'numeric':
+                typed[column] = _to_numeric(chunk[column])
+            elif kind == 'datetime':
+                typed[column] = _to_datetime(chunk[column])
+            else:
+                typed[column] = chunk[column]
+            self.stats[column].update(typed[column])
+
+        if len(self.sample) < self.sample_rows:
+            head = chunk.head(self.sample_rows - len(self.sample))
+            self.sample.extend(json.loads(head.to_json(orient='records', date_format='iso')))
+
+        self.rows += len(chunk)
+        self._add_monthly(typed)
+        self._add_wide(chunk)
+
+    def _start(self, chunk: pd.DataFrame):
+        self.columns = list(chunk.columns)
+        self.period_columns = {
+            column: period for column in self.columns
+            if (period := _header_period(column)) is not None
+        }
+        for column in self.columns:
+            kind = 'numeric' if column in self.period_columns else _infer_kind(chunk[column])
+            self.kinds[column] = kind
+            self.stats[column] = ColumnStats(column, kind)
+        self.date_column = next((column for column in self.columns if self.kinds[column] == 'datetime'), None)
+
+    @property
+    def numeric_columns(self) -> List[str]:
+        return [column for column in self.columns if self.kinds[column] == 'numeric']
+
+    def _add_monthly(self, typed: pd.DataFrame):
+        numeric_columns = self.numeric_columns
+        if not self.date_column or not numeric_columns:
+            return
+        dated = typed[typed[self.date_column].notna()]
+        if dated.empty:
+            return
+        periods = dated[self.date_column].dt.to_period('M')
+        grouped = dated[numeric_columns].groupby(periods)
+        sums = grouped.sum(min_count=1).fillna(0.0)
+        counts = grouped.size()
+        for period, row in sums.iterrows():
+            values = row.to_numpy(dtype='float64', copy=True)
+            if period in self.monthly_sums:
+                self.monthly_sums[period] += values
+            else:
+                self.monthly_sums[period] = values
+            self.monthly_rows[period] = self.monthly_rows.get(period, 0) + int(counts[period])
+
+    def _add_wide(self, chunk: pd.DataFrame):
+        if len(self.period_columns) < 3 or len(self.wide_series) >= self.max_series:
+            return
+        label_column = next((column for column in self.columns if column not in self.period_columns), None)
+        if label_column is None:
+            return
+        period_columns = sorted(self.period_columns, key=self.period_columns.get)
+        values = chunk[period_columns].apply(_to_numeric).to_numpy(dtype='float64')
+        for label, row in zip(chunk[label_column], values):
+            if len(self.wide_series) >= self.max_series:
+                break
+            if label is None or pd.isna(label) or np.isnan(row).all():
+                continue
+            self.wide_series[str(label).strip()] = row
+
+    def time_series(self) -> Optional[Dict]:
+        """Monthly NumPy arrays for sheets that look like financial time series"""
+        if self.wide_series:
+            periods = sorted(self.period_columns.values())
+            return {
+                'layout': 'wide',
+                'periods': np.array([str(period) for period in periods], dtype='datetime64[M]'),
+                'series': self.wide_series
+            }
+
+        financial_columns = [column for column in self.numeric_columns if FINANCIAL_COLUMN_PATTERN.search(column)]
+        if not financial_columns or len(self.monthly_sums) < 2:
+            return None
+        periods = sorted(self.monthly_sums)
+        matrix = np.vstack([self.monthly_sums[period] for period in periods])
+        numeric_columns = self.numeric_columns
+        return {
+            'layout': 'long',
+            'date_column': self.date_column,
+            'periods': np.array([str(period) for period in periods], dtype='datetime64[M]'),
+            'series': {column: matrix[:, numeric_columns.index(column)] for column in financial_columns},
+            'row_counts': np.array([self.monthly_rows[period] for period in periods], dtype='int64')
+        }
+
+    def summary(self) -> Dict:
+        summary = {
+            'columns': self.columns,
+            'shape': (self.rows, len(self.columns)),
+            'column_stats': {column: self.stats[column].summary() for column in self.columns},
+            'sample': self.sample
+        }
+        if self.monthly_sums:
+            numeric_columns = self.numeric_columns
+            summary['monthly'] = {
+                'date_column': self.date_column,
+                'months': {
+                    str(period): {
+                        'rows': self.monthly_rows[period],
+                        'sums': dict(zip(numeric_columns, self.monthly_sums[period].tolist()))
+                    }
+                    for period in sorted(self.monthly_sums)
+                }
+            }
+        time_series = self.time_series()
+        if time_series:
+            summary['time_series'] = self._time_series_lists(time_series)
+        return summary
+
+    @staticmethod
+    def _time_series_lists(time_series: Dict) -> Dict:
+        """time_series with its arrays as lists of str/float/int; missing values become None"""
+        converted = {
+            **time_series,
+            'periods': [str(period) for period in time_series['periods']],
+            'series': {
+                name: [None if np.isnan(value) else float(value) for value in values]
+                for name, values in time_series['series'].items()
+            }
+        }
+        if 'row_counts' in time_series:
+            converted['row_counts'] = time_series['row_counts'].tolist()
+        return converted
+
+
+class TabularSummarizer:
+    """Bounded-memory summaries of CSV and Excel files.
+
+    Files are read in chunks of `chunk_rows` rows (pandas chunked CSV
+    reader, openpyxl read-only mode for Excel) and folded into per-column
+    statistics, monthly aggregates and a small sample instead of full
+    row records.
+    """
+
+    def __init__(self, chunk_rows: int = TABULAR_CHUNK_ROWS, sample_rows: int = TABULAR_SAMPLE_ROWS):
+        self.chunk_rows = max(1, chunk_rows)
+        self.sample_rows = sample_rows
+
+    def summarize_csv(self, file_path: str) -> Dict:
+        accumulator = SheetAccumulator(self.sample_rows)
+        for chunk in pd.read_csv(file_path, chunksize=self.chunk_rows):
+            accumulator.add(chunk)
+        return accumulator.summary()
+
+    def summarize_excel(self, file_path: str) -> Dict[str, Dict]:
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            sheets = {}
+            for worksheet in workbook.worksheets:
+                accumulator = SheetAccumulator(self.sample_rows)
+                for chunk in self._iter_sheet_chunks(worksheet):
+                    accumulator.add(chunk)
+                sheets[worksheet.title] = accumulator.summary()
+            return sheets
+        finally:
+            workbook.close()
+
+    def _iter_sheet_chunks(self, worksheet) -> Iterator[pd.DataFrame]:
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = self._column_names(header)
+
+        batch, emitted = [], False
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            batch.append(row[:len(columns)] + (None,) * (len(columns) - len(row)))
+            if len(batch) >= self.chunk_rows:
+                yield pd.DataFrame(batch, columns=columns)
+                batch, emitted = [], True
+        if batch or not emitted:
+            # An empty frame for a header-only sheet, so its columns are kept
+            yield pd.DataFrame(batch, columns=columns)
+
+    @staticmethod
+    def _column_names(header) -> List:
+        """Header cells as column labels; blank and repeated headers get unique names"""
+        columns, seen = [], set()
+        for index, value in enumerate(header):
+            name = value if value is not None and str(value).strip() else f"column_{index + 1}"
+            if not hasattr(name, 'year'):
+                name = str(name).strip()
+            while str(name) in seen:
+                name = f"{name}_{index + 1}"
+            seen.add(str(name))
+            columns.append(name)
+        return columns
+
+
+# Shared summarizer used by the document processors
+tabular_summarizer = TabularSummarizer()
@@ -204,6 +204,26 @@ class FeedbackLog(Base):
     
     created_at = Column(DateTime, server_default=func.now())
 
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+
+    id = Column(String, primary_key=True)  # UUID
+    job_type = Column(String, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    username = Column(String)
+    status = Column(String, default="queued", index=True)  # queued, running, completed, failed
+
+    # Everything the worker needs to run the job; uploads are referenced by stored path
+    payload = Column(JSON)
+    result = Column(JSON)
+    error = Column(Text)
+    attempts = Column(Integer, default=0)
+
+    # Timestamps
+    created_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
 # Update UserDB to include relationships
 from models.user import UserDB
 UserDB.projects = relationship("AnalysisProject", back_populates="user")
\ No newline at end of file
@@ -1,65 +1,83 @@
+import json
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
-import os
-from groq import Groq
 from core.auth import get_current_user
 from models.user import UserDB as User
+from ml_services.llm_client import llm_client
+try:
+    from core.websocket_manager import websocket_manager
+except ImportError:
+    websocket_manager = None
 
 router = APIRouter()
 
 class ChatMessage(BaseModel):
     message: str
     context: Optional[dict] = None
+    # Set to stream the reply over the user's WebSocket as chat_token messages
+    session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
     confidence: float
 
+def build_chat_prompt(chat_message: ChatMessage):
+    """System and user messages for a chat request, with the analysis context if any"""
+    # Build context-aware prompt
+    system_prompt = """You are an AI investment analyst assistant. You help explain startup analysis results, 
+    answer questions about investment scores, and provide insights about startup evaluations. 
+    Be concise, professional, and focus on actionable insights."""
+    
+    # Add context if available
+    context_info = ""
+    if chat_message.context:
+        context_info = f"""
+        Current Analysis Context:
+        - Overall Score: {chat_message.context.get('overallScore', 'N/A')}
+        - Founder Score: {chat_message.context.get('founderScore', 'N/A')}
+        - Market Score: {chat_message.context.get('marketScore', 'N/A')}
+        - Differentiator Score: {chat_message.context.get('differentiatorScore', 'N/A')}
+        - Business Metrics Score: {chat_message.context.get('metricsScore', 'N/A')}
+        - Company: {chat_message.context.get('companyName', 'Unknown')}
+        """
+    
+    user_prompt = f"{context_info}\n\nUser Question: {chat_message.message}"
+    return [
+        ("system", system_prompt),
+        ("human", user_prompt)
+    ]
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_ai(
     chat_message: ChatMessage,
     current_user: User = Depends(get_current_user)
 ):
     """
-    Chat with AI assistant about analysis results
+    Chat with AI assistant about analysis results.
+    With a session_id and an open WebSocket, the reply is also streamed as chat_token messages.
     """
     try:
-        # Initialize GROQ client
-        client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-        
-        # Build context-aware prompt
-        system_prompt = """You are an AI investment analyst assistant. You help explain startup analysis results, 
-        answer questions about investment scores, and provide insights about startup evaluations. 
-        Be concise, professional, and focus on actionable insights."""
+        on_token = None
+        username = current_user.username
+        if chat_message.session_id and websocket_manager and websocket_manager.is_user_connected(username):
+            async def on_token(token):
+                await websocket_manager.send_chat_token(username, chat_message.session_id, token)
         
-        # Add context if available
-        context_info = ""
-        if chat_message.context:
-            context_info = f"""
-            Current Analysis Context:
-            - Overall Score: {chat_message.context.get('overallScore', 'N/A')}
-            - Founder Score: {chat_message.context.get('founderScore', 'N/A')}
-            - Market Score: {chat_message.context.get('marketScore', 'N/A')}
-            - Differentiator Score: {chat_message.context.get('differentiatorScore', 'N/A')}
-            - Business Metrics Score: {chat_message.context.get('metricsScore', 'N/A')}
-            - Company: {chat_message.context.get('companyName', 'Unknown')}
-            """
-        
-        user_prompt = f"{context_info}\n\nUser Question: {chat_message.message}"
-        
-        # Call GROQ API
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            model="llama-3.1-8b-instant",
-            temperature=0.7,
-            max_tokens=500
+        # Call GROQ API through the shared chat model
+        chat_completion = await llm_client.ainvoke(
+            build_chat_prompt(chat_message),
+            llm_client.profile('chat'),
+            on_token=on_token,
+            priority='interactive',
+            name='chat'
         )
         
-        response_text = chat_completion.choices[0].message.content
+        response_text = chat_completion.content
+        if on_token:
+            await websocket_manager.send_chat_token(username, chat_message.session_id, "", done=True)
         
         return ChatResponse(
             response=response_text,
@@ -69,6 +87,57 @@ async def chat_with_ai(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
 
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@router.post("/chat/stream")
+async def stream_chat_with_ai(
+    chat_message: ChatMessage,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Server-Sent Events variant of /chat: a `data: {"token": ...}` event per chunk,
+    then a `done` event carrying the full response (or an `error` event)
+    """
+    async def events():
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def on_token(token):
+            await queue.put(sse_event({'token': token}))
+        
+        async def produce():
+            try:
+                response = await llm_client.ainvoke(
+                    build_chat_prompt(chat_message),
+                    llm_client.profile('chat'),
+                    on_token=on_token,
+                    priority='interactive',
+                    name='chat'
+                )
+                await queue.put(sse_event({'response': response.content, 'confidence': 0.85}, 'done'))
+            except Exception as e:
+                await queue.put(sse_event({'detail': f"Chat failed: {str(e)}"}, 'error'))
+            finally:
+                await queue.put(None)
+        
+        # The LLM call runs as its own task so a client disconnect cancels it
+        task = asyncio.create_task(produce())
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            task.cancel()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @router.get("/chat/suggestions")
 async def get_chat_suggestions(current_user: User = Depends(get_current_user)):
     """
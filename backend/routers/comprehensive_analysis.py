@@ -1,15 +1,22 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from core.database import get_db
+from core.database import get_db, SessionLocal
 from core.auth import get_current_user
+from core.job_queue import JobQueue, JobQueueFull, serialize_job
 from models.user import UserDB
+from models.analysis import AnalysisProject, Analysis, AgentResult, UploadedFile, AnalysisJob
+from core.upload_store import upload_store
 from ml_services.specialized_agents import AgentOrchestrator
+from ml_services.document_extraction import document_extraction_service, ExtractionResult, SUPPORTED_EXTENSIONS
+from ml_services.llm_metrics import llm_metrics
+from ml_services.document_fingerprint import fingerprint_file
 import os
 import json
 import uuid
+import time
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 import asyncio
 from pathlib import Path
 
@@ -23,20 +30,58 @@ def get_agent_orchestrator():
     return _agent_orchestrator
 
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+# Analyses run in this many background workers; submissions beyond ANALYSIS_MAX_QUEUED get a 503
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+ANALYSIS_MAX_QUEUED = int(os.getenv("ANALYSIS_MAX_QUEUED", "50"))
+# A job interrupted by this many restarts is marked failed instead of re-queued
+ANALYSIS_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_MAX_ATTEMPTS", "3"))
+# Seconds before a failed job's first retry; doubles with every further attempt
+ANALYSIS_RETRY_DELAY = float(os.getenv("ANALYSIS_RETRY_DELAY", "5"))
 
-@router.post("/comprehensive-analysis")
+@router.post("/comprehensive-analysis", status_code=202)
 async def run_comprehensive_analysis(
     files: List[UploadFile] = File(...),
     investor_preferences: Optional[str] = Form(None),
-    background_tasks: BackgroundTasks = BackgroundTasks(),
+    refresh: bool = Form(False),
+    current_user: UserDB = Depends(get_current_user)
+):
+    """Queue a comprehensive multi-agent startup analysis and return its job id"""
+    return await queue_analysis(str(uuid.uuid4()), files, investor_preferences, refresh, current_user)
+
+@router.post("/projects/{project_id}/files", status_code=202)
+async def add_project_files(
+    project_id: str,
+    files: List[UploadFile] = File(...),
+    investor_preferences: Optional[str] = Form(None),
+    refresh: bool = Form(False),
     current_user: UserDB = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Run comprehensive multi-agent startup analysis"""
+    """Add documents to an analysed project, or replace ones with the same filename, and queue a re-analysis.
     
+    Only agents whose input chunks changed are re-run; the others reuse
+    their stored results. refresh=true re-runs every agent.
+    """
+    project = db.query(AnalysisProject).filter(
+        AnalysisProject.id == project_id,
+        AnalysisProject.user_id == current_user.id
+    ).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found or not analysed yet")
+    
+    return await queue_analysis(project_id, files, investor_preferences, refresh, current_user, incremental=True)
+
+async def queue_analysis(
+    project_id: str,
+    files: List[UploadFile],
+    investor_preferences: Optional[str],
+    refresh: bool,
+    current_user: UserDB,
+    incremental: bool = False
+) -> Dict:
     try:
-        # Create analysis project
-        project_id = str(uuid.uuid4())
+        # The analysis id doubles as the job id
         analysis_id = str(uuid.uuid4())
         
         # Parse investor preferences
@@ -47,38 +92,145 @@ async def run_comprehensive_analysis(
             except json.JSONDecodeError:
                 preferences = {}
         
-        # Skip database operations for now to focus on agent analysis
-        print(f"Starting analysis for user {current_user.username}")
+        # Reject weights no agent can use before anything is stored
+        try:
+            get_agent_orchestrator().resolve_weights(preferences)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid investor preferences: {str(e)}")
+        
+        print(f"Queueing {'incremental ' if incremental else ''}analysis for user {current_user.username}")
         print(f"Project ID: {project_id}, Analysis ID: {analysis_id}")
-        print(f"Preferences: {preferences}")
         
-        # Run analysis directly (not in background for debugging)
-        print(f"Running analysis directly...")
+        # Save uploads now so the job only references stored files and survives a restart
+        save_semaphore = asyncio.Semaphore(INGEST_CONCURRENCY)
+        stored_files = await asyncio.gather(*[save_upload(file, save_semaphore) for file in files])
         
-        results = await process_comprehensive_analysis(
-            project_id,
-            analysis_id,
-            files,
-            preferences,
+        job = await analysis_job_queue.submit(
             current_user.id,
-            current_user.username
+            current_user.username,
+            {
+                'project_id': project_id,
+                'analysis_id': analysis_id,
+                'files': stored_files,
+                'preferences': preferences,
+                'use_llm_cache': not refresh,
+                'incremental': incremental
+            },
+            job_id=analysis_id
         )
         
-        print(f"Analysis completed, returning results...")
-        return results
+        return {
+            **job,
+            "analysis_id": analysis_id,
+            "project_id": project_id,
+            "status_url": f"/api/v2/analysis/{analysis_id}"
+        }
         
+    except HTTPException:
+        raise
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Analysis queue is full, try again later: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to start analysis: {str(e)}")
 
+@router.get("/analysis/{analysis_id}")
+async def get_comprehensive_analysis(
+    analysis_id: str,
+    current_user: UserDB = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Status of a queued analysis, with the results under `result` once completed"""
+    job = db.query(AnalysisJob).filter(
+        AnalysisJob.id == analysis_id,
+        AnalysisJob.user_id == current_user.id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    
+    return {
+        **serialize_job(job),
+        "analysis_id": job.id,
+        "project_id": (job.payload or {}).get('project_id')
+    }
+
+@router.post("/analysis/{analysis_id}/rescore")
+async def rescore_analysis(
+    analysis_id: str,
+    preferences: Dict,
+    current_user: UserDB = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Re-weight a finished analysis with new investor preferences without re-running any agent"""
+    start = time.perf_counter()
+    analysis = db.query(Analysis).join(AnalysisProject, Analysis.project_id == AnalysisProject.id).filter(
+        Analysis.id == analysis_id,
+        AnalysisProject.user_id == current_user.id
+    ).first()
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found or not finished yet")
+    
+    rows = db.query(AgentResult).filter(AgentResult.analysis_id == analysis_id).all()
+    agent_results = {
+        row.agent_type: AgentOrchestrator.deserialize_agent_result(agent_result_dict(row)) for row in rows
+    }
+    try:
+        scores = get_agent_orchestrator().score_results(agent_results, preferences)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid investor preferences: {str(e)}")
+    
+    return {
+        "analysis_id": analysis_id,
+        "project_id": analysis.project_id,
+        "overall_score": scores['overall_score'],
+        "confidence": scores['overall_confidence'],
+        "investment_recommendation": scores['investment_recommendation'],
+        "category_scores": {agent_name: result.score for agent_name, result in agent_results.items()},
+        "success_prediction": predict_success(scores['overall_score']),
+        "key_insights": scores['key_insights'],
+        "next_steps": scores['next_steps'],
+        "weights_used": scores['weights_used'],
+        "rescore_time_ms": round((time.perf_counter() - start) * 1000, 2)
+    }
+
+async def run_analysis_job(job: Dict) -> Dict:
+    """Job handler for the analysis queue"""
+    payload = job['payload']
+    return await process_comprehensive_analysis(
+        payload['project_id'],
+        payload['analysis_id'],
+        payload['files'],
+        payload.get('preferences') or {},
+        job['user_id'],
+        job['username'],
+        use_llm_cache=payload.get('use_llm_cache', True),
+        incremental=payload.get('incremental', False)
+    )
+
+analysis_job_queue = JobQueue(
+    'comprehensive_analysis',
+    run_analysis_job,
+    workers=ANALYSIS_WORKERS,
+    max_queued=ANALYSIS_MAX_QUEUED,
+    max_attempts=ANALYSIS_MAX_ATTEMPTS,
+    retry_delay=ANALYSIS_RETRY_DELAY
+)
+
 async def process_comprehensive_analysis(
     project_id: str,
     analysis_id: str,
-    files: List[UploadFile],
+    files: List[Dict],
     preferences: Dict,
     user_id: int,
-    username: str
+    username: str,
+    use_llm_cache: bool = True,
+    incremental: bool = False
 ):
-    """Simplified background task for comprehensive analysis"""
+    """Run the agents over stored uploads and persist the results.
+    
+    With incremental=True the uploads are merged into the project's
+    current documents and agents whose inputs are unchanged since the
+    project's last analysis reuse their stored results.
+    """
     
     start_time = datetime.now()
     
@@ -92,28 +244,27 @@ async def process_comprehensive_analysis(
         
         # Step 1: File Processing and Text Extraction
         print(f"\n--- Step 1: Document Processing ---")
-        document_texts = []
+        document_stage_start = time.perf_counter()
+        
+        # Extract all files concurrently, bounded by INGEST_CONCURRENCY
+        ingest_semaphore = asyncio.Semaphore(INGEST_CONCURRENCY)
+        ingested_files = await asyncio.gather(*[
+            ingest_file(stored_file, ingest_semaphore) for stored_file in files
+        ])
+        document_stage_time = time.perf_counter() - document_stage_start
+        print(f"Document stage completed in {document_stage_time:.2f}s for {len(files)} files")
         
-        for file in files:
-            # Save file
-            user_dir = Path(UPLOAD_DIR) / username
-            user_dir.mkdir(parents=True, exist_ok=True)
-            file_path = user_dir / file.filename
-            
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
-            
-            # Extract text
-            extracted_text = await extract_document_text(str(file_path))
-            document_texts.append(extracted_text)
-            print(f"Processed file: {file.filename} ({len(extracted_text)} chars)")
+        # Step 2: Merge into the project's current documents
+        project_state = await asyncio.to_thread(load_project_state, project_id) if incremental else None
+        documents, replaced_file_ids = merge_project_documents(
+            project_state['documents'] if project_state else [], ingested_files
+        )
         
-        # Combine all document texts
-        combined_text = "\n\n".join(document_texts)
+        # Combine all document texts, in project order
+        combined_text = "\n\n".join(document['text'] for document in documents)
         print(f"Combined text length: {len(combined_text)} characters")
         
-        # Step 2: Extract company name
+        # Extract company name
         company_name = extract_company_name(combined_text)
         print(f"Detected company name: {company_name}")
         
@@ -121,12 +272,32 @@ async def process_comprehensive_analysis(
         print(f"\n--- Step 3: AI Agent Analysis ---")
         print(f"Running AgentOrchestrator.run_comprehensive_analysis...")
         
-        # Run comprehensive agent analysis
+        # Run comprehensive agent analysis. Incremental runs give each agent the
+        # chunks relevant to it, so edits elsewhere don't re-run it; a fresh
+        # analysis gives every agent the full text and stores the selected-chunk
+        # fingerprints for the next incremental run to compare
         orchestrator = get_agent_orchestrator()
-        agent_results = orchestrator.run_comprehensive_analysis(
-            combined_text, 
-            preferences
+        agent_inputs = orchestrator.agent_inputs(
+            [document['text'] for document in documents], selective=incremental
         )
+        reuse = {}
+        if project_state and use_llm_cache:
+            reuse = reusable_agent_results(
+                project_state['agent_results'], agent_inputs,
+                {agent_name: agent.version for agent_name, agent in orchestrator.agents.items()}
+            )
+        print(f"Reusing unchanged agents: {sorted(reuse) or 'none'}")
+        
+        with llm_metrics.capture() as analysis_llm_metrics:
+            # Agents block on LLM calls; run the graph off the event loop
+            agent_results = await asyncio.to_thread(
+                orchestrator.run_comprehensive_analysis,
+                combined_text, 
+                preferences,
+                use_cache=use_llm_cache,
+                agent_inputs=agent_inputs,
+                reuse=reuse
+            )
         
         print(f"Agent analysis completed!")
         print(f"Overall score: {agent_results.get('overall_score', 'N/A')}")
@@ -147,9 +318,8 @@ async def process_comprehensive_analysis(
         
         print(f"Category scores: {category_scores}")
         
-        # Calculate success probability
         overall_score = agent_results.get('overall_score', 60)
-        success_probability = min(0.95, max(0.05, overall_score / 100))
+        success_prediction = predict_success(overall_score)
         
         final_results = {
             "analysis_id": analysis_id,
@@ -163,30 +333,36 @@ async def process_comprehensive_analysis(
             }),
             "category_scores": category_scores,
             "agent_results": agent_data,
-            "success_prediction": {
-                "success_probability": success_probability,
-                "success_percentage": f"{round(success_probability * 100, 1)}%",
-                "success_category": "High" if success_probability >= 0.7 else "Moderate" if success_probability >= 0.5 else "Low"
-            },
+            "success_prediction": success_prediction,
             "key_insights": agent_results.get('key_insights', []),
             "next_steps": agent_results.get('next_steps', []),
             "analysis_metadata": {
                 "processing_time": (datetime.now() - start_time).total_seconds(),
                 "files_processed": len(files),
+                "project_files": len(documents),
                 "text_length": len(combined_text),
                 "timestamp": datetime.now().isoformat(),
                 "ai_model": "GROQ llama-3.1-8b-instant",
-                "agents_run": list(agent_data.keys())
+                "agents_run": list(agent_data.keys()),
+                "agents_reused": sorted(reuse),
+                "agents_memoized": agent_results.get('analysis_metadata', {}).get('agents_memoized', []),
+                "agent_versions": agent_results.get('analysis_metadata', {}).get('agent_versions', {}),
+                "weights_used": agent_results.get('analysis_metadata', {}).get('weights_used', {}),
+                "input_fingerprints": {agent_name: agent_input['fingerprint'] for agent_name, agent_input in agent_inputs.items()},
+                "selected_fingerprints": {agent_name: agent_input['selected_fingerprint'] for agent_name, agent_input in agent_inputs.items()},
+                "incremental": {
+                    "base_analysis_id": project_state['analysis_id'],
+                    "files_added": len(ingested_files) - len(replaced_file_ids),
+                    "files_replaced": len(replaced_file_ids),
+                    "agents_rerun": sorted(set(agent_data) - set(reuse))
+                } if project_state else None,
+                "document_stage_time": document_stage_time,
+                "file_timings": [ingested['timing'] for ingested in ingested_files],
+                "agent_timings": agent_results.get('analysis_metadata', {}).get('agent_timings', {}),
+                "llm_metrics": analysis_llm_metrics.snapshot(buckets=False)
             }
         }
         
-        print(f"\n=== ANALYSIS COMPLETE ===")
-        print(f"Overall Score: {overall_score}")
-        print(f"Processing Time: {(datetime.now() - start_time).total_seconds():.2f}s")
-        print(f"Success Probability: {success_probability:.1%}")
-        
-        return final_results
-        
     except Exception as e:
         print(f"\n❌ ANALYSIS FAILED: {str(e)}")
         import traceback
@@ -200,40 +376,278 @@ async def process_comprehensive_analysis(
             "status": "failed",
             "processing_time": (datetime.now() - start_time).total_seconds()
         }
+    
+    # Outside the try: a failed write raises, so the job queue retries the job
+    await asyncio.to_thread(persist_analysis, final_results, documents, replaced_file_ids, user_id, start_time)
+    
+    print(f"\n=== ANALYSIS COMPLETE ===")
+    print(f"Overall Score: {overall_score}")
+    print(f"Processing Time: {(datetime.now() - start_time).total_seconds():.2f}s")
+    print(f"Success Probability: {success_prediction['success_probability']:.1%}")
+    
+    return final_results
+
+async def save_upload(file: UploadFile, semaphore: asyncio.Semaphore) -> Dict:
+    """Stream one upload into the content-addressed store and describe where it landed"""
+    async with semaphore:
+        start = time.perf_counter()
+        stored_upload = await upload_store.save(file)
+    
+    return {
+        'filename': file.filename,
+        'content_type': file.content_type,
+        'file_path': stored_upload.file_path,
+        'content_hash': stored_upload.content_hash,
+        'size': stored_upload.size,
+        'deduplicated': stored_upload.deduplicated,
+        'save_time': time.perf_counter() - start
+    }
+
+async def ingest_file(stored_file: Dict, semaphore: asyncio.Semaphore) -> Dict:
+    """Extract a single stored upload, recording how long it took"""
+    async with semaphore:
+        start = time.perf_counter()
+        extraction = await extract_document(stored_file['file_path'])
+        extracted_text = extraction.text
+        extracted = time.perf_counter()
+    
+    print(f"Processed file: {stored_file['filename']} ({len(extracted_text)} chars) in {extracted - start:.2f}s")
+    
+    return {
+        'text': extracted_text,
+        'stored_file': stored_file,
+        'timing': {
+            'filename': stored_file['filename'],
+            'content_hash': stored_file['content_hash'],
+            'size': stored_file['size'],
+            'deduplicated': stored_file['deduplicated'],
+            'save_time': stored_file['save_time'],
+            'extract_time': extracted - start,
+            'total_time': stored_file['save_time'] + extracted - start,
+            'text_length': len(extracted_text),
+            'extraction': extraction.summary()
+        }
+    }
 
-async def extract_document_text(file_path: str) -> str:
-    """Extract text from various document formats"""
+def predict_success(overall_score: float) -> Dict:
+    success_probability = min(0.95, max(0.05, overall_score / 100))
+    return {
+        "success_probability": success_probability,
+        "success_percentage": f"{round(success_probability * 100, 1)}%",
+        "success_category": "High" if success_probability >= 0.7 else "Moderate" if success_probability >= 0.5 else "Low"
+    }
+
+def agent_result_dict(row: AgentResult) -> Dict:
+    """A stored AgentResult row in the orchestrator's serialized form"""
+    return {
+        'score': row.score,
+        'summary': row.summary,
+        'detailed_analysis': row.detailed_analysis,
+        'evidence': row.evidence,
+        'confidence': row.confidence,
+        'raw_metrics': row.raw_metrics,
+        'normalized_metrics': row.normalized_metrics,
+        'calculation_details': row.calculation_details,
+        'processing_time': row.processing_time
+    }
+
+def load_project_state(project_id: str) -> Dict:
+    """The project's current documents and its latest analysis's agent results"""
+    db = SessionLocal()
+    try:
+        files = db.query(UploadedFile).filter(
+            UploadedFile.project_id == project_id,
+            UploadedFile.status == "processed"
+        ).all()
+        files.sort(key=lambda row: (row.file_metadata or {}).get('position', 0))
+        documents = [{
+            'file_id': row.id,
+            'text': row.extracted_text or "",
+            'stored_file': {
+                'filename': row.filename,
+                'file_path': row.file_path,
+                'content_hash': (row.file_metadata or {}).get('content_hash'),
+                'size': row.file_size
+            },
+            'timing': row.file_metadata or {}
+        } for row in files]
+        
+        analysis = db.query(Analysis).filter(
+            Analysis.project_id == project_id
+        ).order_by(Analysis.created_at.desc()).first()
+        agent_results = {}
+        if analysis:
+            for row in db.query(AgentResult).filter(AgentResult.analysis_id == analysis.id).all():
+                agent_results[row.agent_type] = agent_result_dict(row)
+        
+        return {
+            'analysis_id': analysis.id if analysis else None,
+            'documents': documents,
+            'agent_results': agent_results
+        }
+    finally:
+        db.close()
+
+def merge_project_documents(existing: List[Dict], ingested_files: List[Dict]) -> Tuple[List[Dict], List[str]]:
+    """Existing documents with same-named uploads replaced in place and new ones appended.
     
-    file_ext = Path(file_path).suffix.lower()
+    Returns the merged documents and the ids of the UploadedFile rows that were replaced.
+    """
+    documents = list(existing)
+    replaced_file_ids = []
+    for ingested in ingested_files:
+        filename = ingested['stored_file']['filename']
+        index = next((
+            i for i, document in enumerate(documents)
+            if document.get('file_id') and document['stored_file']['filename'] == filename
+        ), None)
+        if index is None:
+            documents.append(ingested)
+        else:
+            replaced_file_ids.append(documents[index]['file_id'])
+            documents[index] = ingested
+    return documents, replaced_file_ids
+
+def reusable_agent_results(stored_results: Dict[str, Dict], agent_inputs: Dict[str, Dict], agent_versions: Dict[str, str]) -> Dict:
+    """Stored agent results whose agent version and selected-chunk fingerprint match the current ones.
+
+    Fresh analyses store the selected fingerprint too, so the first
+    incremental run after one can reuse its results.
+    """
+    reuse = {}
+    for agent_name, stored in stored_results.items():
+        details = stored.get('calculation_details') or {}
+        if details.get('fallback') or details.get('upstream_fallback') or agent_name not in agent_inputs:
+            continue
+        if (details.get('selected_fingerprint') == agent_inputs[agent_name]['selected_fingerprint']
+                and details.get('agent_version') == agent_versions.get(agent_name)):
+            reuse[agent_name] = AgentOrchestrator.deserialize_agent_result(stored)
     
+    # A re-run upstream agent can change the risk agent's context even when the fingerprints match
+    # (e.g. it fell back last time), so risk is only reused along with all of them
+    if 'risk' in reuse and any(agent_name not in reuse for agent_name in agent_inputs if agent_name != 'risk'):
+        del reuse['risk']
+    return reuse
+
+def _row_id(*parts: str) -> str:
+    """Stable row id, so a job re-run after a restart overwrites its own rows"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, "/".join(parts)))
+
+def persist_analysis(final_results: Dict, documents: List[Dict], replaced_file_ids: List[str], user_id: int, start_time: datetime):
+    """Store a finished analysis as AnalysisProject, Analysis, AgentResult and UploadedFile rows"""
+    db = SessionLocal()
     try:
-        if file_ext == '.pdf':
-            import PyPDF2
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
+        project_id = final_results['project_id']
+        analysis_id = final_results['analysis_id']
+        category_scores = final_results['category_scores']
+        agent_data = final_results['agent_results']
+        confidence = final_results['confidence']
+        metadata = final_results['analysis_metadata']
         
-        elif file_ext in ['.doc', '.docx']:
-            try:
-                import docx2txt
-                return docx2txt.process(file_path)
-            except ImportError:
-                from docx import Document
-                doc = Document(file_path)
-                return "\n".join([paragraph.text for paragraph in doc.paragraphs])
+        project = db.get(AnalysisProject, project_id)
+        if project is None:
+            project = AnalysisProject(id=project_id, user_id=user_id)
+            db.add(project)
+        project.company_name = final_results['company_name']
+        project.status = "completed"
+        db.flush()
         
-        elif file_ext == '.txt':
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
+        for position, document in enumerate(documents):
+            if document.get('file_id'):
+                # Already stored by an earlier analysis
+                continue
+            stored_file = document['stored_file']
+            db.merge(UploadedFile(
+                id=_row_id(analysis_id, str(position), stored_file['content_hash']),
+                project_id=project_id,
+                filename=stored_file['filename'],
+                file_path=stored_file['file_path'],
+                file_type=Path(stored_file['filename'] or stored_file['file_path']).suffix.lower(),
+                file_size=stored_file['size'],
+                status="processed",
+                extracted_text=document['text'],
+                file_metadata={**document['timing'], **fingerprint_file(document['text']), 'position': position},
+                uploaded_at=datetime.now(),
+                processed_at=datetime.now()
+            ))
+        if replaced_file_ids:
+            db.query(UploadedFile).filter(UploadedFile.id.in_(replaced_file_ids)).update(
+                {UploadedFile.status: "superseded"}, synchronize_session=False
+            )
         
-        else:
-            return f"Unsupported file format: {file_ext}"
-            
+        db.merge(Analysis(
+            id=analysis_id,
+            project_id=project_id,
+            overall_score=final_results['overall_score'],
+            founder_score=category_scores['founder'],
+            market_score=category_scores['market'],
+            traction_score=category_scores['traction'],
+            finance_score=category_scores['finance'],
+            risk_score=category_scores['risk'],
+            confidence_score=confidence,
+            confidence_level="high" if confidence >= 0.8 else "medium" if confidence >= 0.6 else "low",
+            scores=category_scores,
+            evidence={agent_type: result.get('evidence') for agent_type, result in agent_data.items()},
+            success_probability=final_results['success_prediction']['success_probability'],
+            investment_recommendation=final_results['investment_recommendation'].get('recommendation'),
+            key_strengths=final_results['key_insights'],
+            key_risks=agent_data.get('risk', {}).get('evidence'),
+            # Set here rather than by the database so analyses in the same second still order correctly
+            created_at=datetime.now(),
+            analysis_duration=(datetime.now() - start_time).total_seconds()
+        ))
+        db.flush()
+        
+        for agent_type, result in agent_data.items():
+            db.merge(AgentResult(
+                id=_row_id(analysis_id, agent_type),
+                analysis_id=analysis_id,
+                agent_type=agent_type,
+                score=result.get('score'),
+                summary=result.get('summary'),
+                detailed_analysis=result.get('detailed_analysis'),
+                evidence=result.get('evidence'),
+                confidence=result.get('confidence'),
+                raw_metrics=result.get('raw_metrics'),
+                normalized_metrics=result.get('normalized_metrics'),
+                calculation_details={
+                    **(result.get('calculation_details') or {}),
+                    'input_fingerprint': metadata['input_fingerprints'].get(agent_type),
+                    'selected_fingerprint': metadata['selected_fingerprints'].get(agent_type),
+                    'agent_version': metadata['agent_versions'].get(agent_type),
+                    'reused': agent_type in metadata['agents_reused']
+                },
+                processing_time=result.get('processing_time'),
+                model_used=get_agent_orchestrator().agents[agent_type].model_name
+            ))
+        
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+async def extract_document(file_path: str) -> ExtractionResult:
+    """Extract a document through the shared extraction service without blocking the event loop"""
+    
+    file_ext = Path(file_path).suffix.lower()
+    
+    if file_ext not in SUPPORTED_EXTENSIONS:
+        return ExtractionResult(text=f"Unsupported file format: {file_ext}", tier='none', file_type=file_ext)
+    
+    try:
+        return await document_extraction_service.aextract(file_path)
     except Exception as e:
-        return f"Error extracting text from {file_path}: {str(e)}"
+        return ExtractionResult(
+            text=f"Error extracting text from {file_path}: {str(e)}",
+            tier='none',
+            file_type=file_ext
+        )
+
+async def extract_document_text(file_path: str) -> str:
+    """Extract text from various document formats"""
+    return (await extract_document(file_path)).text
 
 def extract_company_name(text: str) -> str:
     """Extract company name from document text"""
@@ -321,7 +735,6 @@ async def get_investor_preferences(
     return {
         "founder_weight": 25.0,
         "market_weight": 25.0,
-        "product_weight": 20.0,
         "traction_weight": 15.0,
         "finance_weight": 10.0,
         "risk_weight": 5.0,
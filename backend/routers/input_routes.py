@@ -13,8 +13,13 @@ from core.config import ALLOWED_EXTENSIONS, ALLOWED_TYPES
 from models.user import UserDB
 from core.auth import get_current_user
 from typing import Optional
-from ml_services.generate_reports import GenerateReports
+from ml_services.generate_reports import GenerateReports, REPORT_SECTIONS, COMBINED_ANALYSIS
 from core.progress_tracker import SimpleProgressTracker
+from core.upload_store import upload_store
+from core.task_graph import TaskGraph
+from ml_services.document_cache import document_text_cache
+from ml_services.document_extraction import document_extraction_service
+from ml_services.llm_client import llm_client
 try:
     from ml_services.advanced_document_processor import AdvancedDocumentProcessor
 except ImportError:
@@ -50,31 +55,38 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 router = APIRouter()
 
 
-async def enhanced_analysis(username, file_path, query):
+def analysis_token_streamer(username, session_id, section):
+    """Async callback forwarding a section's LLM output to the user's WebSocket, or None when nobody listens"""
+    if not websocket_manager or not session_id or not websocket_manager.is_user_connected(username):
+        return None
+
+    async def on_token(token):
+        await websocket_manager.send_analysis_token(username, session_id, section, token)
+    return on_token
+
+
+async def enhanced_analysis(username, file_path, query, use_cache=True, session_id=None):
     """Real AI analysis using GROQ LLM"""
     try:
         print(f"Starting analysis for {query}")
         
-        # Use the working GenerateReports class
-        generate_reports = GenerateReports(username, file_path, query)
-        generate_reports.get_vector_db()
-        generate_reports.get_context()
+        # Use the working GenerateReports class; prompt loading and text
+        # extraction block, so they run in worker threads
+        generate_reports = await asyncio.to_thread(GenerateReports, username, file_path, query, use_cache)
+        await asyncio.to_thread(generate_reports.get_vector_db)
+        await asyncio.to_thread(generate_reports.get_context)
         generate_reports.create_prompt_template()
-        generate_reports.generate_response()
+        on_token = analysis_token_streamer(username, session_id, query)
+        await generate_reports.agenerate_response(on_token)
         generate_reports.get_suggestion_and_score()
+        if on_token:
+            await websocket_manager.send_analysis_token(username, session_id, query, "", done=True)
         
-        # Calculate confidence based on response quality
-        confidence = 0.9 if len(generate_reports.text) > 500 else 0.7
-        confidence_level = "high" if confidence >= 0.8 else "medium"
+        result = section_result(generate_reports.text, generate_reports.score)
+        result['retrieval'] = generate_reports.retrieval
+        print(f"Completed analysis for {query}: score={generate_reports.score}, confidence={result['confidence']}")
         
-        print(f"Completed analysis for {query}: score={generate_reports.score}, confidence={confidence}")
-        
-        return {
-            'text': generate_reports.text,
-            'score': generate_reports.score,
-            'confidence': confidence,
-            'confidence_level': confidence_level
-        }
+        return result
         
     except Exception as e:
         print(f"Error in analysis for {query}: {str(e)}")
@@ -90,6 +102,41 @@ async def enhanced_analysis(username, file_path, query):
         }
 
 
+def section_result(text, score):
+    # Calculate confidence based on response quality
+    confidence = 0.9 if len(text) > 500 else 0.7
+    confidence_level = "high" if confidence >= 0.8 else "medium"
+    return {
+        'text': text,
+        'score': score,
+        'confidence': confidence,
+        'confidence_level': confidence_level
+    }
+
+
+async def combined_analysis(username, file_path, use_cache=True, session_id=None):
+    """All six sections from one LLM call; returns only the sections that parsed"""
+    try:
+        print("Starting combined analysis for all sections")
+        generate_reports = await asyncio.to_thread(GenerateReports, username, file_path, "combined", use_cache)
+        await asyncio.to_thread(generate_reports.get_vector_db)
+        await asyncio.to_thread(generate_reports.get_context)
+        generate_reports.create_combined_prompt()
+        # The combined reply is one JSON document, so it streams under the "combined" section
+        on_token = analysis_token_streamer(username, session_id, "combined")
+        await generate_reports.agenerate_combined_response(on_token)
+        sections = generate_reports.parse_combined_response()
+        if on_token:
+            await websocket_manager.send_analysis_token(username, session_id, "combined", "", done=True)
+        return {
+            section: section_result(parsed['text'], parsed['score'])
+            for section, parsed in sections.items()
+        }
+    except Exception as e:
+        print(f"Combined analysis failed, falling back to per-section calls: {str(e)}")
+        return {}
+
+
 @router.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
     """WebSocket endpoint for real-time updates"""
@@ -123,9 +170,13 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
 @router.post("/upload-files")
 async def parse_uploaded_files(
     files: Annotated[UploadFile, File(description="A file read as UploadFile", )],
+    refresh: bool = False,
+    combined: Optional[bool] = None,
+    session_id: Optional[str] = None,
     current_user: UserDB=Depends(get_current_user)
 ):
-    session_id = str(uuid.uuid4())
+    # Clients may pick the session id so they can match streamed tokens before the response arrives
+    session_id = session_id or str(uuid.uuid4())
     start_time = datetime.now()
     
     try:
@@ -140,72 +191,90 @@ async def parse_uploaded_files(
         progress_tracker = SimpleProgressTracker(session_id, current_user.username)
         await progress_tracker.update_progress(0, "Processing uploaded document...")
         
-        # Save file
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-        user_dir = os.path.join(UPLOAD_DIR, current_user.username)
-        os.makedirs(user_dir, exist_ok=True)
-        file_path = os.path.join(user_dir, files.filename)
+        # Stream file into the content-addressed store
+        stored_upload = await upload_store.save(files)
+        document_text_cache.remember_file_hash(stored_upload.file_path, stored_upload.content_hash)
+        file_path = stored_upload.file_path
         
-        with open(file_path, "wb") as myfile:
-            myfile.write(files.file.read())
-        
-        # Step 1: Document processing completed
         structured_data = {'company_info': {}, 'financial_data': {}, 'team_info': {}, 'market_data': {}}
-        print("Document processing completed, proceeding to market intelligence")
+        combined = COMBINED_ANALYSIS if combined is None else combined
         
-        # Step 2: Market Intelligence
-        await progress_tracker.next_step("Gathering market intelligence and competitive data...")
-            
-        if MarketIntelligenceEngine:
+        # Pipeline stages with their declared inputs; market intelligence and
+        # competitive analysis do not need the LLM sections, so they overlap them
+        async def extraction_stage(inputs):
+            # Extract once up front; the six sections read it from the text cache
+            return await document_extraction_service.aextract(file_path)
+        
+        async def market_intelligence_stage(inputs):
+            if not MarketIntelligenceEngine:
+                return {}
             market_engine = MarketIntelligenceEngine()
             company_name = structured_data.get('company_info', {}).get('name', files.filename)
             sector = structured_data.get('market_data', {}).get('sector', 'Technology')
-            market_intel = await market_engine.get_comprehensive_intelligence(company_name, sector)
-        else:
-            market_intel = {}
-        
-        # Step 3: AI Analysis
-        await progress_tracker.next_step("Running comprehensive AI analysis across multiple models...")
-        
-        print("Starting comprehensive AI analysis...")
-        analysis_tasks = [
-            enhanced_analysis(current_user.username, file_path, "founders_profile"),
-            enhanced_analysis(current_user.username, file_path, "market_problem"),
-            enhanced_analysis(current_user.username, file_path, "unique_differentiator"),
-            enhanced_analysis(current_user.username, file_path, "business_metrics"),
-            enhanced_analysis(current_user.username, file_path, "risk_factor"),
-            enhanced_analysis(current_user.username, file_path, "recommended_next_steps")
-        ]
-        
-        results = await asyncio.gather(*analysis_tasks)
-        print(f"LLM analysis completed with {len(results)} results")
-        
-        # Step 4: Risk Assessment
-        await progress_tracker.next_step("Calculating success probabilities and risk assessments...")
+            return await market_engine.get_comprehensive_intelligence(company_name, sector)
+        
+        async def llm_sections_stage(inputs):
+            print("Starting comprehensive AI analysis...")
+            section_results = {}
+            if combined:
+                # One call for every section; anything that fails to parse is retried per section below
+                section_results = await combined_analysis(current_user.username, file_path, not refresh, session_id)
             
-        analysis_results = {
-            'founders_profile': results[0],
-            'market_problem': results[1],
-            'unique_differentiator': results[2],
-            'business_metrics': results[3],
-            'risk_factor': results[4],
-            'recommended_next_steps': results[5]
-        }
-        
-        if PredictiveAnalytics:
-            predictive_analytics = PredictiveAnalytics()
-            prediction = predictive_analytics.predict_success_probability(analysis_results)
-        else:
-            prediction = {}
-        
-        # Step 5: Report Generation
-        await progress_tracker.next_step("Generating comprehensive investment memo and final report...")
-            
-        if CompetitiveAnalyzer:
-            competitive_analyzer = CompetitiveAnalyzer()
-            competitive_analysis = await competitive_analyzer.analyze_competition(structured_data.get('company_info', {}))
-        else:
-            competitive_analysis = {}
+            fallback_sections = [section for section in REPORT_SECTIONS if section not in section_results]
+            analysis_tasks = [
+                enhanced_analysis(current_user.username, file_path, section, not refresh, session_id)
+                for section in fallback_sections
+            ]
+            for section, result in zip(fallback_sections, await asyncio.gather(*analysis_tasks)):
+                section_results[section] = result
+            print(f"LLM analysis completed with {len(section_results)} results "
+                  f"(combined={combined}, per-section calls={len(fallback_sections)})")
+            return {'sections': section_results, 'per_section_calls': fallback_sections}
+        
+        async def prediction_stage(inputs):
+            if not PredictiveAnalytics:
+                return {}
+            return PredictiveAnalytics().predict_success_probability(inputs['llm_sections']['sections'])
+        
+        async def competitive_analysis_stage(inputs):
+            if not CompetitiveAnalyzer:
+                return {}
+            return await CompetitiveAnalyzer().analyze_competition(structured_data.get('company_info', {}))
+        
+        # Stages finish in no fixed order, so progress counts finished stages
+        finished_stages = []
+        
+        def tracked(stage, message):
+            async def run(inputs):
+                result = await stage(inputs)
+                finished_stages.append(message)
+                step = min(len(finished_stages), progress_tracker.total_steps - 1)
+                await progress_tracker.update_progress(
+                    step, f"{message} ({len(finished_stages)}/{len(pipeline)} stages done)"
+                )
+                return result
+            return run
+        
+        pipeline = TaskGraph()
+        pipeline.add('extraction', tracked(extraction_stage, "Document text extracted"))
+        pipeline.add('market_intelligence', tracked(market_intelligence_stage, "Market intelligence gathered"))
+        pipeline.add('competitive_analysis', tracked(competitive_analysis_stage, "Competitive analysis ready"))
+        pipeline.add('llm_sections', tracked(llm_sections_stage, "AI analysis of every report section complete"),
+                     depends_on=['extraction'])
+        pipeline.add('prediction', tracked(prediction_stage, "Success probabilities and risks calculated"),
+                     depends_on=['llm_sections'])
+        pipeline_run = await pipeline.arun()
+        pipeline_run.raise_first_error()
+        
+        extraction = pipeline_run.results['extraction']
+        market_intel = pipeline_run.results['market_intelligence']
+        competitive_analysis = pipeline_run.results['competitive_analysis']
+        prediction = pipeline_run.results['prediction']
+        section_results = pipeline_run.results['llm_sections']['sections']
+        fallback_sections = pipeline_run.results['llm_sections']['per_section_calls']
+        
+        results = [section_results[section] for section in REPORT_SECTIONS]
+        analysis_results = dict(zip(REPORT_SECTIONS, results))
         
         # Final results
         final_results = {
@@ -274,7 +343,18 @@ async def parse_uploaded_files(
                 "prediction": prediction,
                 "competitive_analysis": competitive_analysis,
                 "structured_data": structured_data,
-                "confidence_summary": final_results['confidence_summary']
+                "extraction": extraction.summary(),
+                "retrieval": {
+                    section: result.get('retrieval')
+                    for section, result in zip(REPORT_SECTIONS, results)
+                },
+                "analysis_mode": {
+                    "combined": combined,
+                    "per_section_calls": fallback_sections
+                },
+                "confidence_summary": final_results['confidence_summary'],
+                "stage_timings": pipeline_run.timings_dict(),
+                "pipeline_duration": pipeline_run.duration
             }
         }
 
@@ -296,17 +376,10 @@ def health_check():
 @router.post("/ai-chat")
 async def ai_chat(request: dict):
     try:
-        from langchain_groq import ChatGroq
-        import os
-        
         user_message = request.get('message', '')
         
-        # Initialize GROQ LLM
-        llm = ChatGroq(
-            groq_api_key=os.getenv('GROQ_API_KEY'),
-            model_name=os.getenv('LLM_MODEL_NAME', 'llama-3.1-8b-instant'),
-            temperature=0.3
-        )
+        # Shared GROQ LLM from the registry
+        llm = llm_client.profile('assistant')
         
         # Investment analysis context prompt
         system_prompt = """You are an expert venture capital investment analyst AI assistant. 
@@ -317,7 +390,7 @@ async def ai_chat(request: dict):
         full_prompt = f"{system_prompt}\n\nUser Question: {user_message}\n\nResponse:"
         
         # Get AI response
-        response = llm.invoke(full_prompt)
+        response = await llm_client.ainvoke(full_prompt, llm, priority='interactive', name='assistant')
         
         return {
             "response": response.content,
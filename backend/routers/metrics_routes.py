@@ -0,0 +1,43 @@
+from fastapi import APIRouter
+from ml_services.llm_scheduler import llm_scheduler
+from ml_services.llm_cache import llm_response_cache
+from ml_services.llm_client import llm_client
+from ml_services.llm_metrics import llm_metrics
+from ml_services.specialized_agents import agent_result_memo
+
+router = APIRouter()
+
+@router.get("/metrics/llm")
+async def get_llm_metrics():
+    """
+    Histograms of LLM latency, time to first token, queue wait, tokens and retries by model and caller
+    """
+    return llm_metrics.snapshot()
+
+@router.get("/metrics/llm/scheduler")
+async def get_llm_scheduler_metrics():
+    """
+    LLM admission queue: depth by priority, wait times and remaining rate-limit budget
+    """
+    return llm_scheduler.get_stats()
+
+@router.get("/metrics/llm/cache")
+async def get_llm_cache_metrics():
+    """
+    LLM response cache hit rates
+    """
+    return llm_response_cache.get_stats()
+
+@router.get("/metrics/llm/client")
+async def get_llm_client_metrics():
+    """
+    LLM call outcomes: retries, hedged requests and deadline failures
+    """
+    return llm_client.get_stats()
+
+@router.get("/metrics/agents/memo")
+async def get_agent_memo_metrics():
+    """
+    Agent result memo hit rates; a hit skips the agent entirely
+    """
+    return agent_result_memo.get_stats()
@@ -0,0 +1,104 @@
+import random
+
+from ml_services.document_fingerprint import (
+    FINGERPRINT_CHUNK_SIZE,
+    relevant_agents,
+    select_agent_inputs,
+    split_chunks,
+)
+
+
+def make_paragraphs(count=60, seed=1):
+    rng = random.Random(seed)
+    return [f"Paragraph {index}" + " lorem ipsum" * rng.randint(5, 80) for index in range(count)]
+
+
+def test_split_is_deterministic_and_bounded():
+    text = "\n\n".join(make_paragraphs())
+
+    chunks = split_chunks(text)
+
+    assert chunks == split_chunks(text)
+    assert all(len(chunk) <= FINGERPRINT_CHUNK_SIZE for chunk in chunks)
+    assert "\n\n".join(chunks) == text
+
+
+def test_long_paragraphs_are_hard_split():
+    chunks = split_chunks("x" * 5000, size=2000)
+
+    assert [len(chunk) for chunk in chunks] == [2000, 2000, 1000]
+
+
+def test_whitespace_between_paragraphs_does_not_change_chunks():
+    paragraphs = make_paragraphs(20)
+
+    assert split_chunks("\n\n".join(paragraphs)) == split_chunks("\n \n\n".join(paragraphs) + "\n\n")
+
+
+def test_an_edit_only_changes_nearby_chunks():
+    paragraphs = make_paragraphs()
+    before = split_chunks("\n\n".join(paragraphs))
+    paragraphs[5] += " edited"
+    after = split_chunks("\n\n".join(paragraphs))
+
+    changed = sum(old != new for old, new in zip(before, after))
+    assert len(after) == len(before)
+    assert 1 <= changed <= 2
+    assert before[-10:] == after[-10:]
+
+
+def test_terms_match_whole_words_only():
+    assert relevant_agents("Our marketing plan for existing users") == []
+    assert relevant_agents("The market is growing") == ['market']
+    assert relevant_agents("Two exits as co-founder") == ['founder']
+    assert relevant_agents("P&L and burn rate") == ['finance', 'risk']
+
+
+def test_agent_inputs_are_stable():
+    texts = ["Our CEO and CTO founded Acme.\n\nThe market for widgets is large.",
+             "Revenue grew 3x; runway is 18 months."]
+
+    assert select_agent_inputs(texts) == select_agent_inputs(list(texts))
+
+
+def test_editing_one_agents_chunk_leaves_the_others_alone():
+    deck = "Our CEO previously founded two companies."
+    model = "Burn is $100k a month with 18 months of runway."
+    before = select_agent_inputs([deck, model])
+    after = select_agent_inputs([deck, model.replace("18", "24")])
+
+    assert before['founder']['fingerprint'] == after['founder']['fingerprint']
+    assert before['finance']['fingerprint'] != after['finance']['fingerprint']
+    assert "Burn" not in before['founder']['text']
+
+
+def test_agent_without_matching_chunks_reads_the_primary_document():
+    deck = "Our CEO previously founded two companies."
+    pnl = "Revenue of $2M last year."
+    before = select_agent_inputs([deck, pnl])
+    after = select_agent_inputs([deck, pnl.replace("$2M", "$3M")])
+
+    assert before['market']['text'] == deck
+    assert before['market']['chunks'] == 1
+    assert before['market']['fingerprint'] == after['market']['fingerprint']
+
+
+def test_full_text_mode_reads_everything_under_its_own_fingerprint():
+    texts = ["Our CEO previously founded two companies.", "Burn is $100k a month."]
+
+    selected = select_agent_inputs(texts)
+    full = select_agent_inputs(texts, selective=False)
+
+    assert all(agent_input['text'] == "\n\n".join(texts) for agent_input in full.values())
+    assert len({agent_input['fingerprint'] for agent_input in full.values()}) == 1
+    assert full['founder']['fingerprint'] != selected['founder']['fingerprint']
+
+
+def test_full_text_mode_records_the_selected_fingerprint():
+    texts = ["Our CEO previously founded two companies.", "Burn is $100k a month."]
+
+    selected = select_agent_inputs(texts)
+    full = select_agent_inputs(texts, selective=False)
+
+    for agent, agent_input in full.items():
+        assert agent_input['selected_fingerprint'] == selected[agent]['fingerprint']
@@ -0,0 +1,122 @@
+import pytest
+
+from ml_services import llm_cache
+from ml_services.llm_cache import LLMResponseCache
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, 'time', clock.time)
+    return clock
+
+
+def make_cache(tmp_path, **options):
+    cache = LLMResponseCache(db_path=str(tmp_path / "llm_cache.sqlite3"), **options)
+    return cache
+
+
+def disk_keys(cache):
+    with cache._lock:
+        return {row[0] for row in cache.conn.execute("SELECT key FROM llm_responses")}
+
+
+def test_put_then_get_from_memory_and_disk(tmp_path, clock):
+    cache = make_cache(tmp_path, memory_entries=1)
+    cache.put('a', 'answer a')
+    cache.put('b', 'answer b')
+
+    assert cache.get('b') == 'answer b'
+    # 'a' fell out of the one-entry memory tier; it comes back from SQLite
+    assert cache.get('a') == 'answer a'
+    assert cache.get('missing') is None
+    assert cache.stats['memory_hits'] == 1
+    assert cache.stats['disk_hits'] == 1
+    assert cache.stats['misses'] == 1
+    cache.close()
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_seconds=60)
+    cache.put('a', 'answer a')
+
+    clock.now += 59
+    assert cache.get('a') == 'answer a'
+
+    clock.now += 2
+    assert cache.get('a') is None
+    assert cache.stats['expired'] == 1
+    assert disk_keys(cache) == set()
+    cache.close()
+
+
+def test_expired_rows_are_dropped_every_purge_interval(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_seconds=60, purge_every=2)
+    cache.put('old', 'stale')
+
+    clock.now += 120
+    cache.put('new', 'fresh')
+
+    assert disk_keys(cache) == {'new'}
+    assert cache.stats['evictions'] == 1
+    cache.close()
+
+
+def test_least_recently_used_rows_are_evicted(tmp_path, clock):
+    cache = make_cache(tmp_path, memory_entries=1, max_entries=2)
+    cache.put('a', 'answer a')
+    clock.now += 1
+    cache.put('b', 'answer b')
+    clock.now += 1
+    # Reading 'a' from disk makes 'b' the least recently used row
+    assert cache.get('a') == 'answer a'
+    clock.now += 1
+    cache.put('c', 'answer c')
+
+    assert disk_keys(cache) == {'a', 'c'}
+    assert cache.stats['evictions'] == 1
+    cache.close()
+
+
+def test_memory_hits_refresh_last_access_in_batches(tmp_path, clock):
+    cache = make_cache(tmp_path, max_entries=2, touch_batch=2)
+    cache.put('a', 'answer a')
+    clock.now += 1
+    cache.put('b', 'answer b')
+    clock.now += 1
+    # A memory hit on 'a' is written back before the next eviction
+    assert cache.get('a') == 'answer a'
+    clock.now += 1
+    cache.put('c', 'answer c')
+
+    assert disk_keys(cache) == {'a', 'c'}
+    cache.close()
+
+
+def test_replacing_a_row_does_not_count_twice(tmp_path, clock):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.put('a', 'answer a')
+    cache.put('a', 'answer a again')
+    cache.put('b', 'answer b')
+
+    assert disk_keys(cache) == {'a', 'b'}
+    assert cache.stats['evictions'] == 0
+    cache.close()
+
+
+def test_memory_tier_is_bounded(tmp_path, clock):
+    cache = make_cache(tmp_path, memory_entries=2)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, key)
+
+    assert list(cache._memory) == ['b', 'c']
+    assert cache.get_stats()['memory_entries'] == 2
+    cache.close()
@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import pytest
+
+from ml_services.llm_scheduler import LLMBudgetExceeded, LLMScheduler, TokenBucket
+
+
+def test_bucket_refills_at_its_per_minute_rate():
+    bucket = TokenBucket(60)
+    start = bucket.updated
+    bucket.take(60)
+
+    bucket.refill(start + 1.5)
+
+    assert bucket.level == pytest.approx(1.5)
+    assert bucket.wait_for(3) == pytest.approx(1.5)
+    assert bucket.wait_for(1) == 0.0
+
+
+def test_bucket_refill_and_refunds_stop_at_capacity():
+    bucket = TokenBucket(60)
+    start = bucket.updated
+    bucket.take(10)
+
+    bucket.refill(start + 3600)
+    assert bucket.level == 60
+
+    bucket.give(25)
+    assert bucket.level == 60
+
+
+def test_bucket_debt_is_repaid_before_the_next_request():
+    bucket = TokenBucket(60)
+    bucket.take(70)
+
+    assert bucket.level == -10
+    assert bucket.wait_for(5) == pytest.approx(15)
+
+
+def test_zero_limit_is_unlimited():
+    bucket = TokenBucket(0)
+    bucket.take(10 ** 6)
+
+    assert bucket.unlimited
+    assert bucket.wait_for(10 ** 6) == 0.0
+
+
+def test_request_larger_than_budget_is_rejected():
+    scheduler = LLMScheduler(rpm=0, tpm=1000)
+
+    with pytest.raises(LLMBudgetExceeded):
+        scheduler.acquire_sync('batch', tokens=1001)
+    assert scheduler.stats['rejected'] == 1
+
+    ticket = scheduler.acquire_sync('batch', tokens=1000)
+    assert ticket.granted_at is not None
+
+
+def test_settle_refunds_unused_tokens():
+    scheduler = LLMScheduler(rpm=0, tpm=6000)
+    ticket = scheduler.acquire_sync('batch', tokens=3000)
+
+    scheduler.settle(ticket, used_tokens=1000)
+
+    assert scheduler.tokens.level == pytest.approx(5000, abs=5)
+
+
+def test_interactive_requests_overtake_queued_batch_work():
+    # 600 requests a minute: one admission every 0.1s once the bucket is drained
+    scheduler = LLMScheduler(rpm=600, tpm=0)
+    scheduler.requests.level = 0
+    scheduler.requests.updated = time.monotonic()
+    order = []
+
+    async def request(name, priority):
+        await scheduler.acquire(priority)
+        order.append(name)
+
+    async def main():
+        await asyncio.gather(
+            request('batch-1', 'batch'),
+            request('batch-2', 'batch'),
+            request('interactive', 'interactive'),
+        )
+
+    asyncio.run(main())
+
+    assert order == ['interactive', 'batch-1', 'batch-2']
+    assert scheduler.stats['queued'] == 3
+    assert scheduler.stats['admitted'] == 3
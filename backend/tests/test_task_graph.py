@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+
+from core.task_graph import TaskGraph
+
+
+def fail(inputs):
+    raise RuntimeError("boom")
+
+
+def test_dependencies_receive_results():
+    graph = TaskGraph()
+    graph.add('a', lambda inputs: 1)
+    graph.add('b', lambda inputs: 2)
+    graph.add('sum', lambda inputs: inputs['a'] + inputs['b'], depends_on=['a', 'b'])
+
+    run = graph.run()
+
+    assert run.results == {'a': 1, 'b': 2, 'sum': 3}
+    assert not run.errors
+    assert all(timing.status == 'ok' for timing in run.timings.values())
+
+
+def test_cycle_is_rejected():
+    graph = TaskGraph()
+    graph.add('a', lambda inputs: 1, depends_on=['c'])
+    graph.add('b', lambda inputs: 2, depends_on=['a'])
+    graph.add('c', lambda inputs: 3, depends_on=['b'])
+    graph.add('free', lambda inputs: 4)
+
+    with pytest.raises(ValueError, match="cycle") as error:
+        graph.run()
+    assert "free" not in str(error.value)
+    with pytest.raises(ValueError, match="cycle"):
+        asyncio.run(graph.arun())
+
+
+def test_unknown_dependency_is_rejected():
+    graph = TaskGraph()
+    graph.add('a', lambda inputs: 1, depends_on=['missing'])
+
+    with pytest.raises(ValueError, match="unknown"):
+        graph.run()
+
+
+def test_duplicate_task_is_rejected():
+    graph = TaskGraph().add('a', lambda inputs: 1)
+
+    with pytest.raises(ValueError, match="Duplicate"):
+        graph.add('a', lambda inputs: 2)
+
+
+def test_failed_dependency_skips_dependents():
+    ran = []
+    graph = TaskGraph()
+    graph.add('source', fail)
+    graph.add('child', lambda inputs: ran.append('child'), depends_on=['source'])
+    graph.add('grandchild', lambda inputs: ran.append('grandchild'), depends_on=['child'])
+    graph.add('independent', lambda inputs: ran.append('independent') or 'ok')
+
+    run = graph.run()
+
+    assert ran == ['independent']
+    assert run.results == {'independent': 'ok'}
+    assert list(run.errors) == ['source']
+    assert run.timings['source'].status == 'failed'
+    assert run.timings['source'].error == "RuntimeError: boom"
+    assert run.timings['child'].status == 'skipped'
+    assert run.timings['grandchild'].status == 'skipped'
+    with pytest.raises(RuntimeError, match="boom"):
+        run.raise_first_error()
+
+
+def test_arun_mixes_coroutines_and_functions_and_skips():
+    async def fetch(inputs):
+        await asyncio.sleep(0.01)
+        return 'text'
+
+    async def broken(inputs):
+        raise KeyError('x')
+
+    graph = TaskGraph()
+    graph.add('fetch', fetch)
+    graph.add('count', lambda inputs: len(inputs['fetch']), depends_on=['fetch'])
+    graph.add('broken', broken)
+    graph.add('after_broken', lambda inputs: 'never', depends_on=['broken'])
+
+    run = asyncio.run(graph.arun())
+
+    assert run.results == {'fetch': 'text', 'count': 4}
+    assert run.timings['after_broken'].status == 'skipped'
+    assert isinstance(run.errors['broken'], KeyError)
+
+
+def test_independent_tasks_overlap():
+    graph = TaskGraph()
+    for name in ('a', 'b', 'c'):
+        graph.add(name, lambda inputs: time.sleep(0.2))
+
+    run = graph.run()
+
+    # Run one after another this would take at least 0.6s
+    assert run.duration < 0.5
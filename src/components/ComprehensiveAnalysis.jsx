@@ -10,13 +10,14 @@ const ComprehensiveAnalysis = ({ uploadedFiles, analysisResults: parentAnalysisR
   const [investorPreferences, setInvestorPreferences] = useState({
     founder_weight: 25,
     market_weight: 25,
-    product_weight: 20,
     traction_weight: 15,
     finance_weight: 10,
     risk_weight: 5,
     min_overall_score: 70,
     risk_tolerance: 'medium'
   });
+  // Until a weight is edited the backend keeps its default agent weights
+  const [weightsCustomized, setWeightsCustomized] = useState(false);
 
   const analysisSteps = [
     { name: "Document Processing", description: "Extracting text from uploaded documents..." },
@@ -76,6 +77,26 @@ const ComprehensiveAnalysis = ({ uploadedFiles, analysisResults: parentAnalysisR
     }
   };
 
+  const updateWeight = (field, value) => {
+    setInvestorPreferences({ ...investorPreferences, [field]: value });
+    setWeightsCustomized(true);
+  };
+
+  // Weights are only sent once the user has chosen them, keyed by agent
+  const preferencesForAnalysis = () => {
+    if (!weightsCustomized) return investorPreferences;
+    return {
+      ...investorPreferences,
+      weights: {
+        founder: investorPreferences.founder_weight,
+        market: investorPreferences.market_weight,
+        traction: investorPreferences.traction_weight,
+        finance: investorPreferences.finance_weight,
+        risk: investorPreferences.risk_weight
+      }
+    };
+  };
+
   const startComprehensiveAnalysis = async () => {
     if (!uploadedFiles || uploadedFiles.length === 0) {
       alert('Please upload files first');
@@ -124,13 +145,14 @@ const ComprehensiveAnalysis = ({ uploadedFiles, analysisResults: parentAnalysisR
       });
       
       if (investorPreferences) {
-        formData.append('investor_preferences', JSON.stringify(investorPreferences));
+        formData.append('investor_preferences', JSON.stringify(preferencesForAnalysis()));
       }
       
-      const response = await apiService.request('/api/v2/comprehensive-analysis', {
-        method: 'POST',
-        body: formData,
-        isFormData: true,
+      // The endpoint queues a job; wait for it to finish
+      const job = await apiService.submitComprehensiveAnalysis(formData);
+      console.log('Analysis queued:', job);
+      const response = await apiService.waitForAnalysisJob(job.analysis_id, (status) => {
+        if (status.status === 'queued') setCurrentStep('Waiting for an analysis worker...');
       });
 
       console.log('Analysis completed:', response);
@@ -261,10 +283,7 @@ const ComprehensiveAnalysis = ({ uploadedFiles, analysisResults: parentAnalysisR
             min="0"
             max="100"
             value={investorPreferences.founder_weight}
-            onChange={(e) => setInvestorPreferences({
-              ...investorPreferences,
-              founder_weight: parseInt(e.target.value)
-            })}
+            onChange={(e) => updateWeight('founder_weight', parseInt(e.target.value))}
             className="w-full px-3 py-2 border rounded-lg"
           />
         </div>
@@ -276,25 +295,7 @@ const ComprehensiveAnalysis = ({ uploadedFiles, analysisResults: parentAnalysisR
             min="0"
             max="100"
             value={investorPreferences.market_weight}
-            onChange={(e) => setInvestorPreferences({
-              ...investorPreferences,
-              market_weight: parseInt(e.target.value)
-            })}
-            className="w-full px-3 py-2 border rounded-lg"
-          />
-        </div>
-        
-        <div>
-          <label className="block text-sm font-medium mb-2">Product Weight (%)</label>
-          <input
-            type="number"
-            min="0"
-            max="100"
-            value={investorPreferences.product_weight}
-            onChange={(e) => setInvestorPreferences({
-              ...investorPreferences,
-              product_weight: parseInt(e.target.value)
-            })}
+            onChange={(e) => updateWeight('market_weight', parseInt(e.target.value))}
             className="w-full px-3 py-2 border rounded-lg"
           />
         </div>
@@ -306,10 +307,7 @@ const ComprehensiveAnalysis = ({ uploadedFiles, analysisResults: parentAnalysisR
             min="0"
             max="100"
             value={investorPreferences.traction_weight}
-            onChange={(e) => setInvestorPreferences({
-              ...investorPreferences,
-              traction_weight: parseInt(e.target.value)
-            })}
+            onChange={(e) => updateWeight('traction_weight', parseInt(e.target.value))}
             className="w-full px-3 py-2 border rounded-lg"
           />
         </div>
@@ -321,10 +319,7 @@ const ComprehensiveAnalysis = ({ uploadedFiles, analysisResults: parentAnalysisR
             min="0"
             max="100"
             value={investorPreferences.finance_weight}
-            onChange={(e) => setInvestorPreferences({
-              ...investorPreferences,
-              finance_weight: parseInt(e.target.value)
-            })}
+            onChange={(e) => updateWeight('finance_weight', parseInt(e.target.value))}
             className="w-full px-3 py-2 border rounded-lg"
           />
         </div>
@@ -336,10 +331,7 @@ const ComprehensiveAnalysis = ({ uploadedFiles, analysisResults: parentAnalysisR
             min="0"
             max="100"
             value={investorPreferences.risk_weight}
-            onChange={(e) => setInvestorPreferences({
-              ...investorPreferences,
-              risk_weight: parseInt(e.target.value)
-            })}
+            onChange={(e) => updateWeight('risk_weight', parseInt(e.target.value))}
             className="w-full px-3 py-2 border rounded-lg"
           />
         </div>
@@ -6,6 +6,8 @@ class ApiService {
     this.token = localStorage.getItem('access_token');
     this.websocket = null;
     this.wsCallbacks = new Map();
+    // job_id -> Set of listeners, so several jobs can be awaited at once
+    this.jobStatusListeners = new Map();
     this.reconnectAttempts = 0;
     this.maxReconnectAttempts = 5;
   }
@@ -140,6 +142,10 @@ class ApiService {
         const data = JSON.parse(event.data);
         console.log('WebSocket message:', data);
         
+        if (data.type === 'job_status') {
+          (this.jobStatusListeners.get(data.job_id) || []).forEach(listener => listener(data));
+        }
+        
         // Call specific callback based on message type
         const callback = this.wsCallbacks.get(data.type) || callbacks.onMessage;
         if (callback) {
@@ -190,6 +196,20 @@ class ApiService {
   removeWebSocketCallback(type) {
     this.wsCallbacks.delete(type);
   }
+  
+  // Listens for 'job_status' pushes about one job; returns a function that stops listening
+  onJobStatus(jobId, listener) {
+    if (!this.jobStatusListeners.has(jobId)) {
+      this.jobStatusListeners.set(jobId, new Set());
+    }
+    this.jobStatusListeners.get(jobId).add(listener);
+    return () => {
+      const listeners = this.jobStatusListeners.get(jobId);
+      if (!listeners) return;
+      listeners.delete(listener);
+      if (listeners.size === 0) this.jobStatusListeners.delete(jobId);
+    };
+  }
 
   // Enhanced upload with real-time progress
   async uploadFilesWithProgress(files, progressCallback, investorPreferences = null) {
@@ -215,7 +235,14 @@ class ApiService {
       this.onWebSocketMessage('analysis_error', progressCallback);
     }
 
-    // Use V2 comprehensive analysis endpoint
+    // Use V2 comprehensive analysis endpoint; it queues a job, so wait for the result
+    const job = await this.submitComprehensiveAnalysis(formData);
+    return this.waitForAnalysisJob(job.analysis_id);
+  }
+
+  // V2 API Methods
+  // Queues an analysis and returns { job_id, analysis_id, status } straight away
+  async submitComprehensiveAnalysis(formData) {
     return this.request('/api/v2/comprehensive-analysis', {
       method: 'POST',
       body: formData,
@@ -223,11 +250,58 @@ class ApiService {
     });
   }
 
-  // V2 API Methods
+  // Adds files to an analysed project (same filename replaces the old file) and queues
+  // a re-analysis that re-runs only the agents whose inputs changed
+  async addProjectFiles(projectId, files, investorPreferences = null) {
+    const formData = new FormData();
+    Array.from(files).forEach(file => formData.append('files', file));
+    if (investorPreferences) {
+      formData.append('investor_preferences', JSON.stringify(investorPreferences));
+    }
+    return this.request(`/api/v2/projects/${projectId}/files`, {
+      method: 'POST',
+      body: formData,
+      isFormData: true,
+    });
+  }
+
+  // Job status, with the analysis under `result` once status is 'completed'
   async getComprehensiveAnalysis(analysisId) {
     return this.request(`/api/v2/analysis/${analysisId}`);
   }
 
+  // Re-weights a finished analysis with new preferences; no agents are re-run
+  async rescoreAnalysis(analysisId, preferences) {
+    return this.request(`/api/v2/analysis/${analysisId}/rescore`, {
+      method: 'POST',
+      body: JSON.stringify(preferences),
+    });
+  }
+
+  // Polls until the job finishes and resolves with its result; a 'job_status'
+  // WebSocket push triggers the next poll early. onStatus gets every status seen.
+  async waitForAnalysisJob(analysisId, onStatus = () => {}, intervalMs = 3000) {
+    let wake = null;
+    const stopListening = this.onJobStatus(analysisId, () => {
+      if (wake) wake();
+    });
+
+    try {
+      while (true) {
+        const job = await this.getComprehensiveAnalysis(analysisId);
+        onStatus(job);
+        if (job.status === 'completed') return job.result;
+        if (job.status === 'failed') throw new Error(job.error || 'Analysis failed');
+        await new Promise(resolve => {
+          wake = resolve;
+          setTimeout(resolve, intervalMs);
+        });
+      }
+    } finally {
+      stopListening();
+    }
+  }
+
   async saveInvestorPreferences(preferences) {
     return this.request('/api/v2/investor-preferences', {
       method: 'POST',
@@ -323,6 +397,45 @@ class ApiService {
     });
   }
 
+  // Streams the reply from /chat/stream (Server-Sent Events); onToken gets each chunk,
+  // and the resolved value is the same { response, confidence } as sendChatMessage
+  async streamChatMessage(message, context = null, onToken = () => {}) {
+    const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+      method: 'POST',
+      headers: this.getHeaders(),
+      body: JSON.stringify({ message, context }),
+    });
+
+    if (!response.ok) {
+      if (response.status === 401) {
+        this.removeToken();
+        throw new Error('Authentication failed. Please login again.');
+      }
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+      for (const raw of events) {
+        const lines = raw.split('\n');
+        const event = (lines.find(line => line.startsWith('event: ')) || 'event: token').slice(7);
+        const data = JSON.parse(lines.filter(line => line.startsWith('data: ')).map(line => line.slice(6)).join('\n'));
+        if (event === 'token') onToken(data.token);
+        if (event === 'done') return data;
+        if (event === 'error') throw new Error(data.detail);
+      }
+    }
+    throw new Error('Chat stream ended without a response');
+  }
+
   async getChatSuggestions() {
     return this.request('/chat/suggestions');
   }
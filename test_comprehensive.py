@@ -4,6 +4,7 @@ Test script for comprehensive analysis endpoint
 """
 import requests
 import json
+import time
 
 # Test the comprehensive analysis endpoint
 def test_comprehensive_analysis():
@@ -58,8 +59,23 @@ def test_comprehensive_analysis():
         print(f"Status Code: {response.status_code}")
         print(f"Response Headers: {dict(response.headers)}")
         
-        if response.status_code == 200:
-            result = response.json()
+        if response.status_code == 202:
+            job = response.json()
+            print(f"Queued job: {job.get('job_id')}")
+            
+            # Poll until the background job finishes
+            status_url = f"http://127.0.0.1:8000{job['status_url']}"
+            while job.get('status') in ('queued', 'running'):
+                time.sleep(2)
+                job = requests.get(status_url, headers=headers, timeout=30).json()
+                print(f"Job status: {job.get('status')}")
+            
+            if job.get('status') != 'completed':
+                print("❌ FAILED!")
+                print(f"Error: {job.get('error')}")
+                return False
+            
+            result = job['result']
             print("✅ SUCCESS!")
             print(f"Analysis ID: {result.get('analysis_id', 'N/A')}")
             print(f"Company Name: {result.get('company_name', 'N/A')}")